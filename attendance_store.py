@@ -0,0 +1,137 @@
+import queue
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+
+
+# Presenças indexadas por pessoa, com timestamps nativos em memória e um diário SQLite (WAL)
+# gravado em lotes por uma thread própria, fora do loop de frames.
+class AttendanceStore:
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            distance REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_events_name_timestamp ON events (name, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events (timestamp);
+    """
+
+    def __init__(self, db_path, remark_interval=2 * 60 * 60, batch_size=100, flush_interval=1.0, restore_since=None):
+        self.db_path = db_path
+        self.remark_interval = timedelta(seconds=remark_interval)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.by_name = {}  # nome -> registro; consulta O(1) para a regra de nova marcação
+        self.pending = queue.Queue()
+        self.events_written = 0
+
+        with sqlite3.connect(self.db_path) as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript(self.SCHEMA)
+        # Reconstrói o estado a partir do diário (por padrão, o dia corrente) após reinício ou queda
+        if restore_since is None:
+            restore_since = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.restore(restore_since)
+
+        self.running = True
+        self.writer = threading.Thread(target=self.writer_loop, name='attendance-writer', daemon=True)
+        self.writer.start()
+
+    def restore(self, since):
+        for name, kind, timestamp, distance in self.query(start=since):
+            record = self.by_name.get(name)
+            if record is None:
+                record = {'name': name, 'timestamp_recognized': timestamp, 'timestamp': timestamp, 'distance': distance}
+                self.by_name[name] = record
+                continue
+            if kind == 'remarked':
+                record['timestamp'] = timestamp
+            if distance < record['distance']:
+                record['distance'] = distance
+
+    # Aplica a regra de mark_attendance e registra o evento no diário. Retorna o tipo do evento ou None.
+    def mark(self, name, dis, now=None):
+        now = now or datetime.now()
+        with self.lock:
+            record = self.by_name.get(name)
+            if record is None:
+                self.by_name[name] = {'name': name, 'timestamp_recognized': now, 'timestamp': now, 'distance': dis}
+                kind = 'recognized'
+            else:
+                kind = None
+                # Atualiza o timestamp se a última identificação foi há mais de remark_interval
+                if now - record['timestamp'] > self.remark_interval:
+                    record['timestamp'] = now
+                    kind = 'remarked'
+                # Atualiza a distância apenas se o novo valor for menor que o anterior
+                if dis < record['distance']:
+                    record['distance'] = dis
+                    kind = kind or 'distance'
+        if kind is not None:
+            self.pending.put((name, kind, now.isoformat(sep=' '), float(dis)))
+        return kind
+
+    def get(self, name):
+        with self.lock:
+            record = self.by_name.get(name)
+            return dict(record) if record else None
+
+    # Registros atuais em ordem de primeira identificação
+    def records(self):
+        with self.lock:
+            return [dict(record) for record in self.by_name.values()]
+
+    # Consulta o diário por intervalo e/ou pessoa; retorna (nome, tipo, datetime, distância)
+    def query(self, start=None, end=None, name=None):
+        sql = 'SELECT name, kind, timestamp, distance FROM events WHERE 1 = 1'
+        params = []
+        if start is not None:
+            sql += ' AND timestamp >= ?'
+            params.append(start.isoformat(sep=' '))
+        if end is not None:
+            sql += ' AND timestamp < ?'
+            params.append(end.isoformat(sep=' '))
+        if name is not None:
+            sql += ' AND name = ?'
+            params.append(name)
+        sql += ' ORDER BY timestamp, id'
+        with sqlite3.connect(self.db_path) as connection:
+            rows = connection.execute(sql, params).fetchall()
+        return [(row[0], row[1], datetime.fromisoformat(row[2]), row[3]) for row in rows]
+
+    def query_day(self, day, name=None):
+        start = datetime(day.year, day.month, day.day)
+        return self.query(start=start, end=start + timedelta(days=1), name=name)
+
+    # Grava os eventos pendentes em lotes: um commit por lote ou a cada flush_interval
+    def writer_loop(self):
+        connection = sqlite3.connect(self.db_path)
+        try:
+            while self.running or not self.pending.empty():
+                try:
+                    batch = [self.pending.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    continue
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self.pending.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    connection.executemany('INSERT INTO events (name, kind, timestamp, distance) VALUES (?, ?, ?, ?)', batch)
+                    connection.commit()
+                    self.events_written += len(batch)
+                except Exception as e:
+                    logging.error(f"Erro ao gravar presenças: {str(e)}")
+        finally:
+            connection.close()
+
+    # Encerra a thread de gravação após descarregar os eventos pendentes
+    def close(self):
+        self.running = False
+        self.writer.join(timeout=5.0)
@@ -0,0 +1,236 @@
+import os
+import sys
+import csv
+import json
+import time
+import logging
+import multiprocessing
+import argparse
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import cv2 as cv  # OpenCV para leitura do vídeo
+from recognition import make_matcher, prepare_frame, detect_and_encode_batch, find_sightings, sighting_is_live
+from matcher import INDEX_BACKENDS
+from encoding_cache import EncodingCache
+from enrollment import is_image_file, encode_paths
+from compaction import GalleryCompactor, RawRecheck
+from attendance_store import AttendanceStore
+from liveness import LivenessChecker
+from shared_gallery import SharedGalleryPublisher, SharedGalleryReader
+from detectors import DETECTOR_BACKENDS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Estado de cada processo do pool; a galeria é anexada da memória compartilhada, sem cópia
+worker_gallery = None
+worker_matcher = None
+worker_liveness = None
+worker_recheck = None
+
+
+# raw_prefix: galeria original para reconferir o vencedor quando a publicada é a compactada (None desliga)
+def init_worker(gallery_prefix, raw_prefix, match_params):
+    global worker_gallery, worker_matcher, worker_liveness, worker_recheck
+    worker_liveness = LivenessChecker()
+    if raw_prefix:
+        worker_recheck = RawRecheck(SharedGalleryReader(raw_prefix))
+        worker_recheck.refresh()
+    worker_gallery = SharedGalleryReader(gallery_prefix)
+    worker_gallery.refresh()
+    worker_matcher = make_matcher(*match_params)  # (índice, nprobe, nlist)
+    worker_matcher.set_gallery(worker_gallery.matrix, worker_gallery.names)
+
+
+# Detecta um lote de frames de uma vez e acrescenta as aparições encontradas. pending guarda
+# (índice, frame original, frame reduzido): o liveness usa o recorte do frame original.
+def flush_frames(pending, sightings, detector, detection_scale, dis_face_encoding, face_height_threshold, liveness_params):
+    if not pending:
+        return
+    results, _ = detect_and_encode_batch([imgS for _, _, imgS in pending], detector)
+    for (frame_index, img, _), (faces, encodes) in zip(pending, results):
+        # Mesmos critérios de handle_face_recognition para marcar presença, incluindo o liveness
+        for class_name, distance, faceLoc in find_sightings(worker_matcher, faces, encodes, detection_scale, dis_face_encoding, face_height_threshold, worker_recheck):
+            if sighting_is_live(worker_liveness, img, faceLoc, detection_scale, liveness_params):
+                sightings.append((frame_index, class_name, distance))
+    pending.clear()
+
+
+# Abre o vídeo posicionado exatamente no frame start. Conforme o backend e o codec, o seek por
+# CAP_PROP_POS_FRAMES cai no keyframe anterior: a posição é conferida e, se não bater, os frames
+# que faltam são avançados com grab() (reabrindo o vídeo se o seek passou do ponto).
+def open_at(video_path, start):
+    capture = cv.VideoCapture(video_path)
+    if start <= 0:
+        return capture
+    position = int(capture.get(cv.CAP_PROP_POS_FRAMES)) if capture.set(cv.CAP_PROP_POS_FRAMES, start) else -1
+    if position == start:
+        return capture
+    if not 0 <= position < start:
+        capture.release()
+        capture = cv.VideoCapture(video_path)
+        position = 0
+    for _ in range(start - position):
+        if not capture.grab():
+            break
+    return capture
+
+
+# Processa o intervalo [start, end) do vídeo e retorna as aparições (frame, nome da classe, distância).
+# Os frames amostrados são acumulados em lotes de batch_size para detectores com suporte a lote.
+def process_chunk(video_path, start, end, stride, dis_face_encoding, face_height_threshold, detection_scale, liveness_params, detector='hog', batch_size=1):
+    capture = open_at(video_path, start)
+    sightings = []
+    pending = []
+    decoded = 0
+    analysed = 0
+    # Alinha a amostragem ao início do vídeo para que o resultado não dependa da divisão em blocos
+    for frame_index in range(start, end):
+        if frame_index % stride:
+            if not capture.grab():  # grab() avança sem decodificar a imagem por completo
+                break
+            decoded += 1
+            continue
+        success, img = capture.read()
+        if not success:
+            break
+        decoded += 1
+        analysed += 1
+        pending.append((frame_index, img, prepare_frame(img, detection_scale)))
+        if len(pending) >= batch_size:
+            flush_frames(pending, sightings, detector, detection_scale, dis_face_encoding, face_height_threshold, liveness_params)
+    flush_frames(pending, sightings, detector, detection_scale, dis_face_encoding, face_height_threshold, liveness_params)
+    capture.release()
+    return sightings, decoded, analysed
+
+
+# Galeria original (pelo cache de encodings) sem montar uma Recognition inteira: o modo em lote
+# não usa câmera, tracker nem as pastas de capturas
+def load_gallery(faces_path, detector='hog'):
+    try:
+        return EncodingCache(faces_path, is_image_file).sync(lambda paths: encode_paths(paths, None, detector))
+    except Exception as e:
+        logging.error(f"Erro ao carregar imagens: {str(e)}")
+        return [], []
+
+
+def load_person_names(persons_path):
+    try:
+        with open(persons_path, 'r') as file:
+            return {entry['id']: entry['name'] for entry in json.load(file)}
+    except FileNotFoundError:
+        return {}
+
+
+def split_ranges(total, chunks):
+    size = max(1, -(-total // chunks))
+    return [(start, min(total, start + size)) for start in range(0, total, size)]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Calcula a presença a partir de um vídeo gravado, em paralelo.')
+    parser.add_argument('video', help='arquivo de vídeo')
+    parser.add_argument('--output', default=None, help='CSV de saída (padrão: <video>.csv)')
+    parser.add_argument('--db', default=None, help='diário SQLite de presenças (padrão: <video>.attendance.db)')
+    parser.add_argument('--start-time', default=None, help='horário do primeiro frame, "AAAA-MM-DD HH:MM:SS" (padrão: mtime do arquivo menos a duração)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunks-per-worker', type=int, default=4)
+    parser.add_argument('--stride', type=int, default=5, help='analisa 1 a cada N frames')
+    parser.add_argument('--faces', default=os.path.join(BASE_DIR, 'faces'))
+    parser.add_argument('--persons', default=os.path.join(BASE_DIR, 'persons.json'))
+    parser.add_argument('--dis-face-encoding', type=float, default=0.55)
+    parser.add_argument('--face-height-threshold', type=float, default=250)
+    parser.add_argument('--threshold-texture', type=float, default=140)
+    parser.add_argument('--threshold-reflection', type=float, default=180)
+    parser.add_argument('--expand-ratio', type=float, default=0.25)
+    parser.add_argument('--no-compact', action='store_true', help='compara com todas as fotos em vez de centróide + exemplares por pessoa')
+    parser.add_argument('--no-recheck', action='store_true', help='não reconfere o vencedor contra todas as fotos da pessoa')
+    parser.add_argument('--detection-scale', type=float, default=0.25, help='redução do frame antes da detecção (maior encontra rostos mais distantes)')
+    parser.add_argument('--detector', default='hog', choices=sorted(DETECTOR_BACKENDS), help='backend de detecção (ver benchmarks/bench_detectors.py)')
+    parser.add_argument('--match-index', default='exact', choices=sorted(INDEX_BACKENDS), help='busca na galeria: exata ou IVF aproximada (galerias grandes)')
+    parser.add_argument('--nprobe', type=int, default=8, help='listas do IVF visitadas por consulta; maior = mais recall, mais lento')
+    parser.add_argument('--nlist', type=int, default=0, help='listas do IVF (0 = ~raiz quadrada do tamanho da galeria)')
+    parser.add_argument('--batch-size', type=int, default=8, help='frames por chamada do detector, para backends com suporte a lote')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    capture = cv.VideoCapture(args.video)
+    if not capture.isOpened():
+        print(f"Não foi possível abrir {args.video}", file=sys.stderr)
+        return 1
+    total = int(capture.get(cv.CAP_PROP_FRAME_COUNT))
+    fps = capture.get(cv.CAP_PROP_FPS) or 30.0
+    capture.release()
+
+    if args.start_time:
+        start_time = datetime.strptime(args.start_time, '%Y-%m-%d %H:%M:%S')
+    else:
+        start_time = datetime.fromtimestamp(os.path.getmtime(args.video)) - timedelta(seconds=total / fps)
+
+    # Carrega a galeria (usando o cache de encodings) e os nomes uma única vez no processo principal
+    names, matrix = load_gallery(args.faces, args.detector)
+    person_name = load_person_names(args.persons)
+    gallery_publisher = SharedGalleryPublisher()
+    raw_gallery_publisher = None
+    if args.no_compact:
+        gallery_publisher.publish(matrix, names)
+    else:
+        # Compactada como na Recognition; a original vai à parte para a reverificação nos workers
+        compact_names, compact_matrix = GalleryCompactor(exemplars=3).compact(names, matrix)
+        gallery_publisher.publish(compact_matrix, compact_names)
+        if not args.no_recheck:
+            raw_gallery_publisher = SharedGalleryPublisher(f"{gallery_publisher.prefix}raw")
+            raw_gallery_publisher.publish(matrix, names)
+    raw_prefix = raw_gallery_publisher.prefix if raw_gallery_publisher is not None else None
+
+    ranges = split_ranges(total, max(1, args.workers * args.chunks_per_worker))
+    sightings = []
+    decoded = analysed = 0
+    started = time.monotonic()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(gallery_publisher.prefix, raw_prefix, (args.match_index, args.nprobe, args.nlist))) as pool:
+        futures = [pool.submit(process_chunk, args.video, start, end, max(1, args.stride), args.dis_face_encoding, args.face_height_threshold, args.detection_scale,
+                               (args.expand_ratio, args.threshold_texture, args.threshold_reflection), args.detector, max(1, args.batch_size) if DETECTOR_BACKENDS[args.detector].batchable else 1)
+                   for start, end in ranges]
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                chunk_sightings, chunk_decoded, chunk_analysed = future.result()
+            except Exception as e:
+                logging.error(f"Erro ao processar bloco do vídeo: {str(e)}")
+                continue
+            sightings.extend(chunk_sightings)
+            decoded += chunk_decoded
+            analysed += chunk_analysed
+            elapsed = time.monotonic() - started
+            print(f"[{done}/{len(futures)}] {decoded}/{total} frames - {decoded / elapsed:.1f} fps", file=sys.stderr)
+
+    # Junta as aparições na ordem do vídeo e aplica a mesma deduplicação de mark_attendance.
+    # O diário é restaurado a partir do início do vídeo, não da meia-noite de hoje: uma gravação
+    # antiga processada de novo continua deduplicando contra as marcações que já estão no banco.
+    attendance = AttendanceStore(args.db or f"{args.video}.attendance.db", restore_since=start_time)
+    for frame_index, class_name, distance in sorted(sightings):
+        name = person_name.get(class_name, "Desconhecido").upper()
+        attendance.mark(name, distance, start_time + timedelta(seconds=frame_index / fps))
+    records = attendance.records()
+    attendance.close()
+    gallery_publisher.close()
+    if raw_gallery_publisher is not None:
+        raw_gallery_publisher.close()
+
+    output = args.output or f"{args.video}.csv"
+    with open(output, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file, delimiter=';')
+        writer.writerow(['Identificador', 'Data e Hora', 'Distancia Facial'])
+        for record in records:
+            writer.writerow([record['name'], record['timestamp_recognized'].strftime('%Y-%m-%d %H:%M:%S'), record['distance']])
+
+    elapsed = time.monotonic() - started
+    print(f"{decoded} frames ({analysed} analisados) em {elapsed:.1f}s - {decoded / elapsed if elapsed else 0:.1f} fps; "
+          f"{len(records)} pessoas em {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,112 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from matcher import FaceMatcher  # noqa: E402
+from compaction import GalleryCompactor  # noqa: E402
+from encoding_cache import EncodingCache  # noqa: E402
+
+
+# Pessoas sintéticas com escala parecida com a do dlib: ~0.4 entre fotos da mesma pessoa e
+# ~1.0 entre pessoas diferentes. Cada pessoa tem de 1 a max_photos fotos, mais uma foto de consulta.
+def synthetic_people(persons, max_photos, seed=0, dimension=128):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(scale=0.0625, size=(persons, dimension)).astype(np.float32)
+    names, rows, queries, query_names = [], [], [], []
+    for person, center in enumerate(centers):
+        photos = int(rng.integers(1, max_photos + 1))
+        # Variação de iluminação/pose: um desvio por foto, com ruído em torno dele
+        samples = center + rng.normal(scale=0.025, size=(photos + 1, dimension)).astype(np.float32)
+        names.extend([str(person)] * photos)
+        rows.append(samples[:photos])
+        queries.append(samples[photos])
+        query_names.append(str(person))
+    return names, np.concatenate(rows), np.stack(queries), query_names
+
+
+# Galeria real a partir do cache de encodings: uma foto de cada pessoa com 2+ fotos vira consulta
+def cached_people(path_faces):
+    cache = EncodingCache(path_faces, lambda name: True)
+    files, matrix = cache.load_index()
+    if matrix is None:
+        raise SystemExit(f"Sem cache de encodings em {path_faces}; inicie o reconhecimento uma vez para criá-lo")
+    by_person = {}
+    for key, entry in sorted(files.items()):
+        if entry['row'] is not None:
+            person = key.split('/', 1)[0] if '/' in key else os.path.splitext(key)[0]
+            by_person.setdefault(person, []).append(entry['row'])
+    names, rows, queries, query_names = [], [], [], []
+    for person, person_rows in by_person.items():
+        if len(person_rows) > 1:
+            queries.append(matrix[person_rows[-1]])
+            query_names.append(person)
+            person_rows = person_rows[:-1]
+        names.extend([person] * len(person_rows))
+        rows.extend(matrix[row] for row in person_rows)
+    return names, np.asarray(rows, dtype=np.float32), np.asarray(queries, dtype=np.float32), query_names
+
+
+def evaluate(label, matcher, queries, query_names, threshold, batch, recheck=None):
+    start = time.perf_counter()
+    results = []
+    for offset in range(0, len(queries), batch):
+        results.extend(matcher.match(queries[offset:offset + batch], 1))
+    if recheck is not None:
+        compactor, raw_matrix = recheck
+        results = [[(candidates[0][0], compactor.raw_distance(candidates[0][0], query, raw_matrix))] for query, candidates in zip(queries, results)]
+    elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    names = [candidates[0][0] for candidates in results]
+    accepted = np.array([candidates[0][1] < threshold for candidates in results])
+    correct = np.array([name == truth for name, truth in zip(names, query_names)])
+    print(f"{label:>22} {len(matcher):>9} {elapsed_ms:>12.3f} {correct.mean():>9.3f} {(correct & accepted).mean():>12.3f}")
+    return names, accepted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Mede tamanho, latência e acurácia da galeria compactada contra a galeria completa.')
+    parser.add_argument('--faces', default=None, help='pasta de faces com cache de encodings (padrão: galeria sintética)')
+    parser.add_argument('--persons', type=int, default=5000)
+    parser.add_argument('--max-photos', type=int, default=10)
+    parser.add_argument('--exemplars', type=int, default=3)
+    parser.add_argument('--threshold', type=float, default=0.55, help='mesmo papel de DIS_FACE_ENCODING')
+    parser.add_argument('--batch', type=int, default=4, help='faces por frame consultadas juntas')
+    args = parser.parse_args(argv)
+
+    if args.faces:
+        names, matrix, queries, query_names = cached_people(args.faces)
+    else:
+        names, matrix, queries, query_names = synthetic_people(args.persons, args.max_photos)
+    if not len(queries):
+        print("Nenhuma pessoa com mais de uma foto para usar como consulta", file=sys.stderr)
+        return 1
+
+    compactor = GalleryCompactor(exemplars=args.exemplars)
+    start = time.perf_counter()
+    compact_names, compact_matrix = compactor.compact(names, matrix)
+    build_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    compactor.compact(names, matrix)
+    rebuild_ms = (time.perf_counter() - start) * 1000
+    print(f"{len(set(names))} pessoas, {matrix.shape[0]} fotos -> {compact_matrix.shape[0]} linhas; "
+          f"compactação {build_ms:.1f} ms, reconstrução sem mudanças {rebuild_ms:.1f} ms")
+
+    raw = FaceMatcher()
+    raw.set_gallery(matrix, names)
+    compact = FaceMatcher()
+    compact.set_gallery(compact_matrix, compact_names)
+
+    print(f"{'galeria':>22} {'linhas':>9} {'ms/consulta':>12} {'top-1':>9} {'aceitas ok':>12}")
+    raw_names, raw_accepted = evaluate('completa', raw, queries, query_names, args.threshold, args.batch)
+    for label, recheck in (('compactada', None), ('compactada + reverif.', (compactor, matrix))):
+        found, accepted = evaluate(label, compact, queries, query_names, args.threshold, args.batch, recheck)
+        agreement = np.mean([a == b for a, b in zip(found, raw_names)])
+        decisions = np.mean(accepted == raw_accepted)
+        print(f"{'':>22} concordância com a completa: identidade {agreement:.4f}, aceitação {decisions:.4f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import cv2 as cv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from detectors import DETECTOR_BACKENDS, get_detector  # noqa: E402
+from recognition import prepare_frame  # noqa: E402
+
+
+# Fotos com exatamente uma pessoa (as imagens cadastradas em faces/ servem): a taxa de detecção
+# mede o recall e detecções além da primeira contam como falsos positivos
+def load_images(folder, limit):
+    images = []
+    for filename in sorted(os.listdir(folder)):
+        if os.path.splitext(filename)[1].lower() in ('.jpg', '.jpeg', '.png'):
+            image = cv.imread(os.path.join(folder, filename))
+            if image is not None:
+                images.append(image)
+        if limit and len(images) >= limit:
+            break
+    return images
+
+
+def evaluate(detector, images, scale):
+    latencies = []
+    found = extra = 0
+    for image in images:
+        imgS = prepare_frame(image, scale)
+        start = time.perf_counter()
+        faces = detector.detect(imgS)
+        latencies.append(time.perf_counter() - start)
+        found += bool(faces)
+        extra += max(0, len(faces) - 1)
+    latencies = np.asarray(latencies) * 1000
+    return {
+        'recall': round(found / len(images), 3),
+        'false_positives_per_image': round(extra / len(images), 3),
+        'ms_median': round(float(np.median(latencies)), 2),
+        'ms_p95': round(float(np.percentile(latencies, 95)), 2),
+    }
+
+
+# Vazão com lotes de frames do mesmo tamanho (formato do frame da câmera)
+def batch_throughput(detector, images, batch_size, frame_size):
+    frames = [cv.cvtColor(cv.resize(image, frame_size, interpolation=cv.INTER_AREA), cv.COLOR_BGR2RGB) for image in images]
+    start = time.perf_counter()
+    for offset in range(0, len(frames), batch_size):
+        detector.detect_batch(frames[offset:offset + batch_size])
+    elapsed = time.perf_counter() - start
+    return round(len(frames) / elapsed, 1) if elapsed else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compara os detectores de faces: recall, falsos positivos e latência por escala.')
+    parser.add_argument('--images', default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'faces'),
+                        help='pasta com fotos de uma pessoa cada (padrão: faces/)')
+    parser.add_argument('--limit', type=int, default=200)
+    parser.add_argument('--backends', nargs='+', default=sorted(DETECTOR_BACKENDS), choices=sorted(DETECTOR_BACKENDS))
+    parser.add_argument('--scales', type=float, nargs='+', default=[0.5, 0.25, 0.125], help='escalas de detecção; escalas menores simulam rostos mais distantes')
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--frame-size', type=int, nargs=2, default=[320, 240], help='tamanho do frame reduzido no teste de lote')
+    parser.add_argument('--min-recall', type=float, default=0.95, help='recall mínimo para recomendar um backend')
+    parser.add_argument('--output', default='bench_detectors.json')
+    args = parser.parse_args(argv)
+
+    images = load_images(args.images, args.limit)
+    if not images:
+        print(f"Nenhuma imagem encontrada em {args.images}", file=sys.stderr)
+        return 1
+
+    report = {'images': len(images), 'results': {}}
+    print(f"{'backend':>8} {'escala':>7} {'recall':>7} {'fp/img':>7} {'ms med':>8} {'ms p95':>8}")
+    for name in args.backends:
+        try:
+            detector = get_detector(name)
+        except Exception as e:
+            print(f"{name:>8} indisponível: {str(e)}", file=sys.stderr)
+            continue
+        results = report['results'][name] = {'scales': {}}
+        for scale in args.scales:
+            result = results['scales'][str(scale)] = evaluate(detector, images, scale)
+            print(f"{name:>8} {scale:>7} {result['recall']:>7.3f} {result['false_positives_per_image']:>7.3f} {result['ms_median']:>8.2f} {result['ms_p95']:>8.2f}")
+        results['frames_per_second'] = batch_throughput(detector, images, 1, tuple(args.frame_size))
+        if detector.batchable:
+            results['frames_per_second_batched'] = batch_throughput(detector, images, args.batch_size, tuple(args.frame_size))
+            print(f"{name:>8} lote de {args.batch_size}: {results['frames_per_second_batched']} frames/s (sem lote: {results['frames_per_second']})")
+
+    # Recomendação por escala: o backend mais rápido que atinge o recall mínimo
+    report['recommendation'] = {}
+    for scale in args.scales:
+        candidates = [(results['scales'][str(scale)]['ms_median'], name) for name, results in report['results'].items()
+                      if results['scales'][str(scale)]['recall'] >= args.min_recall]
+        report['recommendation'][str(scale)] = min(candidates)[1] if candidates else None
+        print(f"escala {scale}: {report['recommendation'][str(scale)] or f'nenhum backend com recall >= {args.min_recall}'}")
+
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
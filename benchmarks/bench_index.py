@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from matcher import ExactIndex, IVFIndex  # noqa: E402
+
+
+# Galeria sintética parecida com encodings do dlib: vetores agrupados e normalizados
+def synthetic_gallery(size, dimension=128, seed=0):
+    rng = np.random.default_rng(seed)
+    clusters = rng.normal(size=(max(1, size // 50), dimension)).astype(np.float32)
+    gallery = clusters[rng.integers(0, clusters.shape[0], size)] + 0.6 * rng.normal(size=(size, dimension)).astype(np.float32)
+    gallery /= np.linalg.norm(gallery, axis=1, keepdims=True)
+    return gallery
+
+
+# Consultas = pessoas cadastradas com ruído, simulando uma nova foto da mesma pessoa
+def synthetic_queries(gallery, count, noise=0.03, seed=1):
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, gallery.shape[0], count)
+    queries = gallery[rows] + noise * rng.normal(size=(count, gallery.shape[1])).astype(np.float32)
+    return queries.astype(np.float32)
+
+
+def time_search(index, queries, batch):
+    start = time.perf_counter()
+    results = []
+    for offset in range(0, queries.shape[0], batch):
+        results.append(index.search(queries[offset:offset + batch], 1)[0][:, 0])
+    elapsed = time.perf_counter() - start
+    return np.concatenate(results), elapsed * 1000 / queries.shape[0]
+
+
+def run(sizes, queries_count, batch, nlist, nprobes):
+    print(f"{'galeria':>9} {'backend':>14} {'build ms':>9} {'ms/consulta':>12} {'recall@1':>9}")
+    for size in sizes:
+        gallery = synthetic_gallery(size)
+        queries = synthetic_queries(gallery, queries_count)
+
+        exact = ExactIndex()
+        start = time.perf_counter()
+        exact.build(gallery)
+        build_ms = (time.perf_counter() - start) * 1000
+        truth, latency = time_search(exact, queries, batch)
+        print(f"{size:>9} {'exact':>14} {build_ms:>9.1f} {latency:>12.3f} {1.0:>9.3f}")
+
+        ivf = IVFIndex(nlist=nlist, min_size=0)
+        start = time.perf_counter()
+        ivf.build(gallery)
+        build_ms = (time.perf_counter() - start) * 1000
+        for nprobe in nprobes:
+            ivf.nprobe = nprobe
+            found, latency = time_search(ivf, queries, batch)
+            recall = float(np.mean(found == truth))
+            print(f"{size:>9} {f'ivf nprobe={nprobe}':>14} {build_ms:>9.1f} {latency:>12.3f} {recall:>9.3f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compara a busca exata com o índice IVF: recall@1 e latência por consulta.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--batch', type=int, default=10, help='faces por frame consultadas juntas')
+    parser.add_argument('--nlist', type=int, default=None, help='número de listas IVF (padrão: sqrt da galeria)')
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 4, 8, 16])
+    args = parser.parse_args()
+    run(args.sizes, args.queries, args.batch, args.nlist, args.nprobe)
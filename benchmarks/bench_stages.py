@@ -0,0 +1,240 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+from datetime import datetime
+import numpy as np
+import cv2 as cv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from recognition import Recognition, prepare_frame, detect_and_encode  # noqa: E402
+from unknown_store import UnknownFaceStore  # noqa: E402
+from renderer import FrameRenderer  # noqa: E402
+from motion_gate import MotionGate  # noqa: E402
+from bench_index import synthetic_gallery, synthetic_queries  # noqa: E402
+
+NOISE_FLOOR_MS = 0.05  # Diferenças abaixo disso são ruído de medição, não regressão
+
+
+# Frame de teste: imagem informada (idealmente com rostos) ou ruído no tamanho da câmera
+def load_frame(path, width, height):
+    if path:
+        frame = cv.imread(path)
+        if frame is None:
+            raise SystemExit(f"Não foi possível abrir {path}")
+        return frame
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+# Recorte do primeiro rosto detectado no frame, ou o centro da imagem se não houver rosto
+def face_crop(frame, detector, scale=0.25):
+    faces, _ = detect_and_encode(prepare_frame(frame, scale), detector)
+    if faces:
+        top, right, bottom, left = [int(value / scale) for value in faces[0]]
+        return frame[top:bottom, left:right]
+    height, width = frame.shape[:2]
+    return frame[height // 4:3 * height // 4, width // 4:3 * width // 4]
+
+
+def summarize(samples):
+    samples = np.asarray(samples) * 1000
+    return {
+        'runs': int(samples.size),
+        'mean_ms': round(float(samples.mean()), 4),
+        'median_ms': round(float(np.median(samples)), 4),
+        'p95_ms': round(float(np.percentile(samples, 95)), 4),
+        'min_ms': round(float(samples.min()), 4),
+    }
+
+
+def measure(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+class StageBenchmark:
+    def __init__(self, args):
+        self.args = args
+        self.results = {}
+        self.workdir = tempfile.mkdtemp(prefix='bench_stages_')
+        for folder in ('faces', 'recognized', 'unrecognized'):
+            os.makedirs(os.path.join(self.workdir, folder))
+        self.recognition = Recognition(
+            path_faces=os.path.join(self.workdir, 'faces'),
+            save_path_recognized=os.path.join(self.workdir, 'recognized'),
+            save_path_unrecognized=os.path.join(self.workdir, 'unrecognized'),
+            persons_path=os.path.join(self.workdir, 'persons.json'),
+            attendance_db=os.path.join(self.workdir, 'attendance.db'),
+            detector=args.detector,
+            motion_gate=False,  # O frame repetido fecharia o gate e os estágios mediriam só a miniatura
+        )
+        self.frame = load_frame(args.frame, args.width, args.height)
+        self.crop = face_crop(self.frame, args.detector)
+
+    def record(self, stage, result):
+        self.results[stage] = result
+        print(f"{stage:<45} {result['median_ms']:>10.3f} {result['p95_ms']:>10.3f} {result['mean_ms']:>10.3f}", file=sys.stderr)
+
+    def bench_detection(self):
+        for scale in self.args.scales:
+            self.record(f'process_current_frame[scale={scale}]',
+                        measure(lambda: detect_and_encode(prepare_frame(self.frame, scale), self.args.detector), self.args.repeat))
+        self.record('find_encodings[crop]', measure(lambda: self.recognition.find_encodings([self.crop]), self.args.repeat))
+        # Custo do pré-filtro de movimento, pago em todos os frames (inclusive nos que ele descarta)
+        gate = MotionGate()
+        self.record('motion_gate.check', measure(lambda: gate.check(self.frame), self.args.repeat))
+
+    def bench_liveness(self):
+        self.record('is_fake_via_texture', measure(lambda: self.recognition.is_fake_via_texture(self.crop), self.args.repeat))
+        self.record('has_reflection', measure(lambda: self.recognition.has_reflection(self.crop), self.args.repeat))
+        # Passada única sobre o recorte normalizado, com e sem o cache por face
+        checker = self.recognition.liveness
+        self.record('liveness.measure', measure(lambda: checker.measure(self.crop), self.args.repeat))
+        self.record('liveness.check[cache]', measure(lambda: checker.check('bench', self.crop), self.args.repeat))
+
+    # Matching de um frame com várias faces contra galerias sintéticas de tamanhos diferentes
+    def bench_matching(self):
+        matcher = self.recognition.matcher
+        for size in self.args.gallery_sizes:
+            gallery = synthetic_gallery(size)
+            queries = synthetic_queries(gallery, self.args.faces_per_frame)
+            matcher.set_gallery(gallery, [str(row) for row in range(size)])
+            self.record(f'match[gallery={size}]', measure(lambda: matcher.match(queries, self.recognition.MATCH_TOP_K), self.args.repeat))
+        matcher.set_gallery([], [])
+
+    def bench_unknown(self):
+        rng = np.random.default_rng(2)
+        for size in self.args.unknown_sizes:
+            store = UnknownFaceStore(max_entries=size)
+            # Vetores aleatórios normalizados ficam a ~1.4 entre si: cada um vira um desconhecido distinto
+            encodings = rng.normal(size=(size, 128)).astype(np.float32)
+            encodings /= np.linalg.norm(encodings, axis=1, keepdims=True)
+            for encoding in encodings:
+                store.lookup(encoding, True)
+            self.recognition.unknown_store = store
+            query = rng.normal(size=128).astype(np.float32)
+            self.record(f'check_or_update_unrecognized[unknown={size}]',
+                        measure(lambda: self.recognition.check_or_update_unrecognized(query, False), self.args.repeat))
+
+    def bench_attendance(self):
+        attendance = self.recognition.attendance
+        marked = 0
+        for size in self.args.attendance_sizes:
+            now = datetime.now()
+            for index in range(marked, size):
+                attendance.mark(f'PESSOA{index}', 0.4, now)
+            marked = max(marked, size)
+            # Caminho comum do loop: a pessoa já está presente e a distância não melhorou
+            self.record(f'mark_attendance[present={size}]',
+                        measure(lambda: self.recognition.mark_attendance(f'PESSOA{size // 2}', 0.5), self.args.repeat))
+
+    # Codificação do frame exibido (Interface.update_camera); alterna dois frames para não usar o cache
+    def bench_render(self):
+        renderer = FrameRenderer()
+        frames = [self.frame, self.frame.copy()]
+        state = {'turn': 0}
+
+        def encode():
+            state['turn'] ^= 1
+            renderer.set_frame(frames[state['turn']])
+            renderer.encode(640, 480)
+
+        self.record('update_camera[encode 640x480]', measure(encode, self.args.repeat))
+
+    def bench_end_to_end(self):
+        matcher = self.recognition.matcher
+        size = max(self.args.gallery_sizes)
+        gallery = synthetic_gallery(size)
+        matcher.set_gallery(gallery, [str(row) for row in range(size)])
+        self.record(f'init_face_recognition[gallery={size}]',
+                    measure(lambda: self.recognition.init_face_recognition(self.frame.copy()), self.args.repeat))
+
+    def run(self):
+        print(f"{'etapa':<45} {'mediana ms':>10} {'p95 ms':>10} {'média ms':>10}", file=sys.stderr)
+        try:
+            for stage in self.args.stages:
+                getattr(self, f'bench_{stage}')()
+        finally:
+            self.recognition.close()
+            shutil.rmtree(self.workdir, ignore_errors=True)
+        return {
+            'meta': {
+                'timestamp': datetime.now().isoformat(sep=' ', timespec='seconds'),
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'processor': platform.processor(),
+                'cpus': os.cpu_count(),
+                'numpy': np.__version__,
+                'opencv': cv.__version__,
+                'frame': self.args.frame or f'sintético {self.args.width}x{self.args.height}',
+                'repeat': self.args.repeat,
+            },
+            'results': self.results,
+        }
+
+
+# Etapas cuja mediana piorou além da tolerância em relação ao baseline
+def compare(report, baseline, tolerance):
+    regressions = []
+    for stage, result in report['results'].items():
+        reference = baseline['results'].get(stage)
+        if reference is None:
+            continue
+        current, previous = result['median_ms'], reference['median_ms']
+        ratio = current / previous if previous else float('inf')
+        result['baseline_median_ms'] = previous
+        result['ratio'] = round(ratio, 3)
+        if current - previous > NOISE_FLOOR_MS and ratio > 1 + tolerance:
+            regressions.append((stage, previous, current, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Mede cada etapa do reconhecimento isoladamente e em conjunto, sem câmera.')
+    parser.add_argument('--frame', default=None, help='imagem usada como frame (padrão: ruído sintético; use uma foto com rostos)')
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--detector', default='hog', help='backend de detecção (hog, cnn, cascade)')
+    parser.add_argument('--stages', nargs='+', default=['detection', 'liveness', 'matching', 'unknown', 'attendance', 'render', 'end_to_end'],
+                        choices=['detection', 'liveness', 'matching', 'unknown', 'attendance', 'render', 'end_to_end'])
+    parser.add_argument('--scales', type=float, nargs='+', default=[0.25, 0.5])
+    parser.add_argument('--gallery-sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--faces-per-frame', type=int, default=4)
+    parser.add_argument('--unknown-sizes', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--attendance-sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--output', default='bench_stages.json', help='arquivo JSON com os resultados')
+    parser.add_argument('--baseline', default=None, help='JSON de uma execução anterior para comparação')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='piora relativa aceita antes de acusar regressão')
+    args = parser.parse_args(argv)
+
+    report = StageBenchmark(args).run()
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = compare(report, baseline, args.tolerance)
+        report['regressions'] = [stage for stage, _, _, _ in regressions]
+        for stage, previous, current, ratio in regressions:
+            print(f"REGRESSÃO {stage}: {previous:.3f} ms -> {current:.3f} ms ({ratio:.2f}x)", file=sys.stderr)
+        if not regressions:
+            print(f"Nenhuma regressão acima de {args.tolerance:.0%} em relação a {args.baseline}", file=sys.stderr)
+
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2, ensure_ascii=False)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import os
+import sys
+import json
+import argparse
+import numpy as np
+import cv2 as cv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from detectors import get_detector  # noqa: E402
+from recognition import crop_face  # noqa: E402
+from liveness import LivenessChecker  # noqa: E402
+
+PERCENTILES = (5, 50, 95, 99)
+
+
+def load_images(folder, limit):
+    images = []
+    for root, _, filenames in sorted(os.walk(folder)):
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower() in ('.jpg', '.jpeg', '.png'):
+                image = cv.imread(os.path.join(root, filename))
+                if image is not None:
+                    images.append(image)
+            if limit and len(images) >= limit:
+                return images
+    return images
+
+
+# (textura, brilho) do LivenessChecker para o recorte expandido de cada face detectada
+def measure_faces(images, detector, checker, expand_ratio):
+    values = []
+    for image in images:
+        rgb = cv.cvtColor(image, cv.COLOR_BGR2RGB)
+        for top, right, bottom, left in detector.detect(rgb):
+            face_image = crop_face(image, top, right, bottom, left, expand_ratio)
+            if face_image.size:
+                values.append(checker.measure(face_image))
+    return np.asarray(values, dtype=np.float64).reshape(-1, 2)
+
+
+# Percentis das métricas e fração das faces que passam nos limiares
+def summarize(values, threshold_texture, threshold_reflection):
+    passed = (values[:, 0] <= threshold_texture) & (values[:, 1] <= threshold_reflection)
+    return {
+        'faces': len(values),
+        'texture': {f"p{p}": round(float(np.percentile(values[:, 0], p)), 1) for p in PERCENTILES},
+        'brightness': {f"p{p}": round(float(np.percentile(values[:, 1], p)), 1) for p in PERCENTILES},
+        'pass_rate': round(float(passed.mean()), 3),
+    }
+
+
+# As métricas do recorte normalizado não têm razão fixa com as antigas (a textura varia com o tamanho
+# original da face), então os limiares são escolhidos pela distribuição medida em fotos reais e falsas
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Distribuição das métricas de liveness (recorte normalizado) em fotos reais e falsas.')
+    parser.add_argument('--images', default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'faces'),
+                        help='pasta com fotos de pessoas reais (padrão: faces/)')
+    parser.add_argument('--spoof-images', default=None, help='pasta opcional com fotos de telas/impressões')
+    parser.add_argument('--limit', type=int, default=200)
+    parser.add_argument('--detector', default='hog')
+    parser.add_argument('--expand-ratio', type=float, default=0.25)
+    parser.add_argument('--threshold-texture', type=float, default=140)
+    parser.add_argument('--threshold-reflection', type=float, default=180)
+    parser.add_argument('--output', default='calibrate_liveness.json')
+    args = parser.parse_args(argv)
+
+    detector = get_detector(args.detector)
+    checker = LivenessChecker()
+    report = {'threshold_texture': args.threshold_texture, 'threshold_reflection': args.threshold_reflection}
+    for label, folder in (('live', args.images), ('spoof', args.spoof_images)):
+        if not folder:
+            continue
+        values = measure_faces(load_images(folder, args.limit), detector, checker, args.expand_ratio)
+        if not len(values):
+            print(f"Nenhuma face encontrada em {folder}", file=sys.stderr)
+            continue
+        result = report[label] = summarize(values, args.threshold_texture, args.threshold_reflection)
+        print(f"{label:>5}: {result['faces']} faces; textura {result['texture']}; brilho {result['brightness']}; "
+              f"{100 * result['pass_rate']:.1f}% passam")
+    if 'live' not in report:
+        return 1
+
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import os
+import re
+import sys
+import json
+import time
+import glob
+import logging
+import threading
+import cv2 as cv  # OpenCV para testar as câmeras
+
+VIDEO_DEVICE_PATTERN = re.compile(r'/dev/video(\d+)$')
+
+
+# Dispositivos de vídeo presentes no sistema; só o Linux expõe essa lista sem abrir as câmeras
+def device_signature():
+    if not sys.platform.startswith('linux'):
+        return None
+    return sorted(glob.glob('/dev/video*'))
+
+
+# Índices a testar: no Linux só os /dev/videoN existentes (abrir um índice ausente pode travar por segundos)
+def candidate_indexes(max_index=5):
+    devices = device_signature()
+    if devices is None:
+        return list(range(max_index))
+    indexes = [int(match.group(1)) for match in map(VIDEO_DEVICE_PATTERN.match, devices) if match]
+    return sorted(indexes)[:max_index * 2]  # Webcams USB costumam criar dois nós (vídeo e metadados)
+
+
+def probe_camera(index):
+    cap = cv.VideoCapture(index)
+    try:
+        return cap.isOpened() and cap.read()[0]
+    finally:
+        cap.release()
+
+
+# Enumeração das câmeras em uma thread, com o resultado guardado entre execuções.
+# A lista em cache é usada na abertura da janela; uma nova busca só acontece quando pedida
+# (botão de atualizar) ou quando o conjunto de dispositivos muda (hot-plug).
+class CameraDiscovery:
+    def __init__(self, cache_path, max_index=5, poll_interval=3.0):
+        self.cache_path = cache_path
+        self.max_index = max_index
+        self.poll_interval = poll_interval
+        self.thread = None
+        self.last_poll = 0.0
+        self.signature = None
+        self.cameras = []  # [(índice, nome)]
+        self.cached = self.load_cache()
+
+    # Lista salva na última busca; None se não houver cache ou se os dispositivos mudaram desde então
+    def load_cache(self):
+        try:
+            with open(self.cache_path, 'r') as file:
+                data = json.load(file)
+            self.signature = data.get('devices')
+            self.cameras = [tuple(camera) for camera in data.get('cameras', [])]
+            return self.signature == device_signature()
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logging.error(f"Erro ao ler o cache de câmeras: {str(e)}")
+            return False
+
+    def save_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = self.cache_path + '.tmp'
+            with open(tmp_path, 'w') as file:
+                json.dump({'devices': self.signature, 'cameras': self.cameras, 'updated_at': time.time()}, file)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logging.error(f"Erro ao salvar o cache de câmeras: {str(e)}")
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    # Inicia a busca em segundo plano; on_done(cameras) é chamado na thread da busca.
+    # in_use é a câmera já aberta pela aplicação: ela não é reaberta, só mantida na lista.
+    def refresh(self, on_done, in_use=None):
+        if self.running:
+            return False
+        self.thread = threading.Thread(target=self.discover, args=(on_done, in_use), name='camera-discovery', daemon=True)
+        self.thread.start()
+        return True
+
+    def discover(self, on_done, in_use=None):
+        try:
+            signature = device_signature()
+            cameras = []
+            for index in candidate_indexes(self.max_index):
+                if index == in_use or probe_camera(index):
+                    cameras.append((index, f"Camera {index}"))
+            self.signature = signature
+            self.cameras = cameras
+            self.cached = True
+            self.save_cache()
+        except Exception as e:
+            logging.error(f"Erro ao listar as câmeras: {str(e)}")
+        on_done(list(self.cameras))
+
+    # Verificação barata de hot-plug, no máximo a cada poll_interval segundos: True se os dispositivos mudaram
+    def devices_changed(self, now=None):
+        now = time.monotonic() if now is None else now
+        if now - self.last_poll < self.poll_interval:
+            return False
+        self.last_poll = now
+        signature = device_signature()
+        return signature is not None and signature != self.signature
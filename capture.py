@@ -0,0 +1,132 @@
+import threading
+import time
+import logging
+from collections import deque
+import cv2 as cv  # OpenCV para captura de vídeo
+
+
+class CameraCapture:
+    def __init__(self, camera_index=0, width=1280, height=720, fourcc='MJPG', buffer_size=1, ring_size=2, open_timeout=2.0):
+        self.camera_index = camera_index
+        self.width = width
+        self.height = height
+        self.fourcc = fourcc
+        self.buffer_size = buffer_size
+        self.open_timeout = open_timeout
+
+        self.cap = None
+        self.thread = None
+        self.running = False
+        self.lock = threading.Lock()
+        self.new_frame = threading.Event()
+
+        # Ring buffer com os frames mais recentes; frames antigos são descartados automaticamente
+        self.frames = deque(maxlen=ring_size)
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.read_errors = 0
+        self.last_read_seq = -1
+
+    # Abre a câmera uma única vez e inicia a thread de leitura
+    def start(self):
+        try:
+            self.cap = cv.VideoCapture(self.camera_index)
+            if not self.cap.isOpened():
+                self.cap.release()
+                self.cap = None
+                return False
+            self.configure()
+            self.running = True
+            self.thread = threading.Thread(target=self.reader, name=f"camera-{self.camera_index}", daemon=True)
+            self.thread.start()
+
+            # Aguarda o primeiro frame para que o chamador nunca receba um buffer vazio
+            if not self.new_frame.wait(self.open_timeout):
+                logging.error(f"Câmera {self.camera_index} não entregou frames em {self.open_timeout}s")
+                self.stop()
+                return False
+            return True
+        except Exception as e:
+            logging.error(f"Erro ao inicializar a câmera {self.camera_index}: {str(e)}")
+            self.stop()
+            return False
+
+    # Define resolução, FOURCC e tamanho do buffer do driver antes da primeira leitura
+    def configure(self):
+        if self.fourcc:
+            self.cap.set(cv.CAP_PROP_FOURCC, cv.VideoWriter_fourcc(*self.fourcc))
+        if self.width and self.height:
+            self.cap.set(cv.CAP_PROP_FRAME_WIDTH, self.width)
+            self.cap.set(cv.CAP_PROP_FRAME_HEIGHT, self.height)
+        if self.buffer_size:
+            self.cap.set(cv.CAP_PROP_BUFFERSIZE, self.buffer_size)
+
+    # Loop da thread: lê continuamente e mantém apenas os frames mais novos
+    def reader(self):
+        max_errors = 30
+        while self.running:
+            success, frame = self.cap.read()
+            if not success:
+                self.read_errors += 1
+                if self.read_errors >= max_errors:
+                    logging.error(f"Câmera {self.camera_index} parou de responder")
+                    self.running = False
+                    break
+                time.sleep(0.01)
+                continue
+            self.read_errors = 0
+            with self.lock:
+                self.frames_captured += 1
+                self.frames.append((self.frames_captured, time.monotonic(), frame))
+            self.new_frame.set()
+
+    # Retorna o frame mais recente sem bloquear, no mesmo formato de cv.VideoCapture.read()
+    def read(self):
+        with self.lock:
+            if not self.frames:
+                return False, None
+            seq, _, frame = self.frames[-1]
+            if seq != self.last_read_seq:
+                if self.last_read_seq >= 0:
+                    # Frames que chegaram e foram substituídos antes de serem consumidos
+                    self.frames_dropped += max(0, seq - self.last_read_seq - 1)
+                self.last_read_seq = seq
+            self.new_frame.clear()
+        # Cópia para que desenhos do consumidor não alterem o frame guardado no buffer
+        return True, frame.copy()
+
+    # Idade (em segundos) do frame mais recente
+    def frame_age(self):
+        with self.lock:
+            if not self.frames:
+                return None
+            return time.monotonic() - self.frames[-1][1]
+
+    def latest_seq(self):
+        with self.lock:
+            return self.frames[-1][0] if self.frames else -1
+
+    def stats(self):
+        age = self.frame_age()
+        return {
+            'camera_index': self.camera_index,
+            'frames_captured': self.frames_captured,
+            'frames_dropped': self.frames_dropped,
+            'frame_age_ms': round(age * 1000, 1) if age is not None else None,
+        }
+
+    def isOpened(self):
+        return self.running and self.cap is not None and self.cap.isOpened()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+        self.thread = None
+        if self.cap is not None:
+            self.cap.release()
+        self.cap = None
+
+    # Mantém compatibilidade com a API de cv.VideoCapture
+    def release(self):
+        self.stop()
@@ -0,0 +1,102 @@
+import hashlib
+import numpy as np
+
+
+# Reduz os modelos de uma pessoa a centróide + até `exemplars` exemplares diversos, escolhidos por
+# amostragem do ponto mais distante (cada novo exemplar é o modelo mais longe dos já escolhidos).
+# Com poucos modelos a compactação não ganha nada e os modelos originais são mantidos.
+def compact_templates(templates, exemplars=3):
+    templates = np.asarray(templates, dtype=np.float32)
+    if templates.shape[0] <= exemplars + 1:
+        return templates
+    centroid = templates.mean(axis=0)
+    chosen = [centroid]
+    nearest = np.linalg.norm(templates - centroid, axis=1)
+    for _ in range(exemplars):
+        index = int(np.argmax(nearest))
+        chosen.append(templates[index])
+        nearest = np.minimum(nearest, np.linalg.norm(templates - templates[index], axis=1))
+    return np.stack(chosen)
+
+
+# id da pessoa -> índices das suas linhas na galeria original (um nome por linha)
+def group_rows(names):
+    rows = {}
+    for row, name in enumerate(names):
+        rows.setdefault(name, []).append(row)
+    return {name: np.asarray(indexes, dtype=np.int64) for name, indexes in rows.items()}
+
+
+# Menor distância entre a encoding e todos os modelos originais da pessoa (None se ela não está em raw_rows)
+def raw_distance(raw_rows, name, encoding, matrix):
+    rows = raw_rows.get(name)
+    if rows is None or not len(rows):
+        return None
+    return float(np.linalg.norm(np.asarray(matrix)[rows] - np.asarray(encoding, dtype=np.float32), axis=1).min())
+
+
+# Galeria compactada por pessoa, com custo de matching fixo por pessoa. Reconstrução incremental:
+# só as pessoas cujo conjunto de modelos mudou (assinatura dos bytes) são recompactadas.
+class GalleryCompactor:
+    def __init__(self, exemplars=3, dimension=128):
+        self.exemplars = exemplars
+        self.dimension = dimension
+        self.cache = {}  # id da pessoa -> (assinatura, linhas compactadas)
+        self.raw_rows = {}  # id da pessoa -> índices das linhas originais, para a reverificação
+        self.stats = {'persons': 0, 'recompacted': 0, 'raw_rows': 0, 'compact_rows': 0}
+
+    @staticmethod
+    def signature(templates):
+        return hashlib.sha1(np.ascontiguousarray(templates, dtype=np.float32).tobytes()).hexdigest()
+
+    # Retorna (nomes, matriz) compactados a partir da galeria original (um nome por linha)
+    def compact(self, names, matrix):
+        matrix = np.asarray(matrix, dtype=np.float32).reshape(-1, self.dimension)
+        raw_rows = group_rows(names)  # Atribuído só no fim: quem lê self.raw_rows nunca vê um dicionário pela metade
+
+        recompacted = 0
+        cache = {}
+        compact_names = []
+        blocks = []
+        for name, rows in raw_rows.items():
+            templates = matrix[rows]
+            signature = self.signature(templates)
+            cached = self.cache.get(name)
+            if cached is None or cached[0] != signature:
+                cached = (signature, compact_templates(templates, self.exemplars))
+                recompacted += 1
+            cache[name] = cached
+            blocks.append(cached[1])
+            compact_names.extend([name] * cached[1].shape[0])
+        self.cache = cache  # Pessoas removidas saem do cache
+        self.raw_rows = raw_rows
+
+        compact_matrix = np.concatenate(blocks) if blocks else np.empty((0, self.dimension), dtype=np.float32)
+        self.stats = {'persons': len(cache), 'recompacted': recompacted, 'raw_rows': matrix.shape[0], 'compact_rows': compact_matrix.shape[0]}
+        return compact_names, compact_matrix
+
+    # Menor distância entre a encoding e todos os modelos originais da pessoa. raw_rows permite usar
+    # o mapeamento da mesma geração que a matriz, guardado junto com ela por quem chama
+    def raw_distance(self, name, encoding, matrix, raw_rows=None):
+        return raw_distance(self.raw_rows if raw_rows is None else raw_rows, name, encoding, matrix)
+
+
+# Reverificação nos workers (multi-câmera, lote), que recebem a galeria compactada: a galeria original
+# é publicada à parte e anexada por `reader` (SharedGalleryReader). Chamada com (nome, encoding).
+class RawRecheck:
+    def __init__(self, reader):
+        self.reader = reader
+        self.raw_rows = {}
+
+    def refresh(self):
+        if self.reader.refresh():
+            self.raw_rows = group_rows(list(self.reader.names))
+            return True
+        return False
+
+    def __call__(self, name, encoding):
+        return raw_distance(self.raw_rows, name, encoding, self.reader.matrix)
+
+    def close(self):
+        self.raw_rows = {}
+        self.reader.close()
@@ -0,0 +1,79 @@
+import math
+from collections import deque
+
+
+# Escolhe a redução do frame antes da detecção. Fixa por padrão; no modo adaptativo usa o menor
+# rosto visto nos últimos frames (alvo: target_face_px na imagem reduzida) e um orçamento de
+# latência por frame, estimando o custo da detecção como proporcional à área (escala²).
+class AdaptiveScale:
+    def __init__(self, scale=0.25, adaptive=False, min_scale=0.2, max_scale=0.6, budget=0.08, target_face_px=60, step=0.05, history=30, probe_interval=30):
+        self.base_scale = scale  # Escala configurada; usada quando não há rostos recentes
+        self.scale = scale
+        self.adaptive = adaptive
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.budget = budget  # Segundos de detecção por frame
+        self.target_face_px = target_face_px  # O HOG do dlib encontra rostos a partir de ~40 px
+        self.step = step  # Mudanças menores que meio passo são ignoradas (histerese)
+        self.history = deque(maxlen=history)  # Menor altura de rosto por frame (resolução original) ou None
+        self.probe_interval = probe_interval  # Frames sem rostos até uma detecção na maior escala possível
+        self.frames_without_faces = 0
+        self.cost = None  # Segundos de detecção por unidade de escala², média móvel
+
+    def set_base_scale(self, scale):
+        self.base_scale = scale
+        self.scale = scale
+
+    def set_adaptive(self, adaptive):
+        self.adaptive = adaptive
+        if not adaptive:
+            self.scale = self.base_scale
+        self.history.clear()
+        self.frames_without_faces = 0
+
+    # Maior escala cuja detecção cabe no orçamento, pela estimativa atual de custo
+    def affordable(self):
+        if not self.cost:
+            return self.max_scale
+        return max(self.min_scale, min(self.max_scale, math.sqrt(self.budget / self.cost)))
+
+    # Escala do próximo frame. Sem rostos por probe_interval frames, um frame é analisado na maior
+    # escala que o orçamento permite, para encontrar quem está longe da câmera.
+    def next_scale(self, probe=True):
+        if not self.adaptive:
+            return self.scale
+        if probe and self.frames_without_faces >= self.probe_interval:
+            self.frames_without_faces = 0
+            return round(self.affordable(), 2)
+        return self.scale
+
+    # face_heights na resolução original; elapsed = tempo de detecção do frame na escala usada
+    def update(self, scale, face_heights, elapsed):
+        sample = elapsed / (scale * scale)
+        self.cost = sample if self.cost is None else 0.8 * self.cost + 0.2 * sample
+        if not self.adaptive:
+            return self.scale
+        if face_heights:
+            self.history.append(min(face_heights))
+            self.frames_without_faces = 0
+        else:
+            self.history.append(None)
+            self.frames_without_faces += 1
+        self.scale = self.choose()
+        return self.scale
+
+    def choose(self):
+        heights = [height for height in self.history if height is not None]
+        wanted = self.target_face_px / min(heights) if heights else self.base_scale
+        limit = self.affordable()
+        wanted = max(self.min_scale, min(wanted, limit))
+        if abs(wanted - self.scale) < self.step / 2:
+            return self.scale
+        scale = round(wanted / self.step) * self.step
+        if scale > limit:
+            scale = math.floor(limit / self.step) * self.step  # Nunca arredonda para cima do orçamento
+        return round(max(self.min_scale, scale), 2)
+
+    def stats(self):
+        return {'scale': self.scale, 'adaptive': self.adaptive,
+                'detection_ms_estimate': round(1000 * self.cost * self.scale * self.scale, 1) if self.cost else None}
@@ -0,0 +1,96 @@
+import os
+import logging
+import cv2 as cv  # OpenCV para o detector cascade
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MMOD_MODEL_PATH = os.path.join(BASE_DIR, 'models', 'mmod_human_face_detector.dat')
+
+
+# Interface comum dos detectores: recebem uma imagem RGB e retornam [(top, right, bottom, left)],
+# o mesmo formato de fr.face_locations. Backends com suporte a lote sobrescrevem detect_batch.
+class FaceDetector:
+    name = None
+    batchable = False
+
+    def detect(self, image):
+        raise NotImplementedError
+
+    def detect_batch(self, images):
+        return [self.detect(image) for image in images]
+
+
+# HOG do dlib (padrão histórico do projeto): rápido em CPU, perde rostos de perfil e pequenos
+class HOGDetector(FaceDetector):
+    name = 'hog'
+
+    def __init__(self, upsample=1):
+        self.upsample = upsample
+
+    def detect(self, image):
+        import face_recognition as fr  # HOG do dlib; importado no primeiro uso, não na abertura da interface
+        return fr.face_locations(image, self.upsample, model='hog')
+
+
+# CNN MMOD do dlib com o modelo incluído em models/: mais preciso, caro em CPU, processa vários
+# frames de mesmo tamanho em uma única chamada (vantajoso com CUDA)
+class CNNDetector(FaceDetector):
+    name = 'cnn'
+    batchable = True
+
+    def __init__(self, model_path=MMOD_MODEL_PATH, upsample=1, batch_size=8):
+        import dlib  # Já é dependência do face_recognition
+        self.net = dlib.cnn_face_detection_model_v1(model_path)
+        self.upsample = upsample
+        self.batch_size = batch_size
+
+    @staticmethod
+    def to_css(rect, shape):
+        return max(rect.top(), 0), min(rect.right(), shape[1]), min(rect.bottom(), shape[0]), max(rect.left(), 0)
+
+    def detect(self, image):
+        return [self.to_css(detection.rect, image.shape) for detection in self.net(image, self.upsample)]
+
+    def detect_batch(self, images):
+        if len(images) < 2 or len({image.shape for image in images}) > 1:
+            return super().detect_batch(images)  # O dlib só aceita lotes de imagens do mesmo tamanho
+        batches = self.net(list(images), self.upsample, batch_size=self.batch_size)
+        return [[self.to_css(detection.rect, image.shape) for detection in detections] for image, detections in zip(images, batches)]
+
+
+# Haar cascade do OpenCV: o mais barato, mais falsos positivos; útil em máquinas muito fracas
+class CascadeDetector(FaceDetector):
+    name = 'cascade'
+
+    def __init__(self, cascade_path=None, scale_factor=1.1, min_neighbors=5, min_size=(20, 20)):
+        cascade_path = cascade_path or os.path.join(cv.data.haarcascades, 'haarcascade_frontalface_default.xml')
+        self.cascade = cv.CascadeClassifier(cascade_path)
+        if self.cascade.empty():
+            raise ValueError(f"Não foi possível carregar o cascade {cascade_path}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+
+    def detect(self, image):
+        gray = cv.cvtColor(image, cv.COLOR_RGB2GRAY) if image.ndim == 3 else image
+        boxes = self.cascade.detectMultiScale(gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors, minSize=self.min_size)
+        return [(int(y), int(x + w), int(y + h), int(x)) for x, y, w, h in boxes]
+
+
+DETECTOR_BACKENDS = {detector.name: detector for detector in (HOGDetector, CNNDetector, CascadeDetector)}
+
+# Um detector por backend em cada processo: o modelo CNN é carregado uma única vez por worker
+detector_cache = {}
+
+
+def get_detector(name='hog'):
+    detector = detector_cache.get(name)
+    if detector is None:
+        if name not in DETECTOR_BACKENDS:
+            raise ValueError(f"Detector desconhecido: {name} (opções: {', '.join(DETECTOR_BACKENDS)})")
+        try:
+            detector = DETECTOR_BACKENDS[name]()
+        except Exception as e:
+            logging.error(f"Erro ao carregar o detector {name}: {str(e)}")
+            raise
+        detector_cache[name] = detector
+    return detector
@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# Lock exclusivo entre processos (e entre threads, cada uma com o próprio descritor) sobre um arquivo
+@contextmanager
+def file_lock(path):
+    with open(path, 'a+b') as file:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    file.seek(0)
+                    msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK desiste após ~10 s; continua esperando
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class EncodingCache:
+    MATRIX_FILE = '.encodings.npy'  # Nome usado por caches antigos, antes das matrizes versionadas
+    MATRIX_PREFIX = '.encodings.'
+    INDEX_FILE = '.encodings.json'
+    LOCK_FILE = '.encodings.lock'
+
+    def __init__(self, path_faces, is_image_file, dimension=128):
+        self.path_faces = path_faces
+        self.is_image_file = is_image_file
+        self.dimension = dimension
+        self.matrix_path = os.path.join(path_faces, self.MATRIX_FILE)  # Matriz apontada pelo índice atual
+        self.index_path = os.path.join(path_faces, self.INDEX_FILE)
+        # A mesma pasta é usada pela importação, pela interface e por processos headless/multicam/batch:
+        # a leitura do índice + abertura da matriz e a troca do índice + limpeza passam por esse lock
+        self.lock_path = os.path.join(path_faces, self.LOCK_FILE)
+        self.stats = {'reused': 0, 'encoded': 0, 'removed': 0, 'failed': 0}
+        self.rejected = {}  # caminho relativo -> motivo, das imagens sem encoding válida
+
+    # Hash do conteúdo, usado apenas quando tamanho/mtime mudaram
+    def file_hash(self, path):
+        sha = hashlib.sha1()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                sha.update(chunk)
+        return sha.hexdigest()
+
+    # Mapeia a matriz em memória; matrizes vazias não podem ser mapeadas e são lidas normalmente.
+    # A galeria em uso continua apontando para esse arquivo, por isso ele nunca é sobrescrito.
+    def open_matrix(self):
+        try:
+            return np.load(self.matrix_path, mmap_mode='r')
+        except ValueError:
+            return np.load(self.matrix_path)
+
+    def load_index(self):
+        try:
+            with file_lock(self.lock_path):
+                with open(self.index_path, 'r') as file:
+                    index = json.load(file)
+                self.matrix_path = os.path.join(self.path_faces, os.path.basename(index.get('matrix', self.MATRIX_FILE)))
+                matrix = self.open_matrix()
+            if matrix.ndim != 2 or matrix.shape[1] != self.dimension:
+                raise ValueError(f"formato inesperado {matrix.shape}")
+            return index.get('files', {}), matrix
+        except FileNotFoundError:
+            return {}, None
+        except Exception as e:
+            logging.error(f"Cache de encodings inválido, recriando: {str(e)}")
+            return {}, None
+
+    # Cada versão da matriz vai para um arquivo novo e só o índice é trocado de forma atômica: a matriz
+    # anterior pode continuar mapeada pela galeria em uso (no Windows, substituí-la falharia)
+    # A matriz é gravada fora do lock em um temporário (fora do padrão da limpeza) e só recebe o nome
+    # versionado com o lock, junto com a troca do índice: as gerações ficam em ordem de publicação.
+    def save(self, files, matrix):
+        tmp_matrix = os.path.join(self.path_faces, f"{self.MATRIX_PREFIX}{os.getpid()}.{id(self)}.tmp")  # Temporários por gravador
+        tmp_index = f"{self.index_path}.{os.getpid()}.{id(self)}.tmp"
+        with open(tmp_matrix, 'wb') as file:
+            np.save(file, matrix)
+        with file_lock(self.lock_path):
+            previous = self.indexed_matrix()
+            generation = max(time.time_ns(), self.matrix_generation(previous) + 1 if previous else 0)
+            matrix_path = os.path.join(self.path_faces, f"{self.MATRIX_PREFIX}{generation}.npy")
+            os.replace(tmp_matrix, matrix_path)
+            with open(tmp_index, 'w') as file:
+                json.dump({'dimension': self.dimension, 'matrix': os.path.basename(matrix_path), 'files': files}, file)
+            os.replace(tmp_index, self.index_path)
+            self.matrix_path = matrix_path
+            self.remove_stale_matrices(previous)
+
+    # Nome da matriz apontada pelo índice em disco (None sem índice válido)
+    def indexed_matrix(self):
+        try:
+            with open(self.index_path, 'r') as file:
+                return os.path.basename(json.load(file).get('matrix', self.MATRIX_FILE))
+        except Exception:
+            return None
+
+    # Geração de um arquivo de matriz pelo nome (.encodings.<ns>.npy); o nome antigo sem versão vale -1
+    def matrix_generation(self, file_name):
+        try:
+            return int(file_name[len(self.MATRIX_PREFIX):-len('.npy')])
+        except ValueError:
+            return -1
+
+    # Apaga as versões mais antigas que a geração anterior (com o lock): a anterior fica para quem leu o
+    # índice antigo. As que ainda estão mapeadas (Windows) ficam para a próxima gravação.
+    def remove_stale_matrices(self, previous=None):
+        current = os.path.basename(self.matrix_path)
+        oldest_kept = self.matrix_generation(previous) if previous else self.matrix_generation(current)
+        for file_name in os.listdir(self.path_faces):
+            if not (file_name.startswith(self.MATRIX_PREFIX) and file_name.endswith('.npy')) or file_name in (current, previous):
+                continue
+            if self.matrix_generation(file_name) < oldest_kept:
+                try:
+                    os.remove(os.path.join(self.path_faces, file_name))
+                except OSError:
+                    pass
+
+    # Imagens cadastradas: faces/<id>.<ext> (uma foto) ou faces/<id>/<qualquer nome>.<ext> (várias fotos
+    # da mesma pessoa). Retorna (caminho relativo, id da pessoa); pastas ocultas são ignoradas.
+    def list_images(self):
+        for entry in sorted(os.listdir(self.path_faces)):
+            if entry.startswith('.'):
+                continue
+            path = os.path.join(self.path_faces, entry)
+            if os.path.isdir(path):
+                for file_name in sorted(os.listdir(path)):
+                    if self.is_image_file(file_name) and not file_name.startswith('.'):
+                        yield f"{entry}/{file_name}", entry
+            elif self.is_image_file(entry):
+                yield entry, os.path.splitext(entry)[0]
+
+    # Sincroniza o cache com a pasta: só codifica imagens novas ou alteradas e remove as apagadas.
+    # encode_many(paths) recebe todos os caminhos pendentes de uma vez (para usar um pool de processos)
+    # e retorna {caminho: (encoding (128,) ou None, motivo da rejeição ou None)}.
+    def sync(self, encode_many):
+        self.stats = {'reused': 0, 'encoded': 0, 'removed': 0, 'failed': 0}
+        old_files, old_matrix = self.load_index()
+        entries = []  # (chave, id da pessoa, stat, entrada reaproveitável ou None, hash)
+        changed = False
+
+        for key, person_id in self.list_images():
+            path = os.path.join(self.path_faces, key)
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                logging.error(f"Erro ao ler {key}: {str(e)}")
+                continue
+
+            entry = old_files.get(key)
+            reusable = entry is not None and (entry['row'] is None or old_matrix is not None)
+            if reusable and (entry['size'] != st.st_size or entry['mtime_ns'] != st.st_mtime_ns):
+                # Metadados mudaram (cópia, touch): confirma pelo conteúdo antes de recodificar
+                content_hash = self.file_hash(path)
+                reusable = entry['sha1'] == content_hash
+                entry = dict(entry, size=st.st_size, mtime_ns=st.st_mtime_ns, sha1=content_hash)
+                changed = True
+            entries.append((key, person_id, st, entry if reusable else None))
+
+        # Todas as imagens novas ou alteradas são codificadas juntas
+        pending = [os.path.join(self.path_faces, key) for key, _, _, entry in entries if entry is None]
+        encoded = encode_many(pending) if pending else {}
+
+        new_files = {}
+        rows = []
+        names = []
+        self.rejected = {}
+        for key, person_id, st, entry in entries:
+            path = os.path.join(self.path_faces, key)
+            if entry is not None:
+                self.stats['reused'] += 1
+                encoding = None if entry['row'] is None else np.array(old_matrix[entry['row']], dtype=np.float32)
+                content_hash, reason = entry['sha1'], entry.get('reason', 'nenhuma face encontrada')
+            else:
+                changed = True
+                content_hash = self.file_hash(path)
+                encoding, reason = encoded.get(path, (None, 'não processada'))
+                if encoding is None:
+                    self.stats['failed'] += 1
+                else:
+                    self.stats['encoded'] += 1
+
+            row = None
+            if encoding is not None:
+                row = len(rows)
+                rows.append(np.asarray(encoding, dtype=np.float32))
+                names.append(person_id)
+                if entry is not None and entry['row'] != row:
+                    changed = True
+            else:
+                self.rejected[key] = reason
+            # Imagens rejeitadas ficam no índice (row None, com o motivo) para não serem reprocessadas a cada carga
+            new_files[key] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha1': content_hash, 'row': row, 'reason': reason}
+
+        removed = set(old_files) - set(new_files)
+        self.stats['removed'] = len(removed)
+        changed = changed or bool(removed)
+
+        if not changed and old_matrix is not None and old_matrix.shape[0] == len(rows):
+            # Nada mudou: usa diretamente a matriz mapeada em memória
+            return names, old_matrix
+
+        matrix = np.stack(rows) if rows else np.empty((0, self.dimension), dtype=np.float32)
+        del old_matrix
+        try:
+            self.save(new_files, matrix)
+            return names, self.open_matrix()
+        except Exception as e:
+            logging.error(f"Erro ao salvar o cache de encodings: {str(e)}")
+            return names, matrix
@@ -0,0 +1,241 @@
+import os
+import re
+import sys
+import csv
+import json
+import uuid
+import shutil
+import logging
+import multiprocessing
+import zipfile
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import cv2 as cv  # OpenCV para leitura das fotos
+from detectors import get_detector
+from encoding_cache import EncodingCache
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGE_PATTERN = re.compile(r'\.(jpg|jpeg|png)$', re.IGNORECASE)
+
+# Motivos de rejeição, gravados no índice do cache e no relatório de importação
+REASON_UNREADABLE = 'imagem ilegível'
+REASON_NO_FACE = 'nenhuma face encontrada'
+REASON_MULTIPLE_FACES = 'mais de uma face, nenhuma predominante'
+REASON_FACE_TOO_SMALL = 'face muito pequena'
+
+
+def is_image_file(filename):
+    return IMAGE_PATTERN.search(filename)
+
+
+# Escolhe a face da foto de cadastro: a maior, desde que seja claramente predominante
+# (área >= dominance x a segunda) e tenha pelo menos min_face pixels de altura
+def select_face(faces, min_face=40, dominance=2.0):
+    if not faces:
+        return None, REASON_NO_FACE
+    by_area = sorted(faces, key=lambda face: (face[2] - face[0]) * (face[1] - face[3]), reverse=True)
+    largest = by_area[0]
+    area = (largest[2] - largest[0]) * (largest[1] - largest[3])
+    if len(by_area) > 1 and area < dominance * (by_area[1][2] - by_area[1][0]) * (by_area[1][1] - by_area[1][3]):
+        return None, REASON_MULTIPLE_FACES
+    if largest[2] - largest[0] < min_face:
+        return None, REASON_FACE_TOO_SMALL
+    return largest, None
+
+
+# Codifica uma foto de cadastro; função de módulo para rodar nos processos do pool.
+# Fotos grandes (celular) são reduzidas antes da detecção: o rosto continua bem acima dos 150 px da encoding.
+def encode_image(path, detector='hog', max_side=1024, min_face=40):
+    import face_recognition as fr  # Importado no primeiro uso: carrega o dlib e os modelos
+    try:
+        image = cv.imread(path)
+        if image is None:
+            return None, REASON_UNREADABLE
+        height, width = image.shape[:2]
+        scale = max_side / max(height, width)
+        if scale < 1:
+            image = cv.resize(image, (0, 0), None, scale, scale, interpolation=cv.INTER_AREA)
+        rgb = cv.cvtColor(image, cv.COLOR_BGR2RGB)
+        face, reason = select_face(get_detector(detector).detect(rgb), min_face)
+        if face is None:
+            return None, reason
+        return np.asarray(fr.face_encodings(rgb, [face])[0], dtype=np.float32), None
+    except Exception as e:
+        logging.error(f"Erro ao codificar {path}: {str(e)}")
+        return None, f"erro: {str(e)}"
+
+
+def encode_image_entry(args):
+    return encode_image(*args)
+
+
+# Codifica várias fotos em um pool de processos; progress(feitas, total) é chamado a cada foto.
+# Poucas fotos são processadas no próprio processo, onde o custo de subir o pool não compensa.
+def encode_paths(paths, workers=None, detector='hog', progress=None, min_pool_size=8):
+    workers = workers or os.cpu_count() or 1
+    results = {}
+    total = len(paths)
+    if workers <= 1 or total < min_pool_size:
+        outputs = (encode_image(path, detector) for path in paths)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        chunksize = max(1, min(16, total // (workers * 4)))
+        outputs = executor.map(encode_image_entry, [(path, detector) for path in paths], chunksize=chunksize)
+    try:
+        for done, (path, output) in enumerate(zip(paths, outputs), 1):
+            results[path] = output
+            if progress is not None:
+                progress(done, total)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return results
+
+
+# Fotos de uma pasta de importação: <pasta>/<nome da pessoa>/<fotos> ou <pasta>/<nome da pessoa>.<ext>
+def collect_photos(source):
+    photos = []
+    for root, dirs, files in os.walk(source):
+        dirs[:] = sorted(folder for folder in dirs if not folder.startswith(('.', '__MACOSX')))
+        for file_name in sorted(files):
+            if file_name.startswith('.') or not is_image_file(file_name):
+                continue
+            relative = os.path.relpath(root, source)
+            person = os.path.splitext(file_name)[0] if relative == '.' else os.path.basename(root)
+            photos.append((person.strip(), os.path.join(root, file_name)))
+    return photos
+
+
+# Importação em massa e cadastro com várias fotos por pessoa, ligadas ao id do persons.json
+class Enrollment:
+    def __init__(self, path_faces, persons_path, workers=None, detector='hog'):
+        self.path_faces = path_faces
+        self.persons_path = persons_path
+        self.workers = workers
+        self.detector = detector
+        self.cache = EncodingCache(path_faces, is_image_file)
+
+    def encode_many(self, paths, progress=None):
+        return encode_paths(paths, self.workers, self.detector, progress)
+
+    def load_persons(self):
+        try:
+            with open(self.persons_path, 'r') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return []
+
+    def save_persons(self, persons):
+        tmp_path = self.persons_path + '.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(persons, file, indent=4)
+        os.replace(tmp_path, self.persons_path)
+
+    # Copia a foto para a pasta da pessoa sem sobrescrever fotos existentes
+    def add_photo(self, person_id, source_path):
+        folder = os.path.join(self.path_faces, person_id)
+        os.makedirs(folder, exist_ok=True)
+        base, extension = os.path.splitext(os.path.basename(source_path))
+        target = os.path.join(folder, f"{base}{extension.lower()}")
+        counter = 1
+        while os.path.exists(target):
+            counter += 1
+            target = os.path.join(folder, f"{base}_{counter}{extension.lower()}")
+        shutil.copy2(source_path, target)
+        return f"{person_id}/{os.path.basename(target)}"
+
+    # Importa uma pasta ou um .zip. Pessoas já cadastradas (mesmo nome, sem ambiguidade) recebem as
+    # fotos novas como modelos adicionais. Retorna o resumo e as linhas do relatório de rejeições.
+    def import_source(self, source, progress=None):
+        if zipfile.is_zipfile(source):
+            with tempfile.TemporaryDirectory(prefix='enrollment_') as folder:
+                with zipfile.ZipFile(source) as archive:
+                    archive.extractall(folder)  # extractall descarta componentes absolutos e '..'
+                return self.import_folder(folder, progress)
+        return self.import_folder(source, progress)
+
+    def import_folder(self, source, progress=None):
+        photos = collect_photos(source)
+        persons = self.load_persons()
+        ids_by_name = {}
+        for person in persons:
+            ids_by_name.setdefault(person['name'].strip().lower(), []).append(person['id'])
+
+        created = {}
+        added = {}  # chave no cache -> (nome, caminho de origem)
+        for name, path in photos:
+            if not name:
+                continue
+            matches = ids_by_name.get(name.lower(), [])
+            if len(matches) == 1:
+                person_id = matches[0]
+            else:
+                person_id = created.get(name.lower())
+                if person_id is None:
+                    person_id = created[name.lower()] = str(uuid.uuid4())
+                    persons.append({'id': person_id, 'name': name})
+            added[self.add_photo(person_id, path)] = (name, path)
+
+        # Codifica só o que é novo; as fotos já cadastradas vêm do cache
+        self.cache.sync(lambda paths: self.encode_many(paths, progress))
+
+        report = []
+        for key, reason in self.cache.rejected.items():
+            if key in added:
+                name, path = added.pop(key)
+                report.append((path, name, reason))
+                os.remove(os.path.join(self.path_faces, key))  # A original continua na pasta de importação
+
+        # Pessoas novas sem nenhuma foto aceita não entram no persons.json
+        accepted_ids = {key.split('/', 1)[0] for key in added}
+        for name, person_id in created.items():
+            if person_id not in accepted_ids:
+                persons = [person for person in persons if person['id'] != person_id]
+                shutil.rmtree(os.path.join(self.path_faces, person_id), ignore_errors=True)
+        self.save_persons(persons)
+
+        summary = {
+            'photos': len(photos),
+            'accepted': len(added),
+            'rejected': len(report),
+            'new_persons': len([person_id for person_id in created.values() if person_id in accepted_ids]),
+        }
+        return summary, report
+
+
+def write_report(path, report):
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file, delimiter=';')
+        writer.writerow(['Arquivo', 'Pessoa', 'Motivo'])
+        writer.writerows(report)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Importa uma pasta ou .zip de fotos (uma pasta ou arquivo por pessoa) para o cadastro.')
+    parser.add_argument('source', help='pasta ou arquivo .zip')
+    parser.add_argument('--faces', default=os.path.join(BASE_DIR, 'faces'))
+    parser.add_argument('--persons', default=os.path.join(BASE_DIR, 'persons.json'))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--detector', default='hog', help='backend de detecção (hog, cnn, cascade)')
+    parser.add_argument('--report', default=None, help='CSV com as fotos rejeitadas (padrão: <origem>.rejeitadas.csv)')
+    args = parser.parse_args(argv)
+
+    def progress(done, total):
+        print(f"\r{done}/{total} fotos codificadas", end='', file=sys.stderr)
+
+    enrollment = Enrollment(args.faces, args.persons, args.workers, args.detector)
+    summary, report = enrollment.import_source(args.source, progress)
+    print(file=sys.stderr)
+    report_path = args.report or f"{args.source.rstrip(os.sep)}.rejeitadas.csv"
+    write_report(report_path, report)
+    print(f"{summary['accepted']} fotos aceitas, {summary['rejected']} rejeitadas ({report_path}), "
+          f"{summary['new_persons']} pessoas novas", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import os
+import sys
+import json
+import time
+import logging
+import multiprocessing
+import argparse
+import cv2 as cv  # OpenCV para leitura de arquivos de vídeo
+from recognition import Recognition
+from capture import CameraCapture
+from detectors import DETECTOR_BACKENDS
+from matcher import INDEX_BACKENDS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Reconhecimento facial sem interface gráfica; eventos de presença em JSONL.')
+    parser.add_argument('--source', default='0', help='índice da câmera ou caminho de um arquivo de vídeo (padrão: 0)')
+    parser.add_argument('--output', default='-', help='arquivo JSONL de saída; "-" escreve em stdout')
+    parser.add_argument('--faces', default=os.path.join(BASE_DIR, 'faces'), help='pasta com as imagens cadastradas')
+    parser.add_argument('--persons', default=os.path.join(BASE_DIR, 'persons.json'), help='arquivo persons.json')
+    parser.add_argument('--recognized-dir', default=os.path.join(BASE_DIR, 'recognized_faces'))
+    parser.add_argument('--unrecognized-dir', default=os.path.join(BASE_DIR, 'unrecognized_faces'))
+    parser.add_argument('--max-frames', type=int, default=0, help='para após N frames (0 = sem limite)')
+    # Mesmos parâmetros de Recognition.setup_parameters
+    parser.add_argument('--max-captures', type=int, default=4)
+    parser.add_argument('--capture-interval', type=float, default=2.0)
+    parser.add_argument('--expand-ratio', type=float, default=0.25)
+    parser.add_argument('--threshold-texture', type=float, default=140)
+    parser.add_argument('--threshold-reflection', type=float, default=180)
+    parser.add_argument('--dis-face-encoding', type=float, default=0.55)
+    parser.add_argument('--face-height-threshold', type=float, default=250)
+    parser.add_argument('--tracking', action='store_true', help='ativa o modo de rastreamento entre detecções')
+    parser.add_argument('--detect-interval', type=int, default=5)
+    parser.add_argument('--detection-scale', type=float, default=0.25, help='redução do frame antes da detecção')
+    parser.add_argument('--adaptive-scale', action='store_true', help='ajusta a escala pelo tamanho dos rostos e pelo orçamento de latência')
+    parser.add_argument('--no-compact', action='store_true', help='compara com todas as fotos em vez de centróide + exemplares por pessoa')
+    parser.add_argument('--no-recheck', action='store_true', help='não reconfere o vencedor contra todas as fotos da pessoa')
+    parser.add_argument('--match-index', default='exact', choices=sorted(INDEX_BACKENDS), help='busca na galeria: exata ou IVF aproximada (galerias grandes)')
+    parser.add_argument('--nprobe', type=int, default=8, help='listas do IVF visitadas por consulta; maior = mais recall, mais lento')
+    parser.add_argument('--nlist', type=int, default=0, help='listas do IVF (0 = ~raiz quadrada do tamanho da galeria)')
+    parser.add_argument('--detector', default='hog', choices=sorted(DETECTOR_BACKENDS), help='backend de detecção (ver benchmarks/bench_detectors.py)')
+    parser.add_argument('--no-motion-gate', action='store_true', help='detecta faces em todos os frames, mesmo com a cena parada')
+    parser.add_argument('--motion-sensitivity', type=float, default=12.0, help='diferença de intensidade (0-255) que conta como movimento')
+    parser.add_argument('--motion-heartbeat', type=float, default=2.0, help='segundos entre detecções forçadas com a cena parada')
+    parser.add_argument('--detection-budget-ms', type=float, default=80.0, help='tempo máximo de detecção por frame no modo adaptativo')
+    parser.add_argument('--metrics', default=None, help='arquivo onde gravar a latência por etapa periodicamente (desligado por padrão)')
+    parser.add_argument('--metrics-format', default='prometheus', choices=['prometheus', 'json'])
+    parser.add_argument('--metrics-interval', type=float, default=30.0)
+    return parser.parse_args(argv)
+
+
+# Fonte de frames: câmera (thread de captura, sempre o frame mais recente) ou arquivo (todos os frames, em ordem)
+def open_source(source):
+    if source.isdigit():
+        capture = CameraCapture(int(source))
+        if not capture.start():
+            return None, False
+        return capture, True
+    capture = cv.VideoCapture(source)
+    if not capture.isOpened():
+        return None, False
+    return capture, False
+
+
+class HeadlessRunner:
+    def __init__(self, args, output):
+        self.args = args
+        self.output = output
+        self.recognition = Recognition(
+            path_faces=args.faces,
+            save_path_recognized=args.recognized_dir,
+            save_path_unrecognized=args.unrecognized_dir,
+            persons_path=args.persons,
+            draw_overlays=False,
+            compact_gallery=not args.no_compact,
+            recheck_raw=not args.no_recheck,
+        )
+        self.recognition.setup_parameters(args.max_captures, args.capture_interval, args.expand_ratio, args.threshold_texture,
+                                          args.threshold_reflection, args.dis_face_encoding, args.face_height_threshold,
+                                          args.tracking, args.detect_interval, args.detection_scale, args.adaptive_scale, args.detector,
+                                          not args.no_motion_gate, args.motion_sensitivity, args.motion_heartbeat,
+                                          args.match_index, args.nprobe, args.nlist)
+        self.recognition.scaler.budget = args.detection_budget_ms / 1000
+        self.recognition.attendance_listeners.append(self.write_event)
+        if args.metrics:
+            metrics = self.recognition.metrics
+            metrics.dump_path, metrics.dump_format, metrics.dump_interval = args.metrics, args.metrics_format, args.metrics_interval
+            metrics.set_enabled(True)
+        self.frames = 0
+
+    def write_event(self, event, name, dis, timestamp):
+        record = {'event': event, 'name': name, 'distance': float(dis), 'timestamp': timestamp.isoformat(sep=' '), 'source': self.args.source}
+        self.output.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.output.flush()
+
+    def run(self):
+        self.recognition.reload_encodings()
+        capture, is_camera = open_source(self.args.source)
+        if capture is None:
+            logging.error(f"Não foi possível abrir a fonte {self.args.source}")
+            print(f"Não foi possível abrir a fonte {self.args.source}", file=sys.stderr)
+            return 1
+
+        start = time.monotonic()
+        last_seq = -1
+        try:
+            while not self.args.max_frames or self.frames < self.args.max_frames:
+                if is_camera:
+                    if not capture.isOpened():
+                        break
+                    if capture.latest_seq() == last_seq:
+                        capture.new_frame.wait(0.1)  # Aguarda o próximo frame sem girar a CPU
+                        continue
+                    success, img = capture.read()
+                    last_seq = capture.last_read_seq
+                else:
+                    success, img = capture.read()
+                    if not success:
+                        break  # Fim do arquivo
+                if not success:
+                    continue
+                self.recognition.init_face_recognition(img)
+                self.recognition.metrics.maybe_dump()
+                self.frames += 1
+        except KeyboardInterrupt:
+            pass
+        finally:
+            capture.release()
+            if self.args.metrics:
+                self.recognition.metrics.dump()
+            self.recognition.close()
+
+        elapsed = time.monotonic() - start
+        fps = self.frames / elapsed if elapsed > 0 else 0.0
+        print(f"{self.frames} frames em {elapsed:.1f}s ({fps:.1f} fps), detecção pulada em {self.recognition.motion_gate.skip_ratio:.1%} dos frames", file=sys.stderr)
+        return 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.output == '-':
+        # Mensagens de Recognition (print) vão para stderr para não misturar com o JSONL
+        events, sys.stdout = sys.stdout, sys.stderr
+        return HeadlessRunner(args, events).run()
+    with open(args.output, 'a', encoding='utf-8') as output:
+        return HeadlessRunner(args, output).run()
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,75 @@
+import os
+import queue
+import logging
+import threading
+import cv2 as cv  # OpenCV para codificação JPEG
+
+
+# Grava capturas em segundo plano: fila limitada, codificação JPEG em threads próprias e
+# descarte (em vez de bloqueio) quando o disco não acompanha.
+class AsyncImageWriter:
+    def __init__(self, workers=2, queue_size=32, jpeg_quality=90):
+        self.jpeg_quality = jpeg_quality
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.created_dirs = set()  # Pastas já criadas; evita os.makedirs a cada imagem
+        self.dirs_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.running = True
+        self.threads = [threading.Thread(target=self.worker, name=f'image-writer-{index}', daemon=True) for index in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    # Enfileira a imagem sem bloquear; retorna False se ela foi descartada
+    def submit(self, path, image):
+        if image is None or image.size == 0:
+            return False
+        try:
+            # Cópia: o recorte costuma ser uma view do frame, que continua sendo alterado
+            self.queue.put_nowait((path, image.copy()))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def ensure_dir(self, directory):
+        with self.dirs_lock:
+            if directory in self.created_dirs:
+                return
+            os.makedirs(directory, exist_ok=True)
+            self.created_dirs.add(directory)
+
+    def worker(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            path, image = item
+            try:
+                self.ensure_dir(os.path.dirname(path))
+                success, buffer = cv.imencode('.jpg', image, [cv.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                if not success:
+                    raise ValueError("falha na codificação JPEG")
+                with open(path, 'wb') as file:
+                    file.write(buffer.tobytes())
+                self.written += 1
+            except Exception as e:
+                self.failed += 1
+                logging.error(f"Erro ao salvar a imagem {path}: {str(e)}")
+            finally:
+                self.queue.task_done()
+
+    def stats(self):
+        return {'queue_depth': self.queue.qsize(), 'written': self.written, 'dropped': self.dropped, 'failed': self.failed}
+
+    # Aguarda as imagens pendentes e encerra as threads
+    def close(self):
+        if not self.running:
+            return
+        self.running = False
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join(timeout=5.0)
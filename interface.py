@@ -7,13 +7,25 @@ import json
 import csv
 import uuid
 import shutil
-from screeninfo import get_monitors
+import threading
 import numpy as np
 from recognition import Recognition
+from capture import CameraCapture
+from camera_discovery import CameraDiscovery
+from pipeline import RecognitionPipeline
+from recognition_worker import RecognitionWorker
+from renderer import FrameRenderer
+from detectors import DETECTOR_BACKENDS
+from matcher import INDEX_BACKENDS
+from enrollment import Enrollment, write_report
 from pathlib import Path
 
 class Interface:
-    def __init__(self):
+    # warmup: carrega modelos e galeria em segundo plano logo após abrir a janela.
+    # autostart: inicia a identificação assim que o carregamento termina (quiosques).
+    def __init__(self, warmup=True, autostart=False):
+        self.WARMUP = warmup
+        self.AUTOSTART = autostart
         home_dir = Path.home()
         log_file = home_dir / 'face_attendance_logs' / 'interface.log'
         log_file.parent.mkdir(parents=True, exist_ok=True)
@@ -51,13 +63,27 @@ class Interface:
             sg.PopupError("Erro ao criar a janela!")
             logging.error("Erro ao criar a janela!")
             return
+
+        # Sem cache válido de câmeras: a busca roda em segundo plano e preenche a lista ao terminar
+        if not self.camera_discovery.cached:
+            self.refresh_cameras()
+
+        # Frames e resultados chegam pelo evento -FRAME-; o loop da interface só acorda para eventos e tarefas periódicas
+        self.worker = RecognitionWorker(lambda: self.cap, self.recognize_frame, lambda: self.window.write_event_value('-FRAME-', None),
+                                        self.metrics, max_fps=self.renderer_fps)
+        self.worker.start()
+
+        if self.WARMUP:
+            self.start_warmup()
+        elif self.AUTOSTART:
+            self.start_identification()
         
     def run(self):
         while True:
-            self.module_functions()
-            event, values = self.window.read(timeout=5)
+            event, values = self.window.read(timeout=self.UI_TICK_MS if self.worker.visible else self.UI_TICK_HIDDEN_MS)
             if self.verify_window_event(event, values):
                 break
+            self.module_functions()
         self.cleanup_resources()
 
     def init_recognition_class(self):
@@ -67,6 +93,8 @@ class Interface:
                 save_path_recognized=self.SAVE_PATH_RECOGNIZED, 
                 save_path_unrecognized=self.SAVE_PATH_UNRECOGNIZED
             )
+            self.metrics = self.recognition.metrics  # Etapas da interface e do reconhecimento na mesma tabela
+            self.metrics.dump_path = str(Path.home() / 'face_attendance_logs' / 'metrics.prom')
             return True
         except Exception as e:
             sg.PopupError(f"Erro ao inicializar o módulo de reconhecimento: {str(e)}")
@@ -111,8 +139,28 @@ class Interface:
             self.full_screen_window = None
             self.camera_permission_error_shown = False
             self.cam_index = 0
+            self.cap = None
+            self.last_camera_attempt = 0.0
+            self.CAMERA_RETRY_INTERVAL = 2.0  # Intervalo mínimo entre tentativas de reabrir a câmera
+            self.camera_discovery = CameraDiscovery(str(Path.home() / 'face_attendance_logs' / 'cameras.json'))
+            self.camera_open_thread = None  # Abertura da câmera fora do loop de frames; volta a None no evento de resultado
+            self.camera_open_pending = None  # (índices, announce) pedidos enquanto outra abertura estava em andamento
+            self.PIPELINE_WORKERS = 0  # Processos de detecção/encoding; 0 processa tudo na thread da interface
+            self.pipeline = None
             self.current_image_data = None 
-            self.image_bytes_camera = None 
+            self.renderer_fps = 15
+            self.renderer = FrameRenderer(image_format='ppm', max_fps=self.renderer_fps)  # Taxa de exibição independente do reconhecimento
+            self.UI_TICK_MS = 100  # Tarefas periódicas da interface (câmera, métricas, hot-plug) com a janela visível
+            self.UI_TICK_HIDDEN_MS = 500  # Janela minimizada
+            self.camera_version = -1  # Versão do frame exibida por último em -CAMERA-
+            self.visible_column = '-CAMERA_COL-'
+            self.screen_size = None
+            self.import_thread = None
+            self.warmup_thread = None
+            self.gallery_warm = False  # Galeria recém-carregada pelo aquecimento: o próximo início não recarrega
+            self.start_after_warmup = False
+            self.last_metrics_update = 0.0
+            self.METRICS_UPDATE_INTERVAL = 1.0  # Percentis recalculados para a interface no máximo 1x por segundo
             self.placeholder_img = cv.imread(f'{self.PATH_SRC}/placeholder.png')
             
             if self.placeholder_img is None:
@@ -128,9 +176,14 @@ class Interface:
     # Define o layout da janela
     def def_layout(self):
         camera_column = [
+            [sg.Text('', key='-WARMUP-STATUS-', size=(40, 1)), sg.ProgressBar(100, orientation='h', size=(20, 10), key='-WARMUP-BAR-', visible=False)],
             [sg.Image(filename='', key='-CAMERA-', size=(640, 480))],
             [sg.Text('Threshold de Textura:', size=(20, 1)), sg.Text('0', key='-TEXTURE-THRESHOLD-')],
             [sg.Text('Threshold de Reflexão:', size=(20, 1)), sg.Text('0', key='-REFLECTION-THRESHOLD-')],
+            [sg.Text('Captura:', size=(20, 1)), sg.Text('', key='-CAPTURE-STATS-')],
+            [sg.Text('Pipeline:', size=(20, 1)), sg.Text('', key='-PIPELINE-STATS-')],
+            [sg.Text('Gravação de imagens:', size=(20, 1)), sg.Text('', key='-WRITER-STATS-')],
+            [sg.Text('Latência p50/p95/p99:', size=(20, 1)), sg.Text('', key='-METRICS-', size=(45, 7))],
             [sg.Button('Abrir Tela Cheia', key='-FULL-SCREEN-CAMERA-')]
         ]
         
@@ -158,8 +211,8 @@ class Interface:
         
         settings_column = [
             [sg.Text("Selecione uma câmera")],
-            [sg.Listbox(values=[f"{index} - {name}" for index, name in self.list_cameras()], size=(30, 10), key='-CAMERA-LIST-', enable_events=True)],
-            [sg.Button("Selecionar Câmera", key='-CAMERA-SELECT-LIST-'), sg.Button("Atualizar Câmeras", key='-CAMERA-UPDATE-LIST-')],
+            [sg.Listbox(values=self.camera_items(self.camera_discovery.cameras), size=(30, 10), key='-CAMERA-LIST-', enable_events=True)],
+            [sg.Button("Selecionar Câmera", key='-CAMERA-SELECT-LIST-'), sg.Button("Atualizar Câmeras", key='-CAMERA-UPDATE-LIST-'), sg.Text('', key='-CAMERA-STATUS-', size=(25, 1))],
             [sg.Text("Maxímo de fotos capturadas:"), sg.InputText(self.recognition.MAX_CAPTURES_UNRECOGNIZED, key='-MAX-CAPTURES-', size=(10, 1)), sg.Text(f"(Padrão: {self.recognition.MAX_CAPTURES_UNRECOGNIZED})")],
             [sg.Text("Interval de captura de imagens:"), sg.InputText(self.recognition.CAPTURE_INTERVAL_UNRECOGNIZED, key='-INTERVAL-', size=(10, 1)), sg.Text(f"(Padrão: {self.recognition.CAPTURE_INTERVAL_UNRECOGNIZED})")],
             [sg.Text("Expansão de área de captura da imagem:"), sg.InputText(self.recognition.EXPAND_RATIO, key='-EXPAND-RATIO-', size=(10, 1)), sg.Text(f"(Padrão: {self.recognition.EXPAND_RATIO})")],
@@ -167,6 +220,18 @@ class Interface:
             [sg.Text("Reflection Threshold:"), sg.InputText(self.recognition.THRESHOLD_REFLECTION, key='-REFLECTION-THRESH-', size=(10, 1)), sg.Text(f"(Padrão: {self.recognition.THRESHOLD_REFLECTION})")],
             [sg.Text("Distância Facial para a Camera:"), sg.InputText(self.recognition.FACE_HEIGHT_THRESHOLD, key='-HEIGHT-THRESH-', size=(10, 1)), sg.Text(f"(Padrão: {self.recognition.FACE_HEIGHT_THRESHOLD})")],
             [sg.Text("Limite de Reconhecimento de Distância Facial:"), sg.InputText(self.recognition.DIS_FACE_ENCODING, key='-DIS-FACE-ENCODING-', size=(10, 1)), sg.Text(f"(Padrão: {self.recognition.DIS_FACE_ENCODING})")],
+            [sg.Checkbox("Rastrear faces entre detecções", default=self.recognition.TRACKING_MODE, key='-TRACKING-MODE-')],
+            [sg.Text("Detector de faces:"), sg.Combo(sorted(DETECTOR_BACKENDS), default_value=self.recognition.DETECTOR, key='-DETECTOR-', readonly=True), sg.Text("(Padrão: hog)")],
+            [sg.Text("Escala de detecção:"), sg.InputText(self.recognition.DETECTION_SCALE, key='-DETECTION-SCALE-', size=(10, 1)), sg.Text(f"(Padrão: {self.recognition.DETECTION_SCALE})")],
+            [sg.Checkbox("Ajustar a escala pelo tamanho dos rostos e pela latência", default=self.recognition.ADAPTIVE_SCALE, key='-ADAPTIVE-SCALE-')],
+            [sg.Text("Busca na galeria:"), sg.Combo(sorted(INDEX_BACKENDS), default_value=self.recognition.MATCH_INDEX, key='-MATCH-INDEX-', readonly=True), sg.Text("(Padrão: exact; ivf para galerias grandes)")],
+            [sg.Text("IVF - listas visitadas (nprobe):"), sg.InputText(self.recognition.MATCH_NPROBE, key='-MATCH-NPROBE-', size=(10, 1)), sg.Text("listas (nlist, 0 = automático):"), sg.InputText(self.recognition.MATCH_NLIST, key='-MATCH-NLIST-', size=(10, 1))],
+            [sg.Checkbox("Detectar faces só quando a cena muda", default=self.recognition.MOTION_GATE, key='-MOTION-GATE-')],
+            [sg.Text("Sensibilidade a movimento (0-255, menor = mais sensível):"), sg.InputText(self.recognition.MOTION_SENSITIVITY, key='-MOTION-SENSITIVITY-', size=(10, 1)), sg.Text(f"(Padrão: {self.recognition.MOTION_SENSITIVITY})")],
+            [sg.Text("Detecção forçada a cada (s):"), sg.InputText(self.recognition.MOTION_HEARTBEAT, key='-MOTION-HEARTBEAT-', size=(10, 1)), sg.Text(f"(Padrão: {self.recognition.MOTION_HEARTBEAT})")],
+            [sg.Text("Intervalo de detecção (frames):"), sg.InputText(self.recognition.DETECT_INTERVAL, key='-DETECT-INTERVAL-', size=(10, 1)), sg.Text(f"(Padrão: {self.recognition.DETECT_INTERVAL})")],
+            [sg.Text("Processos de detecção (0 = desligado):"), sg.InputText(self.PIPELINE_WORKERS, key='-PIPELINE-WORKERS-', size=(10, 1)), sg.Text(f"(Padrão: {self.PIPELINE_WORKERS})")],
+            [sg.Checkbox("Medir latência por etapa", default=self.metrics.enabled, key='-METRICS-ENABLED-')],
             [sg.Button("Aplicar Configurações", key='-APPLY-SETTINGS-')]
         ]
 
@@ -178,7 +243,10 @@ class Interface:
             [sg.InputText(key='-IMAGE-PATH-'), sg.FileBrowse(key='-IMAGE-FILE-'), sg.Button("Capturar", key='-CAPTURE-'), sg.Button("Excluir", key='-IMAGE-BTN-DELETE-')],
             [sg.Image(filename='', key='-IMAGE-PREVIEW-')],
             [sg.Button('<-', key='-IMAGE-BTN-PREV-'), sg.Button('->', key='-IMAGE-BTN-NEXT-')],
-            [sg.Button("Salvar Imagem", key='-SAVE-ADD-IMAGE-'), sg.Button("Cancelar", key='-CANCEL-ADD-IMAGE-')]
+            [sg.Button("Salvar Imagem", key='-SAVE-ADD-IMAGE-'), sg.Button("Cancelar", key='-CANCEL-ADD-IMAGE-')],
+            [sg.Text("Importar pasta ou .zip de fotos (uma pasta ou arquivo por pessoa):")],
+            [sg.InputText(key='-IMPORT-PATH-'), sg.FolderBrowse('Pasta', target='-IMPORT-PATH-'), sg.FileBrowse('Zip', target='-IMPORT-PATH-', file_types=(('Zip', '*.zip'),)), sg.Button("Importar", key='-IMPORT-FACES-')],
+            [sg.Text('', key='-IMPORT-STATUS-', size=(60, 1))]
         ]
         
         layout = [
@@ -205,26 +273,25 @@ class Interface:
         ]
         return layout
 
-    # lista as cameras
-    def list_cameras(self):
-        try:
-            cameras = []
-            for index in range(5):
-                cap = cv.VideoCapture(index)
-                if cap.read()[0]:
-                    cameras.append((index, f"Camera {index}"))
-                cap.release()
-            return cameras
-        except Exception as e:
-            sg.PopupError(f"Ocorreu um erro: {str(e)}")
-            logging.error(f"Ocorreu um erro: {str(e)}")
-            return False
+    # itens da lista de cameras
+    def camera_items(self, cameras):
+        return [f"{index} - {name}" for index, name in cameras]
+
+    # busca as cameras em segundo plano; a lista é preenchida pelo evento -CAMERAS-FOUND-
+    def refresh_cameras(self, announce=False):
+        in_use = self.cam_index if self.cap is not None and self.cap.isOpened() else None
+        started = self.camera_discovery.refresh(lambda cameras: self.window.write_event_value('-CAMERAS-FOUND-', (cameras, announce)), in_use)
+        if started:
+            self.window['-CAMERA-STATUS-'].update('Procurando câmeras...')
+        return started
         
     # atualiza a tabela
     def update_table(self):
+        started = self.metrics.start()
         try:
-            table_data = [[record['name'], record['timestamp_recognized'], record['distance']] for record in self.recognition.recognized_faces]
+            table_data = [[record['name'], record['timestamp_recognized'].strftime('%Y-%m-%d %H:%M:%S'), record['distance']] for record in self.recognition.recognized_faces]
             self.window['-TABLE-'].update(values=table_data)
+            self.metrics.stop('update_table', started)
         except Exception as e:
             logging.error(f"Error updating table: {str(e)}")
         
@@ -236,34 +303,32 @@ class Interface:
         except Exception as e:
             logging.error(f"Error updating person list: {str(e)}")
       
-    # atualiza a lista de cameras
-    def update_list_camera(self):
+    # atualiza a lista de cameras com o resultado da busca
+    def update_list_camera(self, cameras, announce=False):
         try:
-            camera_data = [f"{index} - {name}" for index, name in self.list_cameras()]
-            self.window['-CAMERA-LIST-'].update(values=camera_data)
-            sg.PopupOK("As câmeras foram atualizadas!")
+            self.window['-CAMERA-LIST-'].update(values=self.camera_items(cameras))
+            self.window['-CAMERA-STATUS-'].update(f"{len(cameras)} câmeras encontradas")
+            if announce:
+                sg.PopupOK("As câmeras foram atualizadas!")
         except Exception as e:
             sg.PopupError(f"Ocorreu um erro ao atualizar a lista de câmeras: {str(e)}")
             logging.error(f"Ocorreu um erro ao atualizar a lista de câmeras: {str(e)}")
 
-    # Converte o frame do formato BGR (do OpenCV) para RGB (para PySimpleGUI)    
+    # Atualiza a imagem da câmera na janela principal; a codificação só acontece com a coluna visível
     def update_camera(self, open, img):
+        started = self.metrics.start()
         # Verifica se a imagem é válida
         if img is None or img.size == 0:
             open = False
             img = self.placeholder_img
+        self.renderer.set_frame(img)
 
-        # Calcula o novo tamanho mantendo o aspect ratio
-        max_width, max_height = 640, 480
-        height, width = img.shape[:2]
-        scale = min(max_width/width, max_height/height)
-
-        # Redimensiona a imagem proporcionalmente
-        new_size = (int(width * scale), int(height * scale))
-        frame = cv.resize(img, new_size)
-
-        self.imgbytes = cv.imencode('.png', frame)[1].tobytes()
-        self.window['-CAMERA-'].update(data=self.imgbytes)
+        if self.visible_column == '-CAMERA_COL-' and self.renderer.version != self.camera_version and self.renderer.due('camera'):
+            # Redimensiona proporcionalmente para caber em 640x480 e codifica uma única vez por frame
+            self.imgbytes, _ = self.renderer.encode(640, 480)
+            self.window['-CAMERA-'].update(data=self.imgbytes)
+            self.camera_version = self.renderer.version  # O placeholder parado não é redesenhado a cada tick
+            self.metrics.stop('update_camera', started)
         
         if open:
             self.camera_permission_error_shown = False
@@ -273,8 +338,96 @@ class Interface:
             logging.error("Erro ao acessar a câmera")
 
 
+    # inicia a identificação com a galeria recém-carregada pelo aquecimento; sem ela, a recarga (que pode
+    # codificar fotos novas) roda na thread de aquecimento e a identificação começa no -WARMUP-DONE-
+    def start_identification(self):
+        if not self.gallery_warm:
+            self.start_warmup(start_after=True)
+            return
+        with self.worker.lock:
+            self.start_pipeline()
+        self.gallery_warm = False
+        self.start_after_warmup = False
+        self.init_face_recognition = True
+        self.worker.recognizing = True
+        self.window['-INITIALIZE-IDENTIFY-FACES-'].update(text='Parar Identificação')
+
+    def stop_identification(self):
+        self.init_face_recognition = False
+        self.worker.recognizing = False
+        with self.worker.lock:
+            self.stop_pipeline()
+        self.window['-INITIALIZE-IDENTIFY-FACES-'].update(text='Iniciar Identificação')
+
+    # reconhecimento de um frame, na thread do worker (com o lock do worker; o estado do
+    # reconhecimento é protegido pelo lock da própria Recognition)
+    def recognize_frame(self, img):
+        if self.pipeline is not None:
+            with self.recognition.lock:  # report() do consumidor e reset() das configurações mexem no mesmo gate
+                moving = self.recognition.motion_gate.check(img)
+            if not moving:
+                return img  # Cena parada: o frame só é exibido, sem passar pelos workers
+            self.pipeline.submit(img)
+            return self.pipeline.latest()  # None: nenhum frame saiu do pipeline desde a última atualização
+        self.recognition.init_face_recognition(img)
+        return img
+
+    @property
+    def warming_up(self):
+        return self.warmup_thread is not None and self.warmup_thread.is_alive()
+
+    # carrega o dlib, os modelos e a galeria em segundo plano; o progresso chega como evento.
+    # start_after inicia a identificação ao terminar (padrão: --autostart)
+    def start_warmup(self, start_after=None):
+        self.start_after_warmup = self.AUTOSTART if start_after is None else start_after
+        if self.start_after_warmup:
+            self.window['-INITIALIZE-IDENTIFY-FACES-'].update(text='Aguardando carregamento...')
+        self.window['-WARMUP-STATUS-'].update('Carregando modelos de reconhecimento...')
+        self.window['-WARMUP-BAR-'].update(current_count=0, visible=True)
+        self.warmup_thread = threading.Thread(target=self.run_warmup, name='warmup', daemon=True)
+        self.warmup_thread.start()
+
+    def run_warmup(self):
+        last_percent = [-1]
+
+        def progress(stage, done, total):
+            percent = 100 * done // total if total else -1
+            if stage == 'models' or percent != last_percent[0]:  # No máximo 100 eventos de codificação
+                last_percent[0] = percent
+                self.window.write_event_value('-WARMUP-PROGRESS-', (stage, done, total))
+
+        try:
+            started = time.monotonic()
+            self.recognition.warm_up(progress)
+            self.window.write_event_value('-WARMUP-DONE-', time.monotonic() - started)
+        except Exception as e:
+            logging.error(f"Erro ao carregar os modelos de reconhecimento: {str(e)}")
+            self.window.write_event_value('-WARMUP-ERROR-', str(e))
+
+    # inicia o pipeline multiprocesso, se configurado
+    def start_pipeline(self):
+        if self.PIPELINE_WORKERS <= 0:
+            return
+        self.pipeline = RecognitionPipeline(self.recognition, workers=self.PIPELINE_WORKERS)
+        if not self.pipeline.start():
+            sg.PopupError("Erro ao iniciar o pipeline de reconhecimento, usando processamento local.")
+            self.pipeline = None
+
+    def stop_pipeline(self):
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            self.pipeline = None
+
+    # atualiza vazão, latência e descartes do pipeline
+    def update_pipeline_stats(self):
+        stats = self.pipeline.stats()
+        self.window['-PIPELINE-STATS-'].update(f"{stats['fps']} fps - {stats['latency_ms_avg']} ms - {stats['dropped']} descartados")
+
     # limpa todos os recursos
     def cleanup_resources(self):
+        self.worker.stop()
+        self.stop_pipeline()
+        self.recognition.close()
         if self.cap and self.cap.isOpened():
             self.cap.release()
         cv.destroyAllWindows()
@@ -284,15 +437,38 @@ class Interface:
     def verify_window_event(self, event, value):
         if event == sg.WIN_CLOSED:
             return True
+        elif event == '-FRAME-':
+            self.show_frame()
         elif event == '-INITIALIZE-IDENTIFY-FACES-':
             if self.init_face_recognition: # Lógica para iniciar ou desligar a identificação de pessoas
-                self.init_face_recognition = False
+                self.stop_identification()
+            elif self.warming_up:
+                # Inicia sozinho quando o carregamento terminar, sem bloquear a janela
+                self.start_after_warmup = not self.start_after_warmup
+                self.window['-INITIALIZE-IDENTIFY-FACES-'].update(text='Aguardando carregamento...' if self.start_after_warmup else 'Iniciar Identificação')
+            else:
+                self.start_identification()
+        elif event == '-WARMUP-PROGRESS-':
+            stage, done, total = value[event]
+            if stage == 'models':
+                self.window['-WARMUP-STATUS-'].update('Carregando modelos de reconhecimento...')
+            else:
+                self.window['-WARMUP-STATUS-'].update(f"Codificando fotos: {done}/{total}")
+                self.window['-WARMUP-BAR-'].update(current_count=done, max=total)
+        elif event == '-WARMUP-DONE-':
+            elapsed = value[event]
+            self.gallery_warm = True
+            self.window['-WARMUP-STATUS-'].update(f"Pronto em {elapsed:.1f} s - {len(self.recognition.person_name)} pessoas")
+            self.window['-WARMUP-BAR-'].update(visible=False)
+            if self.start_after_warmup and not self.init_face_recognition:
+                self.start_identification()
+        elif event == '-WARMUP-ERROR-':
+            self.window['-WARMUP-STATUS-'].update('')
+            self.window['-WARMUP-BAR-'].update(visible=False)
+            if self.start_after_warmup:
                 self.window['-INITIALIZE-IDENTIFY-FACES-'].update(text='Iniciar Identificação')
-            else: 
-                self.recognition.reload_encodings() # Recarrega os encodes das faces
-                time.sleep(0.1)
-                self.init_face_recognition = True
-                self.window['-INITIALIZE-IDENTIFY-FACES-'].update(text='Parar Identificação')
+            self.start_after_warmup = False
+            sg.PopupError(f"Erro ao carregar os modelos de reconhecimento: {value[event]}")
         elif event == '-FULL-SCREEN-CAMERA-':
             if not self.full_screen_active:
                 self.full_screen_active = True
@@ -310,13 +486,38 @@ class Interface:
         elif event == '-CAMERA-SELECT-LIST-':
             camera_selection = value['-CAMERA-LIST-']
             if camera_selection:
-                # Pega o índice da câmera a partir da seleção
+                # Pega o índice da câmera a partir da seleção; a abertura termina no evento -CAMERA-OPENED-
                 self.cam_index = int(camera_selection[0].split(" - ")[0])
-                self.cap.release()
-                self.init_capture_webcam(self.cam_index)
-                sg.PopupOK("A câmera foi selecionada!")
+                if self.cap is not None:
+                    self.cap.release()
+                    self.cap = None
+                self.open_camera([self.cam_index], announce=True)
         elif event == '-CAMERA-UPDATE-LIST-':
-            self.update_list_camera()
+            if not self.refresh_cameras(announce=True):
+                sg.PopupOK("A busca de câmeras já está em andamento.")
+        elif event == '-CAMERAS-FOUND-':
+            cameras, announce = value[event]
+            self.update_list_camera(cameras, announce)
+        elif event == '-CAMERA-OPENED-':
+            cap, index, announce = value[event]
+            self.camera_open_thread = None
+            if self.camera_open_pending is not None or (self.cap is not None and self.cap.isOpened()) or (announce and index != self.cam_index):
+                cap.release()  # A seleção mudou enquanto a câmera abria
+            else:
+                self.cam_index = index  # Na abertura automática pode ser outra câmera, se a padrão não abriu
+                self.cap = cap
+                if announce:
+                    sg.PopupOK("A câmera foi selecionada!")
+            self.open_pending_camera()
+        elif event == '-CAMERA-OPEN-FAILED-':
+            self.camera_open_thread = None
+            if self.camera_open_pending is not None:
+                self.open_pending_camera()  # Resultado de uma seleção já substituída
+            elif value[event]:
+                sg.PopupError("Não foi possível abrir a câmera selecionada.")
+            elif any(index == self.cam_index for index, _ in self.camera_discovery.cameras):
+                # Câmera listada que não abriu (desconectada?): a lista é revista em segundo plano
+                self.refresh_cameras()
         elif event == '-CAPTURE-':
             self.capture_image()
         elif event == '-CANCEL-ADD-IMAGE-':
@@ -334,9 +535,30 @@ class Interface:
                 threshold_reflection = float(value['-REFLECTION-THRESH-'])
                 dis_face_encoding = float(value['-DIS-FACE-ENCODING-'])
                 face_height_threshold = float(value['-HEIGHT-THRESH-'])
+                tracking_mode = bool(value['-TRACKING-MODE-'])
+                detect_interval = int(value['-DETECT-INTERVAL-'])
+                detection_scale = float(value['-DETECTION-SCALE-'])
+                adaptive_scale = bool(value['-ADAPTIVE-SCALE-'])
+                detector = value['-DETECTOR-']
+                motion_gate = bool(value['-MOTION-GATE-'])
+                motion_sensitivity = float(value['-MOTION-SENSITIVITY-'])
+                motion_heartbeat = float(value['-MOTION-HEARTBEAT-'])
+                match_index = value['-MATCH-INDEX-']
+                match_nprobe = int(value['-MATCH-NPROBE-'])
+                match_nlist = int(value['-MATCH-NLIST-'])
+                pipeline_workers = max(0, int(value['-PIPELINE-WORKERS-']))
+                if tracking_mode and pipeline_workers > 0:
+                    # As tracks precisam de frames consecutivos no mesmo processo
+                    sg.PopupError("O rastreamento de faces não funciona com processos de detecção. Desligue um dos dois.")
+                else:
+                    self.PIPELINE_WORKERS = pipeline_workers  # Vale a partir da próxima identificação
+                    self.metrics.set_enabled(value['-METRICS-ENABLED-'])
 
-                self.recognition.setup_parameters(max_captures, capture_interval, expand_ratio, threshold_texture, threshold_reflection, dis_face_encoding, face_height_threshold)
-                sg.Popup("Configurações atualizadas com sucesso!")
+                    applied = self.recognition.setup_parameters(max_captures, capture_interval, expand_ratio, threshold_texture, threshold_reflection, dis_face_encoding, face_height_threshold, tracking_mode, detect_interval, detection_scale, adaptive_scale, detector, motion_gate, motion_sensitivity, motion_heartbeat, match_index, match_nprobe, match_nlist)
+                    if not applied:
+                        sg.PopupError("Erro ao aplicar as configurações. Verifique o arquivo de log.")
+                    else:
+                        sg.Popup("Configurações atualizadas com sucesso!")
             except ValueError:
                 sg.PopupError("Por favor, insira valores válidos para as configurações.")  
         elif event == '-IMAGE-BTN-NEXT-':
@@ -348,64 +570,134 @@ class Interface:
             self.detected_faces = []  # Limpa a lista de faces detectadas
         elif event == '-EXPORT-TO-CSV-':
             self.export_table_to_csv(self.window)
+        elif event == '-IMPORT-FACES-':
+            self.start_import(value['-IMPORT-PATH-'])
+        elif event == '-IMPORT-PROGRESS-':
+            done, total = value[event]
+            self.window['-IMPORT-STATUS-'].update(f"Codificando fotos: {done}/{total}")
+        elif event == '-IMPORT-DONE-':
+            summary, report_path = value[event]
+            self.window['-IMPORT-STATUS-'].update(f"{summary['accepted']} fotos aceitas, {summary['rejected']} rejeitadas")
+            if self.init_face_recognition:
+                self.recognition.reload_encodings()  # As fotos novas já estão no cache: recarga rápida
+            self.update_person_list()
+            message = f"Importação concluída: {summary['accepted']} fotos aceitas, {summary['new_persons']} pessoas novas."
+            if summary['rejected']:
+                message += f"\n{summary['rejected']} fotos rejeitadas, veja {report_path}"
+            sg.Popup(message)
+        elif event == '-IMPORT-ERROR-':
+            self.window['-IMPORT-STATUS-'].update('')
+            sg.PopupError(f"Erro na importação: {value[event]}")
 
         return False
     
     def updateVisibility(self, name):
+        self.visible_column = name
         columns = ['-CAMERA_COL-', '-TABLE_COL-', '-SETTINGS_COL-', '-ADD_IMAGE_COL-', '-LIST_IMAGES_COL-']
         visibility = [name == col for col in columns]
         for col, vis in zip(columns, visibility):
             self.window[col].update(visible=vis)
     
-    # verifica se a camera esta aberta
-    def cameraIsOpen(self):
-        try:
-            if self.cap is not None and self.cap.isOpened():
-                success, img = self.cap.read()
-                if not success:
-                    sg.PopupError("Erro ao acessar a webcam!")
-                    return False, img
-                return True, img
-            else:
-                sg.PopupError("Webcam não inicializada!")
-                return False, self.placeholder_img
-        except Exception as e:
-            sg.PopupError(f"Ocorreu um erro: {str(e)}")
-            logging.error(f"Ocorreu um erro: {str(e)}")
-            return False, None
-        
-    # inicializa a camera pelo index
-    def init_capture_webcam(self, camera_index=0):
-        try:
-            self.cap = cv.VideoCapture(camera_index)
-            if not self.cap.isOpened():
-                self.cap = None
-                return False
-            return True
-        except Exception as e:
-            logging.error(f"Erro ao inicializar a webcam {camera_index}: {str(e)}")
-            self.cap = None
+    # True do início da abertura até o evento com o resultado ser tratado na thread da interface
+    @property
+    def camera_opening(self):
+        return self.camera_open_thread is not None
+
+    # abre a primeira câmera disponível entre os índices em uma thread; o resultado chega como evento.
+    # Com outra abertura em andamento o pedido fica na fila (só o último) e roda quando ela terminar.
+    def open_camera(self, indexes, announce=False):
+        if self.camera_opening:
+            self.camera_open_pending = (indexes, announce)
             return False
-        
+        self.camera_open_thread = threading.Thread(target=self.run_open_camera, args=(indexes, announce), name='camera-open', daemon=True)
+        self.camera_open_thread.start()
+        return True
+
+    def open_pending_camera(self):
+        if self.camera_open_pending is not None and not self.camera_opening:
+            indexes, announce = self.camera_open_pending
+            self.camera_open_pending = None
+            self.open_camera(indexes, announce)
+
+    # roda na thread de abertura: não altera o estado da interface, só informa o índice que abriu
+    def run_open_camera(self, indexes, announce):
+        for index in indexes:
+            try:
+                cap = CameraCapture(index)
+                if cap.start():
+                    self.window.write_event_value('-CAMERA-OPENED-', (cap, index, announce))
+                    return
+            except Exception as e:
+                logging.error(f"Erro ao inicializar a webcam {index}: {str(e)}")
+        self.window.write_event_value('-CAMERA-OPEN-FAILED-', announce)
+
+    # abre a câmera selecionada apenas uma vez; com ela aberta, os frames são lidos pelo worker.
+    # Sem câmera aberta, a tentativa roda em segundo plano e o loop continua exibindo o placeholder.
     def try_open_cameras(self):
-        max_cameras = 5  # Define o número máximo de câmeras para testar
-        for index in range(max_cameras):
-            if self.init_capture_webcam(index):
-                return True, self.cameraIsOpen()
-        return False, (False, self.placeholder_img)
+        if self.cap is not None and self.cap.isOpened():
+            return True
+
+        now = time.monotonic()
+        if not self.camera_opening and now - self.last_camera_attempt >= self.CAMERA_RETRY_INTERVAL:
+            self.last_camera_attempt = now
+            # Só a câmera selecionada e as câmeras já encontradas pela busca, nunca índices às cegas
+            indexes = [self.cam_index] + [index for index, _ in self.camera_discovery.cameras if index != self.cam_index]
+            self.open_camera(indexes)
+        return False
+    
+    # atualiza a idade do frame e o número de frames descartados
+    def update_capture_stats(self):
+        stats = self.cap.stats()
+        self.window['-CAPTURE-STATS-'].update(f"{stats['frame_age_ms']} ms - {stats['frames_dropped']} descartados - escala {self.recognition.scaler.scale:.2f} - detecção pulada em {self.recognition.motion_gate.skip_ratio:.0%}")
             
+    # mostra os percentis de latência por etapa e grava o arquivo de métricas periodicamente
+    def update_metrics(self):
+        now = time.monotonic()
+        if not self.metrics.enabled or now - self.last_metrics_update < self.METRICS_UPDATE_INTERVAL:
+            return
+        self.last_metrics_update = now
+        self.window['-METRICS-'].update(self.metrics.format_summary())
+        self.metrics.maybe_dump()
+
+    # A interface quer frames: janela não minimizada, mostrando a câmera, a tabela ou a tela cheia
+    def wants_frames(self):
+        try:
+            if self.window.TKroot.state() == 'iconic':
+                return self.full_screen_active
+        except Exception:
+            pass
+        return self.full_screen_active or self.visible_column in ('-CAMERA_COL-', '-TABLE_COL-')
+
+    # tarefas periódicas do loop da interface; o reconhecimento roda no worker
     def module_functions(self):
-        open, (camera_open, img) = self.try_open_cameras()
-        if camera_open and self.init_face_recognition:
-            self.recognition.init_face_recognition(img)
-            imgbytes = cv.imencode('.png', img)[1].tobytes()
-            self.image_bytes_camera = imgbytes
+        self.worker.visible = self.wants_frames()
+        self.update_metrics()
+        if self.camera_discovery.devices_changed():
+            self.refresh_cameras()  # Câmera conectada ou removida
+        if not self.try_open_cameras():
+            self.update_camera(self.camera_opening, self.placeholder_img)  # Sem erro enquanto a câmera ainda está abrindo
+        self.update_full_screen()
+
+    # exibe o último resultado do worker (evento -FRAME-, no máximo renderer_fps por segundo)
+    def show_frame(self):
+        img = self.worker.take()
+        if img is None or self.cap is None:
+            return
+        self.update_capture_stats()
+        if self.init_face_recognition:
+            if self.pipeline is not None:
+                self.update_pipeline_stats()
             texture_threshold = f"{self.recognition.value_round_is_fake_via_texture} ({self.recognition.THRESHOLD_TEXTURE}) - {self.recognition.value_is_fake_via_texture}"
             reflection_threshold = f"{self.recognition.value_round_has_reflection} ({self.recognition.THRESHOLD_REFLECTION}) - {self.recognition.value_has_reflection}"
             self.window['-TEXTURE-THRESHOLD-'].update(f'{texture_threshold}')
             self.window['-REFLECTION-THRESHOLD-'].update(f'{reflection_threshold}')
-        self.update_table()
-        self.update_camera(camera_open, img)
+            writer_stats = self.recognition.image_writer.stats()
+            self.window['-WRITER-STATS-'].update(f"{writer_stats['written']} salvas - {writer_stats['dropped']} descartadas - fila {writer_stats['queue_depth']}")
+            self.update_table()
+        self.update_camera(True, img)
+        self.update_full_screen()
+
+    def update_full_screen(self):
         if self.full_screen_active:
             if self.full_screen_window:
                 self.open_full_screen_camera(update_only=True)
@@ -413,8 +705,12 @@ class Interface:
                 self.open_full_screen_camera()
                 
     def get_screen_size(self):
-        for m in get_monitors():
-            return m.width, m.height  # Retorna a resolução do primeiro monitor
+        if self.screen_size is None:
+            from screeninfo import get_monitors  # Só necessário ao abrir a tela cheia
+            for m in get_monitors():
+                self.screen_size = (m.width, m.height)  # Retorna a resolução do primeiro monitor
+                break
+        return self.screen_size
         
     def open_full_screen_camera(self, update_only=False):
         screen_width, screen_height = self.get_screen_size()
@@ -428,22 +724,14 @@ class Interface:
                 self.full_screen_window.Maximize()
                 self.full_screen_active = True
         if self.full_screen_active and self.full_screen_window:
-            if self.image_bytes_camera:
-                # Decode the image from the bytes
-                frame = cv.imdecode(np.frombuffer(self.image_bytes_camera, np.uint8), cv.IMREAD_COLOR)
-                original_height, original_width = frame.shape[:2]
-                
-                # Calculate the new height maintaining the aspect ratio
-                new_height = int(screen_width * (original_height / original_width))
-                
-                # Resize the frame to the new dimensions
-                frame_resized = cv.resize(frame, (screen_width, new_height))
-                imgbytes = cv.imencode('.png', frame_resized)[1].tobytes()
+            if self.renderer.frame is not None and self.renderer.due('full_screen'):
+                # Redimensiona direto do frame anotado em memória, mantendo o aspect ratio pela largura da tela
+                imgbytes, size = self.renderer.encode(screen_width)
                 
                 # Update the image in the window
-                self.full_screen_window['-FULL-IMAGE-CAMERA-'].update(data=imgbytes, size=(screen_width, new_height))
+                self.full_screen_window['-FULL-IMAGE-CAMERA-'].update(data=imgbytes, size=size)
             
-            event, values = self.full_screen_window.read(timeout=10)
+            event, values = self.full_screen_window.read(timeout=0)
             if event == sg.WIN_CLOSED or event == 'Fechar':
                 self.full_screen_active = False
                 self.full_screen_window.close()
@@ -468,7 +756,7 @@ class Interface:
 
     def capture_image(self):
         try:
-            if self.cap.isOpened():
+            if self.cap is not None and self.cap.isOpened():
                 time.sleep(0.1)  # Pequeno delay para garantir que a câmera esteja pronta
                 ret, frame = self.cap.read()
                 if ret:
@@ -527,6 +815,42 @@ class Interface:
         self.current_image_data = None  # Resetar os dados da imagem após salvar
         self.detected_faces = []  # Limpar a lista de faces detectadas
 
+    # importa uma pasta ou zip de fotos em segundo plano; o progresso chega como eventos da janela
+    def start_import(self, source):
+        if not source or not os.path.exists(source):
+            sg.Popup("Selecione uma pasta ou um arquivo .zip para importar.")
+            return
+        if self.warming_up:
+            sg.Popup("Aguarde o carregamento dos modelos terminar.")
+            return
+        if self.import_thread is not None and self.import_thread.is_alive():
+            sg.Popup("Já existe uma importação em andamento.")
+            return
+        self.window['-IMPORT-STATUS-'].update("Preparando importação...")
+        self.import_thread = threading.Thread(target=self.run_import, args=(source,), name='enrollment-import', daemon=True)
+        self.import_thread.start()
+
+    def run_import(self, source):
+        last_percent = [-1]
+
+        def progress(done, total):
+            percent = 100 * done // total
+            if percent != last_percent[0]:  # No máximo 100 eventos, independente do número de fotos
+                last_percent[0] = percent
+                self.window.write_event_value('-IMPORT-PROGRESS-', (done, total))
+
+        try:
+            persons_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'persons.json')
+            enrollment = Enrollment(self.PATH_FACES, persons_path, detector=self.recognition.DETECTOR)
+            summary, report = enrollment.import_source(source, progress)
+            report_path = f"{source.rstrip(os.sep)}.rejeitadas.csv"
+            if report:
+                write_report(report_path, report)
+            self.window.write_event_value('-IMPORT-DONE-', (summary, report_path))
+        except Exception as e:
+            logging.error(f"Erro na importação de {source}: {str(e)}")
+            self.window.write_event_value('-IMPORT-ERROR-', str(e))
+
     def export_table_to_csv(self, window):
         table_data = window['-TABLE-'].get() # Recuperar os dados da tabela
         filename = sg.popup_get_file('Salvar como', save_as=True, no_window=True, file_types=(("CSV Files", "*.csv"),), default_extension='.csv')
@@ -0,0 +1,56 @@
+import time
+import cv2 as cv  # OpenCV para redimensionar o recorte e calcular o Laplaciano
+from tracker import FaceTracker
+
+
+# Métricas anti-spoofing (textura e reflexo) em uma única passada sobre um recorte limpo e de tamanho
+# fixo, com cache por face: a mesma pessoa diante da câmera não é reavaliada a cada frame.
+# O valor em cache só vale para a mesma caixa (IoU mínimo): um celular com a foto da pessoa ao
+# lado dela tem outra caixa e é medido, mesmo que o matcher dê o mesmo nome às duas faces.
+class LivenessChecker:
+    def __init__(self, crop_size=160, ttl=2.0, max_entries=256, min_iou=0.5):
+        self.crop_size = crop_size  # Lado do recorte normalizado; os limiares valem para esse tamanho
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.min_iou = min_iou
+        self.cache = {}  # chave da face -> (instante, caixa, textura, brilho)
+        self.stats = {'measured': 0, 'cached': 0}
+
+    # Variância do Laplaciano (textura) e brilho médio do canal V do HSV (reflexo).
+    # V = max(B, G, R), então não é preciso converter para HSV; o Laplaciano usa float32.
+    def measure(self, face_image):
+        face = cv.resize(face_image, (self.crop_size, self.crop_size), interpolation=cv.INTER_AREA)
+        gray = cv.cvtColor(face, cv.COLOR_BGR2GRAY)
+        _, stddev = cv.meanStdDev(cv.Laplacian(gray, cv.CV_32F))
+        brightness = cv.mean(face.max(axis=2))[0]
+        return round(float(stddev[0][0]) ** 2, 2), round(float(brightness), 2)
+
+    # Métricas da face `key` (id da track no modo de rastreamento; senão nome da pessoa ou do desconhecido)
+    # na caixa `box` (top, right, bottom, left), recalculadas quando o valor em cache expirou ou foi medido
+    # em outra caixa. Sem box o cache vale só pela chave.
+    def check(self, key, face_image, box=None, now=None):
+        now = time.monotonic() if now is None else now
+        cached = self.cache.get(key)
+        if cached is not None and now - cached[0] < self.ttl and self.same_box(cached[1], box):
+            self.stats['cached'] += 1
+            return cached[2], cached[3]
+        texture, brightness = self.measure(face_image)
+        if len(self.cache) >= self.max_entries:
+            self.prune(now)
+        self.cache[key] = (now, box, texture, brightness)
+        self.stats['measured'] += 1
+        return texture, brightness
+
+    def same_box(self, cached_box, box):
+        if box is None or cached_box is None:
+            return box is None and cached_box is None
+        return FaceTracker.iou(cached_box, box) >= self.min_iou
+
+    def prune(self, now):
+        for key in [key for key, (measured_at, _, _, _) in self.cache.items() if now - measured_at >= self.ttl]:
+            del self.cache[key]
+        if len(self.cache) >= self.max_entries:
+            self.cache.clear()  # Muitas faces distintas dentro do TTL: recomeça em vez de crescer
+
+    def reset(self):
+        self.cache.clear()
@@ -1,14 +1,23 @@
-from interface import Interface 
+import argparse
+import multiprocessing
+from interface import Interface
 import PySimpleGUI as sg
 
 class App:
-    def __init__(self):
+    def __init__(self, warmup=True, autostart=False):
         try:
-            self.interface = Interface()
+            self.interface = Interface(warmup=warmup, autostart=autostart)
         except Exception as e:
             sg.PopupError(f"Erro ao inicializar a interface: {str(e)}")
             return
-    
+
 if __name__ == "__main__":
-    app = App()
-    app.interface.run()
\ No newline at end of file
+    # No executável do PyInstaller os processos filhos (pipeline, codificação) reexecutam o binário:
+    # freeze_support desvia esses filhos para o pool antes de abrir outra janela
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(description='Controle de presença por reconhecimento facial.')
+    parser.add_argument('--autostart', action='store_true', help='inicia a identificação assim que os modelos e a galeria carregarem')
+    parser.add_argument('--no-warmup', action='store_true', help='não carrega os modelos em segundo plano na abertura')
+    args = parser.parse_args()
+    app = App(warmup=not args.no_warmup, autostart=args.autostart)
+    app.interface.run()
@@ -0,0 +1,206 @@
+import numpy as np
+
+
+# Distâncias euclidianas entre consultas (N x D) e vetores (M x D) via |q|² + |g|² - 2 q·g
+def pairwise_distances(queries, vectors, vectors_sq=None):
+    if vectors_sq is None:
+        vectors_sq = np.einsum('ij,ij->i', vectors, vectors)
+    query_sq = np.einsum('ij,ij->i', queries, queries)
+    dist = query_sq[:, None] + vectors_sq[None, :] - 2.0 * (queries @ vectors.T)
+    np.maximum(dist, 0.0, out=dist)
+    return np.sqrt(dist, out=dist)
+
+
+# Seleciona os k menores valores de cada linha, já ordenados
+def top_k(dist, k):
+    k = min(k, dist.shape[1])
+    if k < dist.shape[1]:
+        top = np.argpartition(dist, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(dist.shape[1]), dist.shape)
+    top_dist = np.take_along_axis(dist, top, axis=1)
+    order = np.argsort(top_dist, axis=1)
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_dist, order, axis=1)
+
+
+# Busca exata: varredura linear vetorizada sobre toda a galeria
+class ExactIndex:
+    def __init__(self, dimension=128):
+        self.dimension = dimension
+        self.build(np.empty((0, dimension), dtype=np.float32))
+
+    def build(self, vectors):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.vectors_sq = np.einsum('ij,ij->i', self.vectors, self.vectors)
+
+    def add(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+        self.vectors = np.ascontiguousarray(np.vstack([self.vectors, vectors]))
+        self.vectors_sq = np.concatenate([self.vectors_sq, np.einsum('ij,ij->i', vectors, vectors)])
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def distances(self, queries):
+        return pairwise_distances(queries, self.vectors, self.vectors_sq)
+
+    # Retorna (índices, distâncias), ambos N x k
+    def search(self, queries, k=1):
+        return top_k(self.distances(queries), k)
+
+
+# Busca aproximada por partição IVF: k-means divide a galeria em nlist listas e cada consulta
+# só visita as nprobe listas mais próximas. nprobe maior aumenta o recall e o custo.
+class IVFIndex(ExactIndex):
+    def __init__(self, dimension=128, nlist=None, nprobe=8, train_iterations=10, train_sample=50000, min_size=2000, retrain_growth=2.0, seed=0):
+        self.nlist = nlist  # None escolhe ~sqrt(M) listas
+        self.nprobe = nprobe
+        self.train_iterations = train_iterations
+        self.train_sample = train_sample
+        self.min_size = min_size  # Abaixo disso a varredura exata é mais rápida que o IVF
+        self.retrain_growth = retrain_growth  # Retreina quando a galeria cresce esse fator desde o último treino
+        self.rng = np.random.default_rng(seed)
+        self.centroids = None
+        super().__init__(dimension)
+
+    def build(self, vectors):
+        super().build(vectors)
+        self.train()
+
+    # Inserção incremental: novos vetores entram na lista do centróide mais próximo
+    def add(self, vectors):
+        start = len(self)
+        super().add(vectors)
+        if self.centroids is None or len(self) >= self.trained_size * self.retrain_growth:
+            self.train()
+            return
+        new_rows = np.arange(start, len(self))
+        self.assign_lists(new_rows)
+
+    def train(self):
+        count = len(self)
+        self.lists = []
+        if count == 0 or count < self.min_size:
+            self.centroids = None
+            self.trained_size = count
+            return
+
+        nlist = self.nlist or int(np.sqrt(count))
+        nlist = max(1, min(nlist, count))
+        sample_size = min(count, max(self.train_sample, nlist * 40))
+        sample = self.vectors[self.rng.choice(count, sample_size, replace=False)]
+
+        centroids = sample[self.rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(self.train_iterations):
+            labels = self.nearest_centroid(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=nlist)
+            empty = counts == 0
+            centroids[~empty] = sums[~empty] / counts[~empty, None]
+            # Listas vazias recebem um ponto aleatório para não desperdiçar centróides
+            if empty.any():
+                centroids[empty] = sample[self.rng.choice(sample_size, int(empty.sum()), replace=False)]
+
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.centroids_sq = np.einsum('ij,ij->i', self.centroids, self.centroids)
+        self.lists = [np.empty(0, dtype=np.int64) for _ in range(nlist)]
+        self.assign_lists(np.arange(count))
+        self.trained_size = count
+
+    # Atribuição em blocos para limitar a memória da matriz de distâncias
+    def nearest_centroid(self, vectors, centroids, chunk=16384):
+        centroids_sq = np.einsum('ij,ij->i', centroids, centroids)
+        labels = np.empty(vectors.shape[0], dtype=np.int64)
+        for start in range(0, vectors.shape[0], chunk):
+            block = vectors[start:start + chunk]
+            labels[start:start + chunk] = np.argmin(pairwise_distances(block, centroids, centroids_sq), axis=1)
+        return labels
+
+    def assign_lists(self, rows):
+        labels = self.nearest_centroid(self.vectors[rows], self.centroids)
+        order = np.argsort(labels, kind='stable')
+        boundaries = np.searchsorted(labels[order], np.arange(len(self.lists) + 1))
+        for list_id in range(len(self.lists)):
+            members = rows[order[boundaries[list_id]:boundaries[list_id + 1]]]
+            if members.size:
+                self.lists[list_id] = np.concatenate([self.lists[list_id], members])
+
+    def search(self, queries, k=1):
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dimension)
+        if self.centroids is None:
+            return super().search(queries, k)
+
+        nprobe = min(self.nprobe, len(self.lists))
+        probe_dist = pairwise_distances(queries, self.centroids, self.centroids_sq)
+        probes = np.argpartition(probe_dist, nprobe - 1, axis=1)[:, :nprobe]
+
+        indices = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        distances = np.full((queries.shape[0], k), np.inf, dtype=np.float32)
+        for i, query in enumerate(queries):
+            candidates = np.concatenate([self.lists[list_id] for list_id in probes[i]])
+            if candidates.size == 0:
+                continue
+            dist = pairwise_distances(query[None, :], self.vectors[candidates], self.vectors_sq[candidates])
+            top, top_dist = top_k(dist, k)
+            indices[i, :top.shape[1]] = candidates[top[0]]
+            distances[i, :top.shape[1]] = top_dist[0]
+        return indices, distances
+
+
+INDEX_BACKENDS = {
+    'exact': ExactIndex,
+    'ivf': IVFIndex,
+}
+
+
+class FaceMatcher:
+    def __init__(self, tolerance=0.6, dimension=128, index='exact', **index_params):
+        self.tolerance = tolerance  # Mesmo valor padrão de fr.compare_faces
+        self.dimension = dimension
+        # Aceita o nome de um backend registrado ou uma instância já configurada
+        self.index = INDEX_BACKENDS[index](dimension=dimension, **index_params) if isinstance(index, str) else index
+        self.set_gallery([], [])
+
+    # Substitui a galeria por uma matriz float32 contígua (M x 128)
+    def set_gallery(self, encodings, names):
+        if len(encodings):
+            gallery = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dimension)
+        else:
+            gallery = np.empty((0, self.dimension), dtype=np.float32)
+        self.index.build(gallery)
+        # Sequências indexáveis (ex.: tabela de ids em memória compartilhada) são usadas sem cópia
+        self.names = names if hasattr(names, '__getitem__') else list(names)
+
+    # Adiciona novas encodings (novos cadastros) sem reconstruir o índice inteiro
+    def add(self, encodings, names):
+        self.index.add(encodings)
+        self.names = list(self.names) + list(names)
+
+    @property
+    def gallery(self):
+        return self.index.vectors
+
+    def __len__(self):
+        return len(self.index)
+
+    # Calcula de uma vez a matriz de distâncias N x M entre as faces do frame e a galeria
+    def distances(self, encodings):
+        queries = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dimension)
+        return pairwise_distances(queries, self.index.vectors, self.index.vectors_sq)
+
+    # Retorna, para cada face, os k candidatos mais próximos como [(nome, distância), ...]
+    def match(self, encodings, k=1):
+        if len(encodings) == 0:
+            return []
+        if len(self) == 0:
+            return [[] for _ in range(len(encodings))]
+
+        queries = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dimension)
+        top, top_dist = self.index.search(queries, k)
+        return [[(self.names[index], float(distance)) for index, distance in zip(row_index, row_dist) if index >= 0]
+                for row_index, row_dist in zip(top, top_dist)]
+
+    # Equivalente a fr.compare_faces para a distância do melhor candidato
+    def is_match(self, distance):
+        return distance <= self.tolerance
@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import logging
+import threading
+import numpy as np
+
+
+# Janela circular de latências de uma etapa: memória fixa, cada registro só sobrescreve uma posição
+class LatencyWindow:
+    def __init__(self, size=512):
+        self.samples = np.zeros(size, dtype=np.float64)
+        self.size = size
+        self.index = 0
+        self.count = 0  # Total desde o início (contador Prometheus)
+        self.total = 0.0
+
+    def record(self, seconds):
+        self.samples[self.index] = seconds
+        self.index = (self.index + 1) % self.size
+        self.count += 1
+        self.total += seconds
+
+    # Percentis calculados só na leitura (UI ou dump), nunca no caminho do frame
+    def summary(self):
+        filled = self.samples[:min(self.count, self.size)]
+        if not filled.size:
+            return {'count': 0, 'sum': 0.0, 'p50': None, 'p95': None, 'p99': None}
+        p50, p95, p99 = np.percentile(filled, [50, 95, 99])
+        return {'count': self.count, 'sum': self.total, 'p50': float(p50), 'p95': float(p95), 'p99': float(p99)}
+
+
+# Tempos por etapa do loop (captura, detecção, encoding, liveness, tabela, exibição).
+# Desligado, start() retorna None e stop() sai na primeira linha: custo de uma chamada de função.
+class Metrics:
+    FORMATS = {'prometheus', 'json'}
+
+    def __init__(self, enabled=False, window=512, dump_path=None, dump_format='prometheus', dump_interval=30.0, namespace='face_attendance'):
+        if dump_format not in self.FORMATS:
+            raise ValueError(f"Formato de métricas desconhecido: {dump_format}")
+        self.enabled = enabled
+        self.window = window
+        self.dump_path = dump_path
+        self.dump_format = dump_format
+        self.dump_interval = dump_interval
+        self.namespace = namespace
+        self.windows = {}
+        self.lock = threading.Lock()  # A thread do pipeline também registra tempos
+        self.last_dump = time.monotonic()
+
+    def set_enabled(self, enabled):
+        self.enabled = bool(enabled)
+
+    def start(self):
+        return time.perf_counter() if self.enabled else None
+
+    def stop(self, stage, started):
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            window = self.windows.get(stage)
+            if window is None:
+                window = self.windows[stage] = LatencyWindow(self.window)
+            window.record(elapsed)
+
+    def summary(self):
+        with self.lock:
+            return {stage: window.summary() for stage, window in self.windows.items()}
+
+    # Texto curto para a interface: uma linha por etapa, em milissegundos
+    def format_summary(self):
+        lines = []
+        for stage, stats in self.summary().items():
+            if stats['count']:
+                lines.append(f"{stage}: {1000 * stats['p50']:.1f} / {1000 * stats['p95']:.1f} / {1000 * stats['p99']:.1f} ms ({stats['count']})")
+        return '\n'.join(lines)
+
+    def render_prometheus(self):
+        metric = f"{self.namespace}_stage_seconds"
+        lines = [f"# HELP {metric} Latência por etapa do reconhecimento.", f"# TYPE {metric} summary"]
+        for stage, stats in self.summary().items():
+            for quantile in ('p50', 'p95', 'p99'):
+                if stats[quantile] is not None:
+                    lines.append(f'{metric}{{stage="{stage}",quantile="0.{quantile[1:]}"}} {stats[quantile]:.6f}')
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {stats["sum"]:.6f}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {stats["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def render_json(self):
+        return json.dumps({'timestamp': time.time(), 'stages': self.summary()}, indent=2)
+
+    # Grava o arquivo de métricas se o intervalo passou; chamado pelo loop principal
+    def maybe_dump(self):
+        if not self.enabled or not self.dump_path:
+            return False
+        now = time.monotonic()
+        if now - self.last_dump < self.dump_interval:
+            return False
+        self.last_dump = now
+        return self.dump()
+
+    def dump(self):
+        try:
+            content = self.render_prometheus() if self.dump_format == 'prometheus' else self.render_json()
+            tmp_path = self.dump_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                file.write(content)
+            os.replace(tmp_path, self.dump_path)  # Leitores (node_exporter, scripts) nunca veem o arquivo pela metade
+            return True
+        except Exception as e:
+            logging.error(f"Erro ao gravar métricas em {self.dump_path}: {str(e)}")
+            return False
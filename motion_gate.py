@@ -0,0 +1,68 @@
+import time
+import cv2 as cv  # OpenCV para a miniatura e o modelo de fundo
+
+
+# Pré-filtro antes da detecção: compara uma miniatura em tons de cinza do frame com um fundo
+# médio móvel e só libera a detecção quando a cena muda, enquanto há faces à vista ou a cada
+# heartbeat segundos. Com a entrada vazia, a maioria dos frames custa só um resize.
+class MotionGate:
+    def __init__(self, enabled=True, sensitivity=12.0, min_changed=0.005, heartbeat=2.0, thumb_size=(64, 48), learning_rate=0.05, hold=1.0):
+        self.enabled = enabled
+        self.sensitivity = sensitivity  # Diferença mínima de intensidade (0-255) para um pixel da miniatura contar como mudança
+        self.min_changed = min_changed  # Fração mínima de pixels alterados para considerar movimento
+        self.heartbeat = heartbeat  # Detecção forçada a cada heartbeat segundos, mesmo com a cena parada
+        self.thumb_size = thumb_size
+        self.learning_rate = learning_rate  # Quanto cada frame entra no fundo; mudanças lentas de luz são absorvidas
+        self.hold = hold  # Segundos de detecção após o último movimento
+        self.background = None
+        self.last_detection = None
+        self.last_motion = None
+        self.faces_visible = False
+        self.stats = {'frames': 0, 'skipped': 0, 'motion': 0, 'heartbeat': 0}
+
+    def reset(self):
+        self.background = None
+        self.faces_visible = False
+
+    def thumbnail(self, frame):
+        thumb = cv.resize(frame, self.thumb_size, interpolation=cv.INTER_AREA)
+        if thumb.ndim == 3:
+            thumb = cv.cvtColor(thumb, cv.COLOR_BGR2GRAY)
+        return thumb.astype('float32')
+
+    # Fração da miniatura que difere do fundo; o fundo é atualizado em seguida
+    def changed_fraction(self, frame):
+        thumb = self.thumbnail(frame)
+        if self.background is None or self.background.shape != thumb.shape:
+            self.background = thumb
+            return 1.0
+        diff = cv.absdiff(thumb, self.background)
+        cv.accumulateWeighted(thumb, self.background, self.learning_rate)
+        return cv.countNonZero(cv.threshold(diff, self.sensitivity, 1, cv.THRESH_BINARY)[1]) / diff.size
+
+    # True se o frame deve passar pela detecção de faces
+    def check(self, frame, now=None):
+        if not self.enabled:
+            return True
+        now = time.monotonic() if now is None else now
+        self.stats['frames'] += 1
+        if self.changed_fraction(frame) >= self.min_changed:
+            self.last_motion = now
+            self.stats['motion'] += 1
+        if self.faces_visible or (self.last_motion is not None and now - self.last_motion < self.hold):
+            self.last_detection = now
+            return True
+        if self.last_detection is None or now - self.last_detection >= self.heartbeat:
+            self.last_detection = now
+            self.stats['heartbeat'] += 1
+            return True
+        self.stats['skipped'] += 1
+        return False
+
+    # Resultado da detecção liberada: com faces no frame a detecção continua mesmo sem movimento
+    def report(self, faces_found):
+        self.faces_visible = faces_found > 0
+
+    @property
+    def skip_ratio(self):
+        return self.stats['skipped'] / self.stats['frames'] if self.stats['frames'] else 0.0
@@ -0,0 +1,214 @@
+import os
+import sys
+import json
+import time
+import queue
+import logging
+import argparse
+import multiprocessing as mp
+from datetime import datetime
+from recognition import Recognition, make_matcher, prepare_frame, detect_and_encode_timed, face_heights, find_sightings, sighting_is_live
+from matcher import INDEX_BACKENDS
+from capture import CameraCapture
+from liveness import LivenessChecker
+from motion_gate import MotionGate
+from compaction import RawRecheck
+from detection_scale import AdaptiveScale
+from detectors import DETECTOR_BACKENDS
+from shared_gallery import SharedGalleryPublisher, SharedGalleryReader
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATS_INTERVAL = 2.0
+
+
+# Processo de uma câmera: captura, detecção, encoding e matching. A galeria é lida da memória
+# compartilhada, sem cópia, e trocada quando o processo principal publica uma nova geração.
+# Só faces que passam no liveness (textura e reflexo) viram aparições. Com a galeria compactada,
+# raw_prefix aponta para a galeria original, usada para reconferir o vencedor (None desliga).
+# Com a cena parada e sem faces, o motion gate pula a detecção (motion_params = (ligado, sensibilidade, heartbeat)).
+def camera_worker(camera_index, gallery_prefix, raw_prefix, dis_face_encoding, face_height_threshold, detection_scale, adaptive_scale, detector, match_params, liveness_params, motion_params, events, stop_event):
+    try:
+        gallery = SharedGalleryReader(gallery_prefix)
+        recheck = RawRecheck(SharedGalleryReader(raw_prefix)) if raw_prefix else None
+        matcher = make_matcher(*match_params)  # (índice, nprobe, nlist)
+        liveness = LivenessChecker()
+        enabled, sensitivity, heartbeat = motion_params
+        motion_gate = MotionGate(enabled, sensitivity, heartbeat=heartbeat)
+        scaler = AdaptiveScale(detection_scale, adaptive=adaptive_scale)  # Cada câmera ajusta a própria escala
+        capture = CameraCapture(camera_index)
+        if not capture.start():
+            events.put(('error', camera_index, f"Não foi possível abrir a câmera {camera_index}"))
+            return
+    except Exception as e:
+        events.put(('error', camera_index, str(e)))
+        return
+
+    frames = 0
+    latency_total = 0.0
+    latency_max = 0.0
+    last_seq = -1
+    last_report = time.monotonic()
+    try:
+        while not stop_event.is_set() and capture.isOpened():
+            if gallery.refresh():
+                matcher.set_gallery(gallery.matrix, gallery.names)
+            if recheck is not None:
+                recheck.refresh()
+            if capture.latest_seq() == last_seq:
+                capture.new_frame.wait(0.05)
+                continue
+            age = capture.frame_age() or 0.0
+            success, img = capture.read()
+            last_seq = capture.last_read_seq
+            if not success:
+                continue
+            started = time.monotonic()
+            if motion_gate.check(img):
+                scale = scaler.next_scale()
+                faces, encodes, elapsed = detect_and_encode_timed(prepare_frame(img, scale), detector)
+                motion_gate.report(len(faces))
+                scaler.update(scale, face_heights(faces, scale), elapsed)
+                for class_name, distance, faceLoc in find_sightings(matcher, faces, encodes, scale, dis_face_encoding, face_height_threshold, recheck):
+                    if sighting_is_live(liveness, img, faceLoc, scale, liveness_params):
+                        events.put(('sighting', camera_index, class_name, distance, time.time()))
+
+            # Latência = idade do frame ao ser lido + tempo de processamento
+            latency = age + time.monotonic() - started
+            frames += 1
+            latency_total += latency
+            latency_max = max(latency_max, latency)
+            now = time.monotonic()
+            if now - last_report >= STATS_INTERVAL:
+                events.put(('stats', camera_index, {
+                    'fps': round(frames / (now - last_report), 1),
+                    'latency_ms_avg': round(1000 * latency_total / frames, 1) if frames else None,
+                    'latency_ms_max': round(1000 * latency_max, 1),
+                    'frames_dropped': capture.frames_dropped,
+                    'scale': scaler.scale,
+                    'skip_ratio': round(motion_gate.skip_ratio, 3),  # Fração dos frames sem detecção (cena parada)
+                }))
+                frames, latency_total, latency_max, last_report = 0, 0.0, 0.0, now
+    finally:
+        capture.release()
+        matcher.set_gallery([], [])
+        gallery.close()
+        if recheck is not None:
+            recheck.close()
+
+
+class MultiCameraRunner:
+    def __init__(self, args, output):
+        self.args = args
+        self.output = output
+        self.recognition = Recognition(
+            path_faces=args.faces,
+            save_path_recognized=os.path.join(BASE_DIR, 'recognized_faces'),
+            save_path_unrecognized=os.path.join(BASE_DIR, 'unrecognized_faces'),
+            persons_path=args.persons,
+            draw_overlays=False,
+            compact_gallery=not args.no_compact,
+            recheck_raw=not args.no_recheck,
+        )
+        self.camera_stats = {}
+        self.processes = []
+        # A galeria é publicada uma vez em memória compartilhada e republicada a cada reload_encodings
+        self.recognition.gallery_publisher = SharedGalleryPublisher()
+        if self.recognition.COMPACT_GALLERY and self.recognition.RECHECK_RAW:
+            self.recognition.raw_gallery_publisher = SharedGalleryPublisher(f"{self.recognition.gallery_publisher.prefix}raw")
+
+    def write_event(self, event, name, dis, timestamp, camera_index):
+        record = {'event': event, 'name': name, 'distance': float(dis), 'timestamp': timestamp.isoformat(sep=' '), 'camera': camera_index}
+        self.output.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.output.flush()
+
+    def run(self):
+        self.recognition.reload_encodings()
+        last_reload = time.monotonic()
+        events = mp.Queue()
+        stop_event = mp.Event()
+        raw_prefix = self.recognition.raw_gallery_publisher.prefix if self.recognition.raw_gallery_publisher is not None else None
+        for camera_index in self.args.cameras:
+            process = mp.Process(target=camera_worker, name=f'camera-{camera_index}', daemon=True,
+                                 args=(camera_index, self.recognition.gallery_publisher.prefix, raw_prefix, self.args.dis_face_encoding,
+                                       self.args.face_height_threshold, self.args.detection_scale, self.args.adaptive_scale,
+                                       self.args.detector, (self.args.match_index, self.args.nprobe, self.args.nlist),
+                                       (self.args.expand_ratio, self.args.threshold_texture, self.args.threshold_reflection),
+                                       (not self.args.no_motion_gate, self.args.motion_sensitivity, self.args.motion_heartbeat), events, stop_event))
+            process.start()
+            self.processes.append(process)
+
+        try:
+            while any(process.is_alive() for process in self.processes):
+                if self.args.reload_interval and time.monotonic() - last_reload >= self.args.reload_interval:
+                    # Novos cadastros chegam aos workers sem reiniciá-los
+                    self.recognition.reload_encodings()
+                    last_reload = time.monotonic()
+                try:
+                    message = events.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                kind, camera_index = message[0], message[1]
+                if kind == 'sighting':
+                    _, _, class_name, distance, timestamp = message
+                    name = self.recognition.person_name.get(class_name, "Desconhecido").upper()
+                    now = datetime.fromtimestamp(timestamp)
+                    # Um único AttendanceStore deduplica as presenças vindas de todas as câmeras
+                    event = self.recognition.attendance.mark(name, distance, now)
+                    if event is not None:
+                        self.write_event(event, name, distance, now, camera_index)
+                elif kind == 'stats':
+                    self.camera_stats[camera_index] = message[2]
+                    print(f"câmera {camera_index}: {message[2]}", file=sys.stderr)
+                elif kind == 'error':
+                    logging.error(message[2])
+                    print(message[2], file=sys.stderr)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stop_event.set()
+            for process in self.processes:
+                process.join(timeout=3.0)
+            self.recognition.close()
+            self.recognition.gallery_publisher.close()
+            if self.recognition.raw_gallery_publisher is not None:
+                self.recognition.raw_gallery_publisher.close()
+        return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Reconhecimento em várias câmeras ao mesmo tempo, um processo por câmera.')
+    parser.add_argument('--cameras', type=int, nargs='+', required=True, help='índices das câmeras')
+    parser.add_argument('--output', default='-', help='arquivo JSONL de saída; "-" escreve em stdout')
+    parser.add_argument('--faces', default=os.path.join(BASE_DIR, 'faces'))
+    parser.add_argument('--persons', default=os.path.join(BASE_DIR, 'persons.json'))
+    parser.add_argument('--dis-face-encoding', type=float, default=0.55)
+    parser.add_argument('--face-height-threshold', type=float, default=250)
+    parser.add_argument('--threshold-texture', type=float, default=140)
+    parser.add_argument('--threshold-reflection', type=float, default=180)
+    parser.add_argument('--expand-ratio', type=float, default=0.25)
+    parser.add_argument('--no-compact', action='store_true', help='compara com todas as fotos em vez de centróide + exemplares por pessoa')
+    parser.add_argument('--no-recheck', action='store_true', help='não reconfere o vencedor contra todas as fotos da pessoa')
+    parser.add_argument('--detection-scale', type=float, default=0.25, help='redução do frame antes da detecção')
+    parser.add_argument('--adaptive-scale', action='store_true', help='ajusta a escala de cada câmera pelo tamanho dos rostos e pela latência')
+    parser.add_argument('--detector', default='hog', choices=sorted(DETECTOR_BACKENDS), help='backend de detecção (ver benchmarks/bench_detectors.py)')
+    parser.add_argument('--match-index', default='exact', choices=sorted(INDEX_BACKENDS), help='busca na galeria: exata ou IVF aproximada (galerias grandes)')
+    parser.add_argument('--nprobe', type=int, default=8, help='listas do IVF visitadas por consulta; maior = mais recall, mais lento')
+    parser.add_argument('--nlist', type=int, default=0, help='listas do IVF (0 = ~raiz quadrada do tamanho da galeria)')
+    parser.add_argument('--no-motion-gate', action='store_true', help='detecta faces em todos os frames, mesmo com a cena parada')
+    parser.add_argument('--motion-sensitivity', type=float, default=12.0, help='diferença de intensidade (0-255) que conta como movimento')
+    parser.add_argument('--motion-heartbeat', type=float, default=2.0, help='segundos entre detecções forçadas com a cena parada')
+    parser.add_argument('--reload-interval', type=float, default=60.0, help='segundos entre recargas da galeria (0 = nunca)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.output == '-':
+        return MultiCameraRunner(args, sys.stdout).run()
+    with open(args.output, 'a', encoding='utf-8') as output:
+        return MultiCameraRunner(args, output).run()
+
+
+if __name__ == '__main__':
+    mp.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,181 @@
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from recognition import prepare_frame, detect_and_encode_batch, face_heights
+
+
+# Pipeline em estágios: captura -> fila limitada -> pool de processos (detecção + encoding)
+# -> consumidor único que aplica matching, presença e desenho na ordem dos frames.
+# O estado compartilhado com a interface (escala, detector, galeria) é lido e alterado sob
+# recognition.lock. O rastreamento não é suportado: as tracks dependem de frames consecutivos
+# processados no mesmo processo, e start() recusa TRACKING_MODE.
+class RecognitionPipeline:
+    def __init__(self, recognition, workers=4, queue_size=8, max_in_flight=None, drop_oldest=True, batch_size=4):
+        self.recognition = recognition
+        self.workers = workers
+        self.batch_size = batch_size  # Frames por chamada para detectores com suporte a lote (CNN)
+        self.queue_size = queue_size
+        self.max_in_flight = max_in_flight or workers * 2  # Backpressure: limite de frames dentro do pool
+        self.drop_oldest = drop_oldest
+
+        self.lock = threading.Condition()
+        self.input = deque()
+        self.in_flight = 0
+        self.results = {}  # seq -> (frame, scale, faces, encodes, submitted_at); buffer de reordenação
+        self.next_seq = 0
+        self.next_output_seq = 0
+        self.latest_output = None
+        self.running = False
+        self.executor = None
+        self.threads = []
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.frames_submitted = 0
+        self.frames_dropped = 0
+        self.frames_processed = 0
+        self.frames_failed = 0
+        self.latencies = deque(maxlen=120)
+        self.completed_at = deque(maxlen=120)
+
+    def start(self):
+        if self.recognition.TRACKING_MODE:
+            logging.error("Pipeline multiprocesso não suporta o modo de rastreamento; usando processamento local.")
+            return False
+        try:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            self.running = True
+            self.threads = [
+                threading.Thread(target=self.dispatcher, name='pipeline-dispatcher', daemon=True),
+                threading.Thread(target=self.consumer, name='pipeline-consumer', daemon=True),
+            ]
+            for thread in self.threads:
+                thread.start()
+            return True
+        except Exception as e:
+            logging.error(f"Erro ao iniciar o pipeline: {str(e)}")
+            self.stop()
+            return False
+
+    def stop(self):
+        with self.lock:
+            self.running = False
+            self.lock.notify_all()
+        for thread in self.threads:
+            thread.join(timeout=2.0)
+        self.threads = []
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    # Estágio de captura: enfileira o frame sem bloquear; com a fila cheia descarta o mais antigo
+    # (ou o novo, se drop_oldest for False)
+    def submit(self, frame):
+        with self.lock:
+            if len(self.input) >= self.queue_size:
+                if not self.drop_oldest:
+                    self.frames_dropped += 1
+                    return False
+                self.input.popleft()
+                self.frames_dropped += 1
+            self.input.append(frame)
+            self.frames_submitted += 1
+            self.lock.notify_all()
+            return True
+
+    # Envia frames ao pool respeitando o limite de frames em processamento
+    def dispatcher(self):
+        while True:
+            with self.lock:
+                while self.running and (not self.input or self.in_flight >= self.max_in_flight):
+                    self.lock.wait()
+                if not self.running:
+                    return
+                # Com detector em lote, junta os frames já enfileirados (sem esperar por novos)
+                count = 1
+                if self.recognition.detector.batchable:
+                    count = max(1, min(len(self.input), self.batch_size, self.max_in_flight - self.in_flight))
+                frames = [self.input.popleft() for _ in range(count)]
+                first_seq = self.next_seq
+                self.next_seq += count
+                self.in_flight += count
+
+            submitted_at = time.monotonic()
+            with self.recognition.lock:
+                scale = self.recognition.scaler.next_scale()
+                detector = self.recognition.DETECTOR
+            try:
+                # Só os frames reduzidos atravessam a fronteira entre processos
+                future = self.executor.submit(detect_and_encode_batch, [prepare_frame(frame, scale) for frame in frames], detector)
+                future.add_done_callback(lambda f, first_seq=first_seq, frames=frames, scale=scale, submitted_at=submitted_at: self.collect(first_seq, frames, scale, submitted_at, f))
+            except Exception as e:
+                logging.error(f"Erro ao enviar frame ao pipeline: {str(e)}")
+                self.collect(first_seq, frames, scale, submitted_at, None)
+
+    def collect(self, first_seq, frames, scale, submitted_at, future):
+        results = [([], [])] * len(frames)
+        if future is not None and not future.cancelled():
+            try:
+                results, elapsed = future.result()
+                with self.recognition.lock:
+                    for faces, _ in results:
+                        self.recognition.scaler.update(scale, face_heights(faces, scale), elapsed / len(frames))
+            except Exception as e:
+                logging.error(f"Erro no worker de detecção: {str(e)}")
+                future = None
+        with self.lock:
+            if future is None:
+                self.frames_failed += len(frames)
+            # Frames com falha entram vazios para não travar a ordem de saída
+            for offset, (frame, (faces, encodes)) in enumerate(zip(frames, results)):
+                self.results[first_seq + offset] = (frame, scale, faces, encodes, submitted_at)
+            self.in_flight -= len(frames)
+            self.lock.notify_all()
+
+    # Consumidor único: aplica os resultados estritamente na ordem de captura
+    def consumer(self):
+        while True:
+            with self.lock:
+                while self.running and self.next_output_seq not in self.results:
+                    self.lock.wait()
+                if not self.running:
+                    return
+                frame, scale, faces, encodes, submitted_at = self.results.pop(self.next_output_seq)
+                self.next_output_seq += 1
+
+            try:
+                self.recognition.apply_frame_results(frame, faces, encodes, scale)
+            except Exception as e:
+                logging.error(f"Erro ao aplicar resultados do pipeline: {str(e)}")
+
+            now = time.monotonic()
+            with self.lock:
+                self.latest_output = frame
+                self.frames_processed += 1
+                self.latencies.append(now - submitted_at)
+                self.completed_at.append(now)
+
+    # Último frame anotado, sem bloquear (None se nada foi processado ainda)
+    def latest(self):
+        with self.lock:
+            frame, self.latest_output = self.latest_output, None
+            return frame
+
+    def stats(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            window = self.completed_at[-1] - self.completed_at[0] if len(self.completed_at) > 1 else 0
+            return {
+                'workers': self.workers,
+                'queue_depth': len(self.input),
+                'in_flight': self.in_flight,
+                'submitted': self.frames_submitted,
+                'processed': self.frames_processed,
+                'dropped': self.frames_dropped,
+                'failed': self.frames_failed,
+                'fps': round((len(self.completed_at) - 1) / window, 1) if window > 0 else 0.0,
+                'latency_ms_avg': round(1000 * sum(latencies) / len(latencies), 1) if latencies else None,
+                'latency_ms_max': round(1000 * latencies[-1], 1) if latencies else None,
+            }
@@ -3,13 +3,104 @@ from datetime import datetime, timedelta
 import logging
 import re
 import json
-import pandas as pd
+import time
+import threading
 import numpy as np
 import cv2 as cv  # OpenCV para manipulação de imagem e vídeo
-import face_recognition as fr  # Para reconhecimento facial
+from matcher import FaceMatcher, INDEX_BACKENDS
+from encoding_cache import EncodingCache
+from tracker import FaceTracker
+from unknown_store import UnknownFaceStore
+from attendance_store import AttendanceStore
+from image_writer import AsyncImageWriter
+from metrics import Metrics
+from detection_scale import AdaptiveScale
+from detectors import get_detector
+from enrollment import select_face, encode_paths
+from compaction import GalleryCompactor
+from liveness import LivenessChecker
+from motion_gate import MotionGate
+
+# face_recognition carrega o dlib e os modelos ao ser importado, o que leva segundos: a importação fica
+# para o primeiro uso (ou para Recognition.warm_up, em segundo plano) e a interface abre antes
+def face_encodings(image, locations):
+    import face_recognition as fr
+    return fr.face_encodings(image, locations)
+
+# Matcher com o backend de busca escolhido; nprobe/nlist só valem para o IVF (nlist 0 ou None = ~sqrt(M) listas)
+def make_matcher(index='exact', nprobe=8, nlist=None):
+    if index == 'ivf':
+        return FaceMatcher(index=index, nprobe=max(1, int(nprobe)), nlist=int(nlist) if nlist else None)
+    return FaceMatcher(index=index)
+
+# Reduz o frame e converte para RGB antes da detecção
+def prepare_frame(img, scale=0.25):
+    imgS = cv.resize(img, (0, 0), None, scale, scale) # Reduzindo o tamanho da imagem para acelerar o processamento
+    return cv.cvtColor(imgS, cv.COLOR_BGR2RGB) # Convertendo imagem para RGB
+
+# Detecta e codifica as faces de um frame já reduzido; função de módulo para poder rodar em outros processos.
+# O detector é passado pelo nome do backend (ver detectors.py), carregado uma vez em cada processo.
+def detect_and_encode(imgS, detector='hog'):
+    facesCurFrame = get_detector(detector).detect(imgS)
+    encodesCurFrame = face_encodings(imgS, facesCurFrame)
+    return facesCurFrame, encodesCurFrame
+
+# Igual a detect_and_encode, devolvendo também o tempo da detecção (usado pela escala adaptativa)
+def detect_and_encode_timed(imgS, detector='hog'):
+    started = time.perf_counter()
+    facesCurFrame = get_detector(detector).detect(imgS)
+    elapsed = time.perf_counter() - started
+    return facesCurFrame, face_encodings(imgS, facesCurFrame), elapsed
+
+# Vários frames de uma vez: backends com suporte a lote (CNN) detectam todos em uma única chamada.
+# Retorna [(faces, encodings)] na ordem dos frames e o tempo total da detecção.
+def detect_and_encode_batch(images, detector='hog'):
+    started = time.perf_counter()
+    locations = get_detector(detector).detect_batch(images)
+    elapsed = time.perf_counter() - started
+    return [(facesCurFrame, face_encodings(imgS, facesCurFrame)) for imgS, facesCurFrame in zip(images, locations)], elapsed
+
+# Alturas das faces detectadas em pixels do frame original
+def face_heights(facesCurFrame, scale):
+    return [(bottom - top) / scale for top, _, bottom, _ in facesCurFrame]
+
+# Faces de um frame que passam nos critérios de presença de handle_face_recognition (sem liveness nem desenho).
+# Retorna [(nome da classe, distância, localização)]; usada pelos modos em lote e multi-câmera.
+# recheck(nome, encoding), com a galeria compactada, reconfere o vencedor contra todas as fotos (como match_faces).
+def find_sightings(matcher, facesCurFrame, encodesCurFrame, scale, dis_face_encoding, face_height_threshold, recheck=None):
+    sightings = []
+    for faceLoc, encoding, candidates in zip(facesCurFrame, encodesCurFrame, matcher.match(encodesCurFrame, 1)):
+        if not candidates:
+            continue
+        class_name, distance = candidates[0]
+        if recheck is not None:
+            raw = recheck(class_name, encoding)
+            if raw is not None:
+                distance = raw
+        top, _, bottom, _ = faceLoc
+        face_height = (bottom - top) / scale
+        if matcher.is_match(distance) and distance < dis_face_encoding and face_height >= face_height_threshold:
+            sightings.append((class_name, round(distance, 2), faceLoc))
+    return sightings
+
+# Área da face (coordenadas do frame original) expandida por expand_ratio, copiada para não receber desenhos
+def crop_face(img, y1, x2, y2, x1, expand_ratio):
+    return img[max(0, int(y1 - (y2 - y1) * expand_ratio)):min(img.shape[0], int(y2 + (y2 - y1) * expand_ratio)),
+               max(0, int(x1 - (x2 - x1) * expand_ratio)):min(img.shape[1], int(x2 + (x2 - x1) * expand_ratio))].copy()
+
+# Liveness de uma face de find_sightings (localização na escala da detecção) no frame original, sem cache;
+# os mesmos critérios de Recognition.is_live. liveness_params = (expand_ratio, limiar de textura, limiar de reflexo)
+def sighting_is_live(checker, img, faceLoc, scale, liveness_params):
+    expand_ratio, threshold_texture, threshold_reflection = liveness_params
+    y1, x2, y2, x1 = [int(round(value / scale)) for value in faceLoc]
+    face_img = crop_face(img, y1, x2, y2, x1, expand_ratio)
+    if face_img.size == 0:
+        return False
+    texture, brightness = checker.measure(face_img)
+    return texture <= threshold_texture and brightness <= threshold_reflection
 
 class Recognition:
-    def __init__(self, path_faces, save_path_recognized, save_path_unrecognized, max_captures_unrecognized = 4, capture_interval_unrecognized = 2.0, expand_ratio = 0.25, threshold_texture = 450, threshold_reflection = 180, dis_face_encoding = 0.55, face_height_threshold = 250):
+    def __init__(self, path_faces, save_path_recognized, save_path_unrecognized, max_captures_unrecognized = 4, capture_interval_unrecognized = 2.0, expand_ratio = 0.25, threshold_texture = 140, threshold_reflection = 180, dis_face_encoding = 0.55, face_height_threshold = 250, match_index = 'exact', match_nprobe = 8, match_nlist = 0, tracking_mode = False, detect_interval = 5, attendance_db = None, persons_path = 'persons.json', draw_overlays = True, detection_scale = 0.25, adaptive_scale = False, detector = 'hog', compact_gallery = True, recheck_raw = True, motion_gate = True, motion_sensitivity = 12.0, motion_heartbeat = 2.0):
         home_dir = os.path.expanduser('~')
         log_file = os.path.join(home_dir, 'recognition_logs', 'recognition.log')
         os.makedirs(os.path.dirname(log_file), exist_ok=True)
@@ -19,8 +110,22 @@ class Recognition:
         if not self.init_variable_path(path_faces, save_path_recognized, save_path_unrecognized):
             logging.error("Failed to initialize path variables.")
         
+        self.PATH_PERSONS = persons_path
+        self.DRAW_OVERLAYS = draw_overlays  # Desligado no modo headless, onde ninguém vê o frame
+
+        # Diário de presenças (SQLite); por padrão fica ao lado da pasta de rostos reconhecidos
+        self.ATTENDANCE_DB = attendance_db or os.path.join(os.path.dirname(os.path.abspath(save_path_recognized)), 'attendance.db')
+
+        # Galeria com centróide + exemplares por pessoa; a reverificação confere o vencedor contra todas as fotos
+        self.COMPACT_GALLERY = compact_gallery
+        self.RECHECK_RAW = recheck_raw
+
+        # Estado do reconhecimento (galeria, detector, escala, tracker): frames, recargas e mudanças de
+        # configuração vindas de outras threads (interface, consumidor do pipeline) passam por ele
+        self.lock = threading.RLock()
+
         # variaveis de path
-        if not self.setup_parameters(max_captures_unrecognized, capture_interval_unrecognized, expand_ratio, threshold_texture, threshold_reflection, dis_face_encoding, face_height_threshold):
+        if not self.setup_parameters(max_captures_unrecognized, capture_interval_unrecognized, expand_ratio, threshold_texture, threshold_reflection, dis_face_encoding, face_height_threshold, tracking_mode, detect_interval, detection_scale, adaptive_scale, detector, motion_gate, motion_sensitivity, motion_heartbeat, match_index, match_nprobe, match_nlist):
             logging.error("Failed to setup parameters.")
         
         if not self.init_variable(): # variaveis de controle
@@ -58,6 +163,81 @@ class Recognition:
     def set_FACE_HEIGHT_THRESHOLD(self, face_height_threshold):
         self.FACE_HEIGHT_THRESHOLD = face_height_threshold
         
+    # Setter para TRACKING_MODE
+    def set_TRACKING_MODE(self, tracking_mode):
+        self.TRACKING_MODE = tracking_mode
+        if hasattr(self, 'tracker'):
+            self.tracker.reset()
+
+    # Setter para DETECT_INTERVAL
+    def set_DETECT_INTERVAL(self, detect_interval):
+        self.DETECT_INTERVAL = max(1, int(detect_interval))
+        if hasattr(self, 'tracker'):
+            self.tracker.detect_interval = self.DETECT_INTERVAL
+
+    # Setter para DETECTION_SCALE (fator de redução do frame antes da detecção)
+    def set_DETECTION_SCALE(self, detection_scale):
+        self.DETECTION_SCALE = min(1.0, max(0.05, float(detection_scale)))
+        if hasattr(self, 'scaler'):
+            self.scaler.set_base_scale(self.DETECTION_SCALE)
+
+    # Setter para DETECTOR ('hog', 'cnn' ou 'cascade'); o modelo é carregado aqui para falhar cedo
+    def set_DETECTOR(self, detector):
+        self.detector = get_detector(detector)
+        self.DETECTOR = detector
+
+    # Setter para MOTION_GATE (pula a detecção em frames sem mudança na cena)
+    def set_MOTION_GATE(self, motion_gate):
+        self.MOTION_GATE = bool(motion_gate)
+        if hasattr(self, 'motion_gate'):
+            self.motion_gate.enabled = self.MOTION_GATE
+            self.motion_gate.reset()
+
+    # Setter para MOTION_SENSITIVITY (diferença de intensidade, 0-255, que conta como mudança; menor = mais sensível)
+    def set_MOTION_SENSITIVITY(self, motion_sensitivity):
+        self.MOTION_SENSITIVITY = float(motion_sensitivity)
+        if hasattr(self, 'motion_gate'):
+            self.motion_gate.sensitivity = self.MOTION_SENSITIVITY
+
+    # Setter para MOTION_HEARTBEAT (segundos entre detecções forçadas com a cena parada)
+    def set_MOTION_HEARTBEAT(self, motion_heartbeat):
+        self.MOTION_HEARTBEAT = max(0.0, float(motion_heartbeat))
+        if hasattr(self, 'motion_gate'):
+            self.motion_gate.heartbeat = self.MOTION_HEARTBEAT
+
+    # Setter para MATCH_INDEX (backend de busca da galeria: 'exact' ou 'ivf'); troca o índice mantendo a galeria
+    def set_MATCH_INDEX(self, match_index):
+        if match_index not in INDEX_BACKENDS:
+            raise ValueError(f"Índice desconhecido: {match_index} (opções: {', '.join(INDEX_BACKENDS)})")
+        self.MATCH_INDEX = match_index
+        self.rebuild_matcher()
+
+    # Setter para MATCH_NPROBE (listas visitadas por consulta no IVF; maior = mais recall, mais lento)
+    def set_MATCH_NPROBE(self, match_nprobe):
+        self.MATCH_NPROBE = max(1, int(match_nprobe))
+        if hasattr(self, 'matcher') and hasattr(self.matcher.index, 'nprobe'):
+            self.matcher.index.nprobe = self.MATCH_NPROBE
+
+    # Setter para MATCH_NLIST (listas do IVF; 0 escolhe ~sqrt(M)); exige retreinar o índice
+    def set_MATCH_NLIST(self, match_nlist):
+        self.MATCH_NLIST = max(0, int(match_nlist))
+        if hasattr(self, 'matcher') and self.MATCH_INDEX == 'ivf':
+            self.rebuild_matcher()
+
+    # Novo matcher com os parâmetros atuais, trocado de uma vez quando a galeria já está indexada
+    def rebuild_matcher(self):
+        if not hasattr(self, 'matcher'):
+            return
+        matcher = make_matcher(self.MATCH_INDEX, self.MATCH_NPROBE, self.MATCH_NLIST)
+        matcher.set_gallery(self.matcher.gallery, self.matcher.names)
+        self.matcher = matcher
+
+    # Setter para ADAPTIVE_SCALE
+    def set_ADAPTIVE_SCALE(self, adaptive_scale):
+        self.ADAPTIVE_SCALE = bool(adaptive_scale)
+        if hasattr(self, 'scaler'):
+            self.scaler.set_adaptive(self.ADAPTIVE_SCALE)
+        
     def init_variable_path(self, path_faces, save_path_recognized, save_path_unrecognized):
         try:
             self.PATH_FACES = path_faces
@@ -68,22 +248,45 @@ class Recognition:
             logging.error(f"Error setting path variables: {str(e)}")
             return False
         
-    def setup_parameters(self, max_captures=None, capture_interval=None, expand_ratio=None, threshold_texture=None, threshold_reflection=None, dis_face_encoding=None, face_height_threshold=None):
+    def setup_parameters(self, max_captures=None, capture_interval=None, expand_ratio=None, threshold_texture=None, threshold_reflection=None, dis_face_encoding=None, face_height_threshold=None, tracking_mode=None, detect_interval=None, detection_scale=None, adaptive_scale=None, detector=None, motion_gate=None, motion_sensitivity=None, motion_heartbeat=None, match_index=None, match_nprobe=None, match_nlist=None):
         try:
-            if max_captures is not None:
-                self.set_MAX_CAPTURES_UNRECOGNIZED(max_captures)
-            if capture_interval is not None:
-                self.set_CAPTURE_INTERVAL_UNRECOGNIZED(capture_interval)
-            if expand_ratio is not None:
-                self.set_EXPAND_RATIO(expand_ratio)
-            if threshold_texture is not None:
-                self.set_THRESHOLD_TEXTURE(threshold_texture)
-            if threshold_reflection is not None:
-                self.set_THRESHOLD_REFLECTION(threshold_reflection)
-            if dis_face_encoding is not None:
-                self.set_DIS_FACE_ENCODING(dis_face_encoding)
-            if face_height_threshold is not None:
-                self.set_FACE_HEIGHT_THRESHOLD(face_height_threshold)
+            with self.lock:
+                if max_captures is not None:
+                    self.set_MAX_CAPTURES_UNRECOGNIZED(max_captures)
+                if capture_interval is not None:
+                    self.set_CAPTURE_INTERVAL_UNRECOGNIZED(capture_interval)
+                if expand_ratio is not None:
+                    self.set_EXPAND_RATIO(expand_ratio)
+                if threshold_texture is not None:
+                    self.set_THRESHOLD_TEXTURE(threshold_texture)
+                if threshold_reflection is not None:
+                    self.set_THRESHOLD_REFLECTION(threshold_reflection)
+                if dis_face_encoding is not None:
+                    self.set_DIS_FACE_ENCODING(dis_face_encoding)
+                if face_height_threshold is not None:
+                    self.set_FACE_HEIGHT_THRESHOLD(face_height_threshold)
+                if tracking_mode is not None:
+                    self.set_TRACKING_MODE(tracking_mode)
+                if detect_interval is not None:
+                    self.set_DETECT_INTERVAL(detect_interval)
+                if detection_scale is not None:
+                    self.set_DETECTION_SCALE(detection_scale)
+                if adaptive_scale is not None:
+                    self.set_ADAPTIVE_SCALE(adaptive_scale)
+                if detector is not None:
+                    self.set_DETECTOR(detector)
+                if motion_gate is not None:
+                    self.set_MOTION_GATE(motion_gate)
+                if motion_sensitivity is not None:
+                    self.set_MOTION_SENSITIVITY(motion_sensitivity)
+                if motion_heartbeat is not None:
+                    self.set_MOTION_HEARTBEAT(motion_heartbeat)
+                if match_nprobe is not None:
+                    self.set_MATCH_NPROBE(match_nprobe)
+                if match_nlist is not None:
+                    self.set_MATCH_NLIST(match_nlist)
+                if match_index is not None:
+                    self.set_MATCH_INDEX(match_index)
             return True
         except Exception as e:
             logging.error(f"Error setting parameters: {str(e)}")
@@ -91,8 +294,14 @@ class Recognition:
             
     def init_variable(self):
         try:
-            self.recognized_faces = []  # Lista para armazenar informações sobre rostos conhecidos
-            self.unrecognized_faces = []  # Lista para armazenar informações sobre rostos desconhecidos
+            self.attendance = AttendanceStore(self.ATTENDANCE_DB)  # Presenças por pessoa, persistidas em disco
+            self.image_writer = AsyncImageWriter(jpeg_quality=90)  # Capturas gravadas fora do loop de frames
+            self.gallery_publisher = None  # SharedGalleryPublisher opcional para workers em outros processos
+            self.raw_gallery_publisher = None  # Galeria original para a reverificação nos workers (só com a compactação)
+            self.metrics = Metrics()  # Latência por etapa; desligada por padrão
+            self.attendance_listeners = []  # Chamados com (evento, nome, distância, timestamp) a cada marcação
+            # Centróides de rostos desconhecidos, com limite de memória e IDs persistidos entre execuções
+            self.unknown_store = UnknownFaceStore(persist_path=os.path.join(self.SAVE_PATH_UNRECOGNIZED, '.unknown_faces.npz'))
             self.last_captured_time = datetime.now()
             self.value_has_reflection = False
             self.value_is_fake_via_texture = False
@@ -101,6 +310,20 @@ class Recognition:
             self.image_count = {}
             self.last_capture_time_recognized = {}
             self.encodeListKnown = []
+            self.classNames = []
+            self.matcher = make_matcher(self.MATCH_INDEX, self.MATCH_NPROBE, self.MATCH_NLIST)
+            self.raw_rows = {}  # id da pessoa -> linhas de encodeListKnown, da mesma geração do matcher
+            self.encoding_cache = EncodingCache(self.PATH_FACES, self.is_image_file)
+            self.compactor = GalleryCompactor(exemplars=3)
+            self.liveness = LivenessChecker(crop_size=160, ttl=2.0)  # Veredito reaproveitado por 2 s para a mesma face na mesma caixa
+            self.motion_gate = MotionGate(self.MOTION_GATE, self.MOTION_SENSITIVITY, heartbeat=self.MOTION_HEARTBEAT)
+            self.ENCODING_WORKERS = None  # Processos para codificar fotos novas; None usa todos os núcleos
+            self.encoding_progress = None  # Chamado com (feitas, total) durante a codificação
+            self.MATCH_TOP_K = 1  # Quantidade de candidatos retornados por face
+            self.tracker = FaceTracker(detect_interval=self.DETECT_INTERVAL)
+            self.scaler = AdaptiveScale(self.DETECTION_SCALE, adaptive=self.ADAPTIVE_SCALE)
+            self.frame_scale = self.DETECTION_SCALE  # Escala usada no último frame processado
+            self.tracker_scale = None  # Escala das coordenadas das tracks atuais
             self.person_name = {}
             return True
         except Exception as e:
@@ -117,34 +340,64 @@ class Recognition:
         for img in images:
             try:
                 img = cv.cvtColor(img, cv.COLOR_BGR2RGB)
-                encode = fr.face_encodings(img)[0]
-                encode_list.append(encode)
+                # A maior face, se predominante; fotos sem face ou ambíguas são registradas no log
+                face, reason = select_face(self.detector.detect(img))
+                if face is None:
+                    logging.error(f"Imagem rejeitada: {reason}")
+                    continue
+                encode_list.append(face_encodings(img, [face])[0])
             except Exception as e:
                 logging.error(f"Erro ao processar a imagem: {str(e)}")
         logging.info('Encoding Complete')
         return encode_list
     
-    # Carrega as imagens do diretório especificado    
+    # Codifica as imagens novas ou alteradas do diretório de faces em um pool de processos
+    def encode_image_files(self, paths):
+        return encode_paths(paths, self.ENCODING_WORKERS, self.DETECTOR, self.encoding_progress)
+
+    # Carrega as encodings do diretório especificado, recodificando apenas o que mudou desde a última carga.
+    # Várias fotos da mesma pessoa (faces/<id>/) viram vários modelos com o mesmo id.
+    # A nova galeria (nomes, matriz, linhas por pessoa e matcher) é montada fora do lock e trocada
+    # de uma vez: um frame em andamento nunca mistura a galeria antiga com a nova.
     def load_and_encode_images(self):
-        self.images = []
-        self.classNames = []
         try:
-            for cl in os.listdir(self.PATH_FACES):
-                if self.is_image_file(cl):
-                    curImg = cv.imread(f'{self.PATH_FACES}/{cl}')
-                    if curImg is not None:
-                        self.images.append(curImg)
-                        self.classNames.append(os.path.splitext(cl)[0])
-                    else:
-                        logging.error(f"Erro ao carregar a imagem {cl}.")
+            names, matrix = self.encoding_cache.sync(self.encode_image_files)
+            logging.info(f"Cache de encodings: {self.encoding_cache.stats}")
+            for key, reason in self.encoding_cache.rejected.items():
+                logging.info(f"Imagem de cadastro rejeitada {key}: {reason}")
         except Exception as e:
             logging.error(f"Erro ao carregar imagens: {str(e)}")
-        self.encodeListKnown = self.find_encodings(self.images)
+            names, matrix = [], np.empty((0, 128), dtype=np.float32)
+        matcher = make_matcher(self.MATCH_INDEX, self.MATCH_NPROBE, self.MATCH_NLIST)
+        raw_rows = {}
+        if self.COMPACT_GALLERY:
+            # Só as pessoas com fotos novas ou removidas são recompactadas
+            compact_names, compact_matrix = self.compactor.compact(names, matrix)
+            raw_rows = self.compactor.raw_rows
+            matcher.set_gallery(compact_matrix, compact_names)
+            logging.info(f"Galeria compactada: {self.compactor.stats}")
+        else:
+            matcher.set_gallery(matrix, names)
+        with self.lock:
+            self.classNames, self.encodeListKnown, self.raw_rows, self.matcher = names, matrix, raw_rows, matcher
+
+    # Candidatos para as faces do frame; com a galeria compactada, a distância do vencedor pode ser
+    # recalculada contra todos os modelos originais da pessoa
+    def match_faces(self, encodings):
+        candidates = self.matcher.match(encodings, self.MATCH_TOP_K)
+        if self.COMPACT_GALLERY and self.RECHECK_RAW:
+            for encoding, face_candidates in zip(encodings, candidates):
+                if face_candidates:
+                    name = face_candidates[0][0]
+                    distance = self.compactor.raw_distance(name, encoding, self.encodeListKnown, self.raw_rows)
+                    if distance is not None:
+                        face_candidates[0] = (name, distance)
+        return candidates
         
     # carrega do json o nome das pessoas
     def load_person_names(self):
         try:
-            with open('persons.json', 'r') as file:
+            with open(self.PATH_PERSONS, 'r') as file:
                 person_data = json.load(file)
             self.person_name = {entry['id']: entry['name'] for entry in person_data}
         except FileNotFoundError:
@@ -152,17 +405,8 @@ class Recognition:
     
     # Função para checar ou atualizar array de rostos desconhecidos
     def check_or_update_unrecognized(self, face_encoding, _update):
-        #primeira vez identificado
-        for value in self.unrecognized_faces:
-            matches = fr.compare_faces([value['encoding']], face_encoding)
-            if matches[0]:
-                if _update:
-                    value['count'] += 1
-                return value
-        # caso não tenha sido identificado ainda
-        new_face = {'encoding': face_encoding, 'count': 0, 'name': f'Desconhecido{len(self.unrecognized_faces)+1}'}
-        self.unrecognized_faces.append(new_face)
-        return new_face
+        # Busca vetorizada entre os centróides; cria uma entrada nova caso não tenha sido identificado ainda
+        return self.unknown_store.lookup(face_encoding, _update)
 
     # Função para checar textura de imagem
     def is_fake_via_texture(self, face_image):
@@ -183,62 +427,93 @@ class Recognition:
     
     # Processa o frame atual para reconhecer faces armazenadas
     def process_current_frame(self, img):
-        imgS = cv.resize(img, (0, 0), None, 0.25, 0.25) # Reduzindo o tamanho da imagem para acelerar o processamento
-        imgS = cv.cvtColor(imgS, cv.COLOR_BGR2RGB) # Convertendo imagem para RGB
-        
-        # Reconhecendo faces no frame atual
-        facesCurFrame = fr.face_locations(imgS)
-        encodesCurFrame = fr.face_encodings(imgS, facesCurFrame)
+        # Reconhecendo faces no frame atual; detecção e encoding medidas separadamente
+        started = self.metrics.start()
+        scale = self.frame_scale = self.scaler.next_scale()
+        imgS = prepare_frame(img, scale)
+        detect_started = time.perf_counter()
+        facesCurFrame = self.detector.detect(imgS)
+        self.scaler.update(scale, face_heights(facesCurFrame, scale), time.perf_counter() - detect_started)
+        self.metrics.stop('detection', started)
+        started = self.metrics.start()
+        encodesCurFrame = face_encodings(imgS, facesCurFrame)
+        self.metrics.stop('encoding', started)
         return facesCurFrame, encodesCurFrame
     
+    # Processa o frame no modo de rastreamento: detecção completa só a cada DETECT_INTERVAL frames
+    # e encoding só para tracks novas ou com confiança baixa
+    def process_current_frame_tracked(self, img):
+        # As tracks guardam coordenadas na escala da detecção: mudar a escala reinicia o rastreamento
+        scale = self.frame_scale = self.scaler.next_scale(probe=False)
+        if scale != self.tracker_scale:
+            self.tracker.reset()
+            self.tracker_scale = scale
+        imgS = prepare_frame(img, scale)
+        gray = cv.cvtColor(imgS, cv.COLOR_RGB2GRAY)
+
+        def detect():
+            started = time.perf_counter()
+            faces = self.detector.detect(imgS)
+            self.scaler.update(scale, face_heights(faces, scale), time.perf_counter() - started)
+            return faces
+
+        tracks = self.tracker.step(gray, detect)
+        pending = [track for track in tracks if track.needs_encoding(self.tracker.min_confidence)]
+        if pending:
+            encodings = face_encodings(imgS, [track.location for track in pending])
+            for track, encoding in zip(pending, encodings):
+                track.set_encoding(encoding)
+        return tracks
+    
+    # Registros de presença atuais (timestamps como datetime)
+    @property
+    def recognized_faces(self):
+        return self.attendance.records()
+
     # Função para marcar a presença de uma pessoa reconhecida
     def mark_attendance(self, name, dis):
+        # Consulta O(1) por pessoa; nova marcação após 2 horas e menor distância ficam a cargo do AttendanceStore
         now = datetime.now()
-        dtString = now.strftime('%Y-%m-%d %H:%M:%S')
-
-        existing_record = next((record for record in self.recognized_faces if record["name"] == name), None)
-        if not existing_record:
+        event = self.attendance.mark(name, dis, now)
+        if event == 'recognized':
             # logica caso a pessoa não foi identificada
+            dtString = now.strftime('%Y-%m-%d %H:%M:%S')
             print(f"name: {name}, timestamp_recognized: {dtString}, timestamp: {dtString}, distance: {dis}")
-            self.recognized_faces.append({"name": name, "timestamp_recognized": dtString, "timestamp": dtString, 'distance': dis})
-        else:
-            # logica caso a pessoa ja foi identificada
-            last_seen = datetime.strptime(existing_record['timestamp'], '%Y-%m-%d %H:%M:%S')
-            time_diff = now - last_seen
-            
-            # Atualiza o timestamp se a última identificação foi há mais de 2 horas
-            if time_diff.total_seconds() > 2 * 60 * 60:  # 2 horas em segundos
-                existing_record['timestamp'] = dtString
-                
-            # Atualiza a distância apenas se o novo valor for menor que o anterior
-            if dis < existing_record['distance']:
-                existing_record['distance'] = dis
+        if event is not None:
+            for listener in self.attendance_listeners:
+                listener(event, name, dis, now)
+        return event
         
     # Logica de processamento reconhecimento de face
-    def handle_face_recognition(self, encodeFace, faceLoc, img):
+    # track_id: no modo de rastreamento, chave do cache de liveness (a mesma face entre frames)
+    def handle_face_recognition(self, encodeFace, faceLoc, img, candidates=None, scale=None, track_id=None):
         FACE_COLOR_NEAR = (0, 255, 0)  # Verde para "perto"
         FACE_COLOR_FAR = (0, 0, 255)   # Vermelho para "distante"
         
+        started_face = self.metrics.start()
         current_time = datetime.now()
-        matches = fr.compare_faces(self.encodeListKnown, encodeFace)
-        faceDis = fr.face_distance(self.encodeListKnown, encodeFace)
-        matchInRecognition = self.check_or_update_unrecognized(encodeFace, False)
+        if candidates is None:
+            candidates = self.match_faces([encodeFace])[0]
+        matchInRecognition = None
         isUnknown = False
-        matchIndex = np.argmin(faceDis)
 
-        if matches[matchIndex]:
+        if candidates and self.matcher.is_match(candidates[0][1]):
             # Primeiro nome provável
-            name = self.person_name.get(self.classNames[matchIndex], "Desconhecido").upper()
-            dis = round(faceDis[matchIndex], 2)
+            class_name, best_distance = candidates[0]
+            name = self.person_name.get(class_name, "Desconhecido").upper()
+            dis = round(best_distance, 2)
         else:
+            # Só faces sem correspondência na galeria entram no armazenamento de desconhecidos
+            matchInRecognition = self.check_or_update_unrecognized(encodeFace, False)
             name = matchInRecognition['name']
             dis = "Unknown"
             isUnknown = True
 
-        y1, x2, y2, x1 = faceLoc
-        y1, x2, y2, x1 = y1 * 4, x2 * 4, y2 * 4, x1 * 4  # Ajustando as coordenadas para o tamanho original
+        # Ajustando as coordenadas para o tamanho original, na escala em que a face foi detectada
+        scale = scale or self.frame_scale
+        y1, x2, y2, x1 = [int(round(value / scale)) for value in faceLoc]
 
-        # Estima a distância com base na altura do rosto
+        # Estima a distância com base na altura do rosto (sempre em pixels do frame original)
         face_height = y2 - y1
         if face_height >= self.FACE_HEIGHT_THRESHOLD:
             color = FACE_COLOR_NEAR
@@ -249,76 +524,148 @@ class Recognition:
             distance_text = "Distante"
             value_distance_near = False
 
+        # Liveness só para faces que vão marcar presença ou ser salvas como desconhecidas
+        if isUnknown:
+            wants_capture = matchInRecognition['count'] <= self.MAX_CAPTURES_UNRECOGNIZED and (
+                self.last_captured_time is None or (current_time - self.last_captured_time).total_seconds() > self.CAPTURE_INTERVAL_UNRECOGNIZED)
+        else:
+            wants_capture = dis < self.DIS_FACE_ENCODING and value_distance_near
+
+        face_img = None
+        is_live = True
+        if wants_capture:
+            # Recorte limpo da área da face, tirado antes de qualquer desenho no frame
+            face_img = self.crop_face(img, y1, x2, y2, x1)
+            started = self.metrics.start()
+            is_live = self.is_live(('track', track_id) if track_id is not None else name, face_img, (y1, x2, y2, x1))
+            self.metrics.stop('liveness', started)
+
         # Desenhe os retângulos ao redor da face e os textos
-        cv.rectangle(img, (x1, y1), (x2, y2), color, 8)
-        cv.rectangle(img, (x1, y2 - 100), (x2, y2), color, cv.FILLED)
-        cv.putText(img, f"{name} - {dis}", (x1 + 6, y2 - 70), cv.FONT_HERSHEY_COMPLEX, 1, (255, 255, 255), 2)
-        cv.putText(img, distance_text, (x1 + 6, y2 - 30), cv.FONT_HERSHEY_COMPLEX, 1, (255, 255, 255), 2)
-
-        # Captura apenas a área da face
-        face_img = img[max(0, int(y1 - (y2 - y1) * self.EXPAND_RATIO)):min(img.shape[0], int(y2 + (y2 - y1) * self.EXPAND_RATIO)),
-                    max(0, int(x1 - (x2 - x1) * self.EXPAND_RATIO)):min(img.shape[1], int(x2 + (x2 - x1) * self.EXPAND_RATIO))]
-        
-        # Verificação de textura e reflexão para falsificações
+        if self.DRAW_OVERLAYS:
+            cv.rectangle(img, (x1, y1), (x2, y2), color, 8)
+            cv.rectangle(img, (x1, y2 - 100), (x2, y2), color, cv.FILLED)
+            cv.putText(img, f"{name} - {dis}", (x1 + 6, y2 - 70), cv.FONT_HERSHEY_COMPLEX, 1, (255, 255, 255), 2)
+            cv.putText(img, distance_text, (x1 + 6, y2 - 30), cv.FONT_HERSHEY_COMPLEX, 1, (255, 255, 255), 2)
+            if not is_live:
+                cv.putText(img, "PHONE DETECTED", (x1 + 6, y2), cv.FONT_HERSHEY_COMPLEX, 1, (255, 255, 255), 2)
+
         # Se a face é desconhecida, salva a imagem na pasta
-        if not self.is_fake_via_texture(face_img) and not self.has_reflection(face_img):
+        if wants_capture and is_live:
             if isUnknown:
-                if matchInRecognition['count'] <= self.MAX_CAPTURES_UNRECOGNIZED and (
-                        self.last_captured_time is None or (current_time - self.last_captured_time).total_seconds() > self.CAPTURE_INTERVAL_UNRECOGNIZED):
-                    matchInRecognition = self.check_or_update_unrecognized(encodeFace, True)  # Atualiza array de rostos desconhecidos
-                    filename = os.path.join(self.SAVE_PATH_UNRECOGNIZED, f"{matchInRecognition['name']}.{matchInRecognition['count']} - {current_time.strftime('%Y-%m-%d_%H-%M-%S')}.jpg")
-                    print(f"Salvando {filename}...")
-                    #self.save_image(filename, face_img)
-                    self.last_captured_time = current_time
-                    #self.mark_attendance(matchInRecognition['name'], 1.00)
+                matchInRecognition = self.check_or_update_unrecognized(encodeFace, True)  # Atualiza array de rostos desconhecidos
+                filename = os.path.join(self.SAVE_PATH_UNRECOGNIZED, f"{matchInRecognition['name']}.{matchInRecognition['count']} - {current_time.strftime('%Y-%m-%d_%H-%M-%S')}.jpg")
+                print(f"Salvando {filename}...")
+                self.save_image(filename, face_img)
+                self.last_captured_time = current_time
+                #self.mark_attendance(matchInRecognition['name'], 1.00)
             else:
-                if dis != "Unknown" and dis < self.DIS_FACE_ENCODING and value_distance_near:
-                    self.mark_attendance(name, dis)
-                        
-                    # Create a directory for the person if it doesn't exist
-                    person_folder = os.path.join(self.SAVE_PATH_RECOGNIZED, name)
-                    if not os.path.exists(person_folder):
-                        os.makedirs(person_folder)    
-                    
-                    last_capture_time_recognized = self.last_capture_time_recognized.get(name)
-                    if last_capture_time_recognized is None or (current_time - last_capture_time_recognized).total_seconds() > 1:
-                        if self.image_count.get(name, 0) < 3:
-                            filename = os.path.join(person_folder, f"{name}.{self.image_count.get(name, 0) + 1} - {current_time.strftime('%Y-%m-%d_%H-%M-%S')}.jpg")
-                            #self.save_image(filename, face_img)
-                            self.image_count[name] = self.image_count.get(name, 0) + 1
-                            self.last_capture_time_recognized[name] = current_time
-                            print(f"Salvando {filename}...")
-        else:
-            cv.putText(img, "PHONE DETECTED", (x1 + 6, y2), cv.FONT_HERSHEY_COMPLEX, 1, (255, 255, 255), 2)
-                    
+                self.mark_attendance(name, dis)
+
+                # A pasta da pessoa é criada (uma única vez) pelo gravador assíncrono
+                person_folder = os.path.join(self.SAVE_PATH_RECOGNIZED, name)
+
+                last_capture_time_recognized = self.last_capture_time_recognized.get(name)
+                if last_capture_time_recognized is None or (current_time - last_capture_time_recognized).total_seconds() > 1:
+                    if self.image_count.get(name, 0) < 3:
+                        filename = os.path.join(person_folder, f"{name}.{self.image_count.get(name, 0) + 1} - {current_time.strftime('%Y-%m-%d_%H-%M-%S')}.jpg")
+                        self.save_image(filename, face_img)
+                        self.image_count[name] = self.image_count.get(name, 0) + 1
+                        self.last_capture_time_recognized[name] = current_time
+                        print(f"Salvando {filename}...")
+        self.metrics.stop('handle_face_recognition', started_face)
+
+    # Área da face expandida por EXPAND_RATIO, copiada para não receber os desenhos feitos depois no frame
+    def crop_face(self, img, y1, x2, y2, x1):
+        return crop_face(img, y1, x2, y2, x1, self.EXPAND_RATIO)
 
+    # Verificação de textura e reflexão para falsificações, em uma passada e com cache por face e caixa
+    def is_live(self, key, face_img, box=None):
+        if face_img.size == 0:
+            return False  # Face fora do frame: nada a avaliar nem a salvar
+        texture, brightness = self.liveness.check(key, face_img, box)
+        self.value_round_is_fake_via_texture = texture
+        self.value_is_fake_via_texture = texture > self.THRESHOLD_TEXTURE
+        self.value_round_has_reflection = brightness
+        self.value_has_reflection = brightness > self.THRESHOLD_REFLECTION
+        return not self.value_is_fake_via_texture and not self.value_has_reflection
         
+    # Enfileira a imagem para gravação em segundo plano; retorna False se ela foi descartada
     def save_image(self, path, image):
         try:
-            os.makedirs(os.path.dirname(path), exist_ok=True)
-            cv.imwrite(path, image)
-            return True
+            return self.image_writer.submit(path, image)
         except Exception as e:
             logging.error(f"Erro ao salvar a imagem {path}: {str(e)}")
             return False
 
 
     def init_face_recognition(self, img):
+        with self.lock:
+            self.run_face_recognition(img)
+
+    def run_face_recognition(self, img):
+        if not self.motion_gate.check(img):
+            return  # Cena parada e sem faces à vista: a detecção fica para o próximo movimento ou heartbeat
+        if self.TRACKING_MODE:
+            tracks = self.process_current_frame_tracked(img)
+            self.motion_gate.report(len(tracks))
+            # Só tracks com encoding nova passam pelo matcher; as demais mantêm a identidade
+            pending = [track for track in tracks if track.candidates is None]
+            for track, candidates in zip(pending, self.match_faces([track.encoding for track in pending])):
+                track.candidates = candidates
+            for track in tracks:
+                self.handle_face_recognition(track.encoding, track.location, img, track.candidates, self.frame_scale, track.id)
+            return
+
         facesCurFrame, encodesCurFrame = self.process_current_frame(img)
+        self.apply_frame_results(img, facesCurFrame, encodesCurFrame, self.frame_scale)
 
-        # Comparando faces reconhecidas com faces conhecidas
-        for encodeFace, faceLoc in zip(encodesCurFrame, facesCurFrame):
-            self.handle_face_recognition(encodeFace, faceLoc, img)
-        pass
+    # Matching, presença e desenho para faces já detectadas/codificadas (no próprio processo ou por um worker)
+    def apply_frame_results(self, img, facesCurFrame, encodesCurFrame, scale=None):
+        with self.lock:
+            # Comparando todas as faces do frame com a galeria em uma única operação vetorizada
+            self.motion_gate.report(len(facesCurFrame))
+            candidatesCurFrame = self.match_faces(encodesCurFrame)
+            for encodeFace, faceLoc, candidates in zip(encodesCurFrame, facesCurFrame, candidatesCurFrame):
+                self.handle_face_recognition(encodeFace, faceLoc, img, candidates, scale)
     
+    # Persiste o estado pendente antes de encerrar a aplicação
+    def close(self):
+        self.unknown_store.save()
+        self.attendance.close()
+        self.image_writer.close()
+
+    # Carrega o dlib, os modelos e a galeria antes do primeiro frame; feito para rodar em uma thread.
+    # progress(etapa, feitas, total) recebe 'models' e depois 'encodings' para cada foto codificada.
+    def warm_up(self, progress=None):
+        if progress is not None:
+            progress('models', 0, 0)
+        import face_recognition  # noqa: F401  Modelos de landmarks e de encoding carregam na importação
+        self.detector.detect(np.zeros((64, 64, 3), dtype=np.uint8))
+        if progress is not None:
+            self.encoding_progress = lambda done, total: progress('encodings', done, total)
+        try:
+            self.reload_encodings()
+        finally:
+            self.encoding_progress = None
+
     # Recarregar todas as imagens e encodes
+    # A codificação das fotos roda fora do lock; frames continuam sendo reconhecidos com a galeria
+    # antiga até a troca
     def reload_encodings(self):
         self.load_and_encode_images()
-        self.load_person_names()
+        with self.lock:
+            self.load_person_names()
+            if self.gallery_publisher is not None:
+                # Workers anexados trocam para a nova galeria na próxima verificação de geração
+                self.gallery_publisher.publish(self.matcher.gallery, self.matcher.names)
+            if self.raw_gallery_publisher is not None and self.COMPACT_GALLERY:
+                self.raw_gallery_publisher.publish(self.encodeListKnown, self.classNames)
+            self.tracker.reset()  # Identidades das tracks podem ter mudado com a nova galeria
+            self.liveness.reset()
 
     def extract_face(self, frame, expand_ratio=0.7):
-        # Utilize face_recognition ou OpenCV para detectar faces
-        face_locations = fr.face_locations(frame)
+        # Detector configurado (HOG, CNN ou cascade)
+        face_locations = self.detector.detect(frame)
         if face_locations:
             top, right, bottom, left = face_locations[0]  # Considera apenas a primeira face detectada
             height = bottom - top
@@ -345,7 +692,7 @@ class Recognition:
     
     def extract_faces(self, frame, expand_ratio=0.7):
         faces = []
-        face_locations = fr.face_locations(frame)
+        face_locations = self.detector.detect(frame)
         for top, right, bottom, left in face_locations:
             # Calcula a altura e a largura da face detectada
             height = bottom - top
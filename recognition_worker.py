@@ -0,0 +1,86 @@
+import time
+import logging
+import threading
+
+
+# Reconhecimento fora do loop de eventos da interface. A thread lê o frame mais recente da câmera,
+# processa e avisa a interface por notify() (write_event_value), com no máximo um aviso pendente:
+# um frame lento atrasa só o próximo resultado, nunca os cliques. Sem reconhecimento ativo, os
+# frames só passam para a exibição, limitados a max_fps, e param de todo com a janela oculta.
+class RecognitionWorker:
+    def __init__(self, source, process, notify, metrics, max_fps=15, idle_interval=0.2):
+        self.source = source  # Retorna a CameraCapture atual (ou None)
+        self.process = process  # frame -> frame anotado, ou None enquanto não há resultado
+        self.notify = notify
+        self.metrics = metrics
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.idle_interval = idle_interval
+        self.lock = threading.Lock()  # Serializa o frame com o início e a parada do pipeline (o estado do reconhecimento tem o lock da Recognition)
+        self.recognizing = False
+        self.visible = True  # A interface quer frames (janela visível e mostrando a câmera ou a tabela)
+        self.running = False
+        self.thread = None
+        self.pending = threading.Event()  # Aviso enviado e ainda não consumido pela interface
+        self.result_lock = threading.Lock()
+        self.result = None
+        self.last_notified = 0.0
+        self.stats = {'processed': 0, 'shown': 0, 'errors': 0}
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name='recognition-worker', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2.0)
+        self.thread = None
+
+    def run(self):
+        while self.running:
+            capture = self.source()
+            if capture is None or not capture.isOpened() or not (self.recognizing or self.visible):
+                time.sleep(self.idle_interval)  # Sem câmera, ou minimizada sem reconhecimento: nada a fazer
+                continue
+            if not self.recognizing:
+                wait = self.min_interval - (time.monotonic() - self.last_notified)
+                if wait > 0:
+                    time.sleep(wait)  # Só exibição: não lê frames além da taxa de redesenho
+                    continue
+            if not capture.new_frame.wait(self.idle_interval):
+                continue
+            started = self.metrics.start()
+            success, frame = capture.read()
+            self.metrics.stop('capture', started)
+            if not success:
+                continue
+            if self.recognizing:
+                try:
+                    with self.lock:
+                        frame = self.process(frame)
+                    self.stats['processed'] += 1
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    logging.error(f"Erro no reconhecimento do frame: {str(e)}")
+                    continue
+            if frame is not None:
+                self.publish(frame)
+
+    # Guarda o resultado e avisa a interface, respeitando a taxa de redesenho
+    def publish(self, frame):
+        with self.result_lock:
+            self.result = frame
+        now = time.monotonic()
+        if self.visible and not self.pending.is_set() and now - self.last_notified >= self.min_interval:
+            self.last_notified = now
+            self.pending.set()
+            self.stats['shown'] += 1
+            self.notify()
+
+    # Frame mais recente para a interface; libera o próximo aviso
+    def take(self):
+        with self.result_lock:
+            frame, self.result = self.result, None
+        self.pending.clear()
+        return frame
@@ -0,0 +1,54 @@
+import time
+import cv2 as cv  # OpenCV para redimensionar e codificar os frames exibidos
+
+
+# Camada de exibição: guarda o último frame anotado em memória e codifica no máximo uma vez por
+# tamanho de saída, em um formato rápido de decodificar pelo Tk.
+class FrameRenderer:
+    FORMATS = {
+        'ppm': ('.ppm', []),  # Sem compressão; lido nativamente pelo PhotoImage do Tk e ~15x mais rápido que PNG
+        'png': ('.png', []),  # Mantido para builds do Tk sem suporte a PPM via data
+    }
+
+    def __init__(self, image_format='ppm', max_fps=15):
+        self.extension, self.params = self.FORMATS[image_format]
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.frame = None
+        self.version = 0
+        self.cache = {}  # tamanho -> (versão do frame, bytes)
+        self.last_shown = {}  # destino -> instante da última atualização
+
+    # Substitui o frame atual; encodings antigas deixam de valer
+    def set_frame(self, frame):
+        if frame is self.frame:
+            return
+        self.frame = frame
+        self.version += 1
+
+    # Limita a taxa de atualização de cada destino, independente da taxa de reconhecimento
+    def due(self, target):
+        now = time.monotonic()
+        if now - self.last_shown.get(target, 0.0) < self.min_interval:
+            return False
+        self.last_shown[target] = now
+        return True
+
+    # Tamanho que cabe em (max_width, max_height) mantendo o aspect ratio; max_height None ajusta só pela largura
+    def fit_size(self, max_width, max_height=None):
+        height, width = self.frame.shape[:2]
+        scale = max_width / width if max_height is None else min(max_width / width, max_height / height)
+        return int(width * scale), int(height * scale)
+
+    # Bytes do frame atual no tamanho pedido, reaproveitando a encoding se o frame não mudou
+    def encode(self, max_width, max_height=None):
+        if self.frame is None:
+            return None, None
+        size = self.fit_size(max_width, max_height)
+        cached = self.cache.get(size)
+        if cached is not None and cached[0] == self.version:
+            return cached[1], size
+        interpolation = cv.INTER_AREA if size[0] < self.frame.shape[1] else cv.INTER_LINEAR
+        frame = cv.resize(self.frame, size, interpolation=interpolation)
+        data = cv.imencode(self.extension, frame, self.params)[1].tobytes()
+        self.cache[size] = (self.version, data)
+        return data, size
@@ -0,0 +1,149 @@
+import os
+import logging
+import numpy as np
+from multiprocessing import shared_memory
+
+HEADER_FIELDS = 4  # rows, dim, tamanho da tabela de ids, geração
+HEADER_BYTES = HEADER_FIELDS * 8
+
+
+def block_name(prefix, generation):
+    return f"{prefix}_g{generation}"
+
+
+# Anexa a um bloco existente sem registrá-lo de novo no resource tracker. Nas versões antigas os
+# workers são filhos do publicador e usam o mesmo tracker, onde o registro repetido não tem efeito.
+def attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+# Layout de um bloco: cabeçalho int64[4] | matriz float32 (rows x dim) | offsets int64 (rows + 1) | nomes utf-8
+def block_views(buf):
+    rows, dim, blob_len, generation = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=buf)
+    rows, dim, blob_len = int(rows), int(dim), int(blob_len)
+    matrix_offset = HEADER_BYTES
+    offsets_offset = matrix_offset + rows * dim * 4
+    blob_offset = offsets_offset + (rows + 1) * 8
+    matrix = np.ndarray((rows, dim), dtype=np.float32, buffer=buf, offset=matrix_offset)
+    offsets = np.ndarray((rows + 1,), dtype=np.int64, buffer=buf, offset=offsets_offset)
+    blob = np.ndarray((blob_len,), dtype=np.uint8, buffer=buf, offset=blob_offset)
+    return matrix, offsets, blob, int(generation)
+
+
+# Tabela de ids compacta: os nomes ficam em um único buffer utf-8 e são decodificados sob demanda
+class SharedIds:
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        return self.blob[self.offsets[index]:self.offsets[index + 1]].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+
+# Lado do processo principal: publica cada nova galeria em um bloco novo e só então
+# incrementa o contador de geração no bloco de controle.
+class SharedGalleryPublisher:
+    def __init__(self, prefix=None, keep_generations=2):
+        self.prefix = prefix or f"fa{os.getpid()}"
+        self.keep_generations = keep_generations  # Gerações antigas mantidas para leitores ainda em troca
+        self.control = shared_memory.SharedMemory(name=f"{self.prefix}_ctl", create=True, size=8)
+        self.generation_view = np.ndarray((1,), dtype=np.int64, buffer=self.control.buf)
+        self.generation_view[0] = 0
+        self.blocks = {}
+
+    @property
+    def generation(self):
+        return int(self.generation_view[0])
+
+    def publish(self, matrix, names):
+        matrix = np.ascontiguousarray(np.asarray(matrix, dtype=np.float32).reshape(len(names), -1) if len(names) else np.empty((0, 128), dtype=np.float32))
+        encoded = [str(name).encode('utf-8') for name in names]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(item) for item in encoded])
+        blob = b''.join(encoded)
+        rows, dim = matrix.shape
+
+        generation = self.generation + 1
+        size = HEADER_BYTES + matrix.nbytes + offsets.nbytes + max(1, len(blob))
+        shm = shared_memory.SharedMemory(name=block_name(self.prefix, generation), create=True, size=size)
+        np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)[:] = (rows, dim, len(blob), generation)
+        block_matrix, block_offsets, block_blob, _ = block_views(shm.buf)
+        block_matrix[:] = matrix
+        block_offsets[:] = offsets
+        block_blob[:] = np.frombuffer(blob, dtype=np.uint8)
+        del block_matrix, block_offsets, block_blob
+        self.blocks[generation] = shm
+
+        # A troca é atômica para os leitores: o bloco já está completo quando a geração muda
+        self.generation_view[0] = generation
+        self.release_old(generation)
+        return generation
+
+    def release_old(self, generation):
+        for old in [old for old in self.blocks if old <= generation - self.keep_generations]:
+            shm = self.blocks.pop(old)
+            try:
+                shm.close()
+                shm.unlink()
+            except Exception as e:
+                logging.error(f"Erro ao liberar a galeria compartilhada {old}: {str(e)}")
+
+    def close(self):
+        self.release_old(self.generation + self.keep_generations)
+        del self.generation_view
+        self.control.close()
+        self.control.unlink()
+
+
+# Lado dos workers: anexa ao bloco atual sem copiar e troca quando a geração muda
+class SharedGalleryReader:
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.control = attach(f"{prefix}_ctl")
+        self.generation_view = np.ndarray((1,), dtype=np.int64, buffer=self.control.buf)
+        self.generation = 0
+        self.shm = None
+        self.matrix = np.empty((0, 128), dtype=np.float32)
+        self.names = []
+
+    # Verificação barata (um inteiro); retorna True quando uma nova galeria foi anexada
+    def refresh(self):
+        generation = int(self.generation_view[0])
+        if generation == self.generation:
+            return False
+        try:
+            shm = attach(block_name(self.prefix, generation))
+        except FileNotFoundError:
+            return False  # Já substituída por uma geração mais nova; tenta na próxima chamada
+        matrix, offsets, blob, _ = block_views(shm.buf)
+        old = self.shm
+        self.shm, self.generation = shm, generation
+        self.matrix, self.names = matrix, SharedIds(offsets, blob)
+        if old is not None:
+            self.release(old)
+        return True
+
+    @staticmethod
+    def release(shm):
+        try:
+            shm.close()
+        except BufferError:
+            pass  # Ainda há views em uso (ex.: matcher antigo); o bloco é liberado quando forem coletadas
+
+    def close(self):
+        self.matrix, self.names = None, None
+        if self.shm is not None:
+            self.release(self.shm)
+        del self.generation_view
+        self.control.close()
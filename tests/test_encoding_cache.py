@@ -0,0 +1,86 @@
+import os
+import sys
+import threading
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from encoding_cache import EncodingCache  # noqa: E402
+
+
+def is_image_file(name):
+    return name.endswith('.jpg')
+
+
+def add_photo(folder, name):
+    with open(os.path.join(folder, name), 'wb') as file:
+        file.write(name.encode('utf-8'))
+
+
+# Codificador falso: encoding determinística pelo nome do arquivo
+def fake_encode(paths):
+    return {path: (np.full(128, len(os.path.basename(path)), dtype=np.float32), None) for path in paths}
+
+
+def no_encode(paths):
+    raise AssertionError(f"não deveria recodificar: {paths}")
+
+
+def matrices(folder):
+    return sorted(name for name in os.listdir(folder) if name.startswith(EncodingCache.MATRIX_PREFIX) and name.endswith('.npy'))
+
+
+def test_two_caches_saving_into_the_same_folder(tmp_path):
+    folder = str(tmp_path)
+    first = EncodingCache(folder, is_image_file)
+    second = EncodingCache(folder, is_image_file)
+
+    add_photo(folder, 'a.jpg')
+    first.sync(fake_encode)
+    add_photo(folder, 'bb.jpg')
+    names, _ = second.sync(fake_encode)
+    add_photo(folder, 'ccc.jpg')
+    _, matrix = first.sync(fake_encode)
+
+    assert names == ['a', 'bb']
+    assert matrix.shape == (3, 128)
+    # A geração anterior continua em disco para quem ainda lê o índice antigo; as mais velhas saem
+    assert os.path.basename(second.matrix_path) in matrices(folder)
+    assert len(matrices(folder)) == 2
+
+    names, matrix = EncodingCache(folder, is_image_file).sync(no_encode)
+    assert names == ['a', 'bb', 'ccc']
+    assert np.array_equal(matrix[2], np.full(128, len('ccc.jpg'), dtype=np.float32))
+
+
+def test_concurrent_saves_never_leave_the_index_without_its_matrix(tmp_path):
+    folder = str(tmp_path)
+    add_photo(folder, 'a.jpg')
+    EncodingCache(folder, is_image_file).sync(fake_encode)
+    files, matrix = EncodingCache(folder, is_image_file).load_index()
+    matrix = np.array(matrix)
+
+    stop = threading.Event()
+    errors = []
+
+    def writer():
+        cache = EncodingCache(folder, is_image_file)
+        while not stop.is_set():
+            cache.save(files, matrix)
+
+    def reader():
+        cache = EncodingCache(folder, is_image_file)
+        for _ in range(200):
+            loaded_files, loaded = cache.load_index()
+            if loaded is None or loaded_files != files:
+                errors.append(cache.matrix_path)
+
+    writers = [threading.Thread(target=writer) for _ in range(2)]
+    for thread in writers:
+        thread.start()
+    reader()
+    stop.set()
+    for thread in writers:
+        thread.join()
+
+    assert not errors
+    EncodingCache(folder, is_image_file).sync(no_encode)
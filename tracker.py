@@ -0,0 +1,117 @@
+import numpy as np
+import cv2 as cv  # OpenCV para fluxo óptico
+
+
+class FaceTrack:
+    def __init__(self, track_id, location):
+        self.id = track_id
+        self.location = location  # (top, right, bottom, left) na escala da detecção
+        self.encoding = None
+        self.candidates = None  # Resultado do matcher, reaproveitado enquanto a track estiver confiável
+        self.confidence = 1.0
+        self.hits = 1
+        self.lost = False
+
+    # Nova encoding: reinicia a confiança e força um novo matching
+    def set_encoding(self, encoding):
+        self.encoding = encoding
+        self.candidates = None
+        self.confidence = 1.0
+
+    def needs_encoding(self, min_confidence):
+        return self.encoding is None or self.confidence < min_confidence
+
+
+# Rastreia faces entre detecções: detecção completa a cada detect_interval frames (ou quando uma
+# track se perde) e, entre elas, desloca as caixas com fluxo óptico no frame reduzido.
+class FaceTracker:
+    def __init__(self, detect_interval=5, iou_threshold=0.3, confidence_decay=0.9, min_confidence=0.5, min_points=4):
+        self.detect_interval = detect_interval
+        self.iou_threshold = iou_threshold
+        self.confidence_decay = confidence_decay
+        self.min_confidence = min_confidence
+        self.min_points = min_points
+        self.reset()
+
+    def reset(self):
+        self.tracks = []
+        self.next_id = 1
+        self.frame_index = 0
+        self.prev_gray = None
+        self.detections_run = 0
+
+    def needs_detection(self):
+        return (self.prev_gray is None or not self.tracks or any(track.lost for track in self.tracks)
+                or self.frame_index % self.detect_interval == 0)
+
+    # Processa um frame. detect() só é chamado quando uma detecção completa é necessária.
+    def step(self, gray, detect):
+        if self.needs_detection():
+            self.associate(detect())
+            self.detections_run += 1
+        else:
+            self.propagate(gray)
+        self.prev_gray = gray
+        self.frame_index += 1
+        return self.tracks
+
+    @staticmethod
+    def iou(a, b):
+        top, right = max(a[0], b[0]), min(a[1], b[1])
+        bottom, left = min(a[2], b[2]), max(a[3], b[3])
+        inter = max(0, right - left) * max(0, bottom - top)
+        area_a = (a[1] - a[3]) * (a[2] - a[0])
+        area_b = (b[1] - b[3]) * (b[2] - b[0])
+        union = area_a + area_b - inter
+        return inter / union if union > 0 else 0.0
+
+    # Associação gulosa por IoU entre as tracks existentes e as novas detecções
+    def associate(self, locations):
+        pairs = sorted(((self.iou(track.location, location), t, d)
+                        for t, track in enumerate(self.tracks)
+                        for d, location in enumerate(locations)), reverse=True)
+        used_tracks, used_detections = set(), set()
+        tracks = []
+        for score, t, d in pairs:
+            if score < self.iou_threshold:
+                break
+            if t in used_tracks or d in used_detections:
+                continue
+            track = self.tracks[t]
+            track.location = tuple(int(v) for v in locations[d])
+            track.hits += 1
+            track.lost = False
+            used_tracks.add(t)
+            used_detections.add(d)
+            tracks.append(track)
+
+        for d, location in enumerate(locations):
+            if d not in used_detections:
+                tracks.append(FaceTrack(self.next_id, tuple(int(v) for v in location)))
+                self.next_id += 1
+        self.tracks = tracks
+
+    # Desloca cada caixa pela mediana do fluxo óptico dos pontos dentro dela
+    def propagate(self, gray):
+        height, width = gray.shape[:2]
+        for track in self.tracks:
+            top, right, bottom, left = track.location
+            mask = np.zeros_like(self.prev_gray)
+            mask[max(0, top):max(0, bottom), max(0, left):max(0, right)] = 255
+            points = cv.goodFeaturesToTrack(self.prev_gray, maxCorners=30, qualityLevel=0.01, minDistance=2, mask=mask)
+            if points is None or len(points) < self.min_points:
+                track.lost = True
+                continue
+            moved, status, _ = cv.calcOpticalFlowPyrLK(self.prev_gray, gray, points, None)
+            good = status.reshape(-1) == 1
+            if good.sum() < self.min_points:
+                track.lost = True
+                continue
+            dx, dy = np.median((moved - points).reshape(-1, 2)[good], axis=0)
+            dx, dy = int(round(dx)), int(round(dy))
+            box_h, box_w = bottom - top, right - left
+            top = min(max(0, top + dy), height - box_h)
+            left = min(max(0, left + dx), width - box_w)
+            track.location = (top, left + box_w, top + box_h, left)
+            # Quanto mais frames sem detecção/encoding, menos confiável é a identidade da track
+            track.confidence *= self.confidence_decay * (good.sum() / len(good))
@@ -0,0 +1,126 @@
+import os
+import time
+import logging
+import numpy as np
+
+
+# Armazena rostos desconhecidos como centróides em uma matriz contígua de tamanho fixo.
+# Cada consulta é uma única operação vetorizada; entradas expiram por TTL e, com a
+# capacidade cheia, a menos usada recentemente é substituída (LRU).
+class UnknownFaceStore:
+    def __init__(self, tolerance=0.6, max_entries=500, ttl=4 * 60 * 60, persist_path=None, save_interval=30.0, max_sightings=20, dimension=128):
+        self.tolerance = tolerance
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist_path = persist_path
+        self.save_interval = save_interval
+        self.max_sightings = max_sightings  # Limita o peso do histórico para o centróide acompanhar mudanças
+        self.dimension = dimension
+
+        self.centroids = np.zeros((max_entries, dimension), dtype=np.float32)
+        self.sightings = np.zeros(max_entries, dtype=np.int32)  # Quantas encodings formam o centróide
+        self.counts = np.zeros(max_entries, dtype=np.int32)  # Capturas salvas (campo 'count' de antes)
+        self.last_seen = np.zeros(max_entries, dtype=np.float64)
+        self.ids = np.zeros(max_entries, dtype=np.int64)
+        self.active = np.zeros(max_entries, dtype=bool)
+        self.next_id = 1
+        self.evicted = 0
+        self.dirty = False
+        self.last_saved = time.time()
+        self.load()
+
+    def __len__(self):
+        return int(self.active.sum())
+
+    def entry(self, slot):
+        return {'slot': slot, 'name': f'Desconhecido{self.ids[slot]}', 'count': int(self.counts[slot]), 'encoding': self.centroids[slot].copy()}
+
+    # Slot do centróide mais próximo dentro da tolerância, ou -1
+    def nearest(self, encoding):
+        if not self.active.any():
+            return -1
+        diff = self.centroids - np.asarray(encoding, dtype=np.float32)
+        dist = np.einsum('ij,ij->i', diff, diff)
+        dist[~self.active] = np.inf
+        slot = int(np.argmin(dist))
+        return slot if dist[slot] <= self.tolerance ** 2 else -1
+
+    # Equivalente a check_or_update_unrecognized: retorna a entrada existente ou cria uma nova.
+    # Com update=True a captura é contada e o centróide incorpora a nova encoding.
+    def lookup(self, encoding, update=False):
+        now = time.time()
+        slot = self.nearest(encoding)
+        if slot < 0:
+            slot = self.allocate(now)
+            self.centroids[slot] = encoding
+            self.sightings[slot] = 1
+            self.counts[slot] = 0
+            self.ids[slot] = self.next_id
+            self.next_id += 1
+            self.active[slot] = True
+        elif update:
+            self.counts[slot] += 1
+            n = min(self.sightings[slot], self.max_sightings)
+            self.centroids[slot] += (np.asarray(encoding, dtype=np.float32) - self.centroids[slot]) / (n + 1)
+            self.sightings[slot] = n + 1
+        self.last_seen[slot] = now
+        self.dirty = True
+        self.maybe_save(now)
+        return self.entry(slot)
+
+    # Escolhe um slot livre: expira entradas antigas e, se ainda estiver cheio, remove a LRU
+    def allocate(self, now):
+        expired = self.active & (self.last_seen < now - self.ttl)
+        if expired.any():
+            self.evicted += int(expired.sum())
+            self.active[expired] = False
+        free = np.flatnonzero(~self.active)
+        if free.size:
+            return int(free[0])
+        slot = int(np.argmin(self.last_seen))
+        self.active[slot] = False
+        self.evicted += 1
+        return slot
+
+    def stats(self):
+        return {'entries': len(self), 'capacity': self.max_entries, 'evicted': self.evicted, 'next_id': self.next_id}
+
+    def maybe_save(self, now):
+        if self.persist_path and self.dirty and now - self.last_saved >= self.save_interval:
+            self.save()
+
+    # Persiste os centróides para manter os IDs estáveis entre reinicializações
+    def save(self):
+        if not self.persist_path:
+            return False
+        try:
+            tmp_path = self.persist_path + '.tmp.npz'
+            np.savez(tmp_path, centroids=self.centroids, sightings=self.sightings, counts=self.counts,
+                     last_seen=self.last_seen, ids=self.ids, active=self.active, next_id=self.next_id)
+            os.replace(tmp_path, self.persist_path)
+            self.dirty = False
+            self.last_saved = time.time()
+            return True
+        except Exception as e:
+            logging.error(f"Erro ao salvar rostos desconhecidos: {str(e)}")
+            return False
+
+    def load(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return False
+        try:
+            with np.load(self.persist_path) as data:
+                count = min(self.max_entries, data['centroids'].shape[0])
+                # Mantém as entradas mais recentes caso a capacidade tenha diminuído
+                keep = np.argsort(-(data['last_seen'] * data['active']))[:count]
+                self.centroids[:count] = data['centroids'][keep]
+                self.sightings[:count] = data['sightings'][keep]
+                self.counts[:count] = data['counts'][keep]
+                self.last_seen[:count] = data['last_seen'][keep]
+                self.ids[:count] = data['ids'][keep]
+                self.active[:count] = data['active'][keep]
+                self.next_id = int(data['next_id'])
+            return True
+        except Exception as e:
+            logging.error(f"Erro ao carregar rostos desconhecidos: {str(e)}")
+            return False